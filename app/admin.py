@@ -124,6 +124,11 @@ class MenuCategoriesAdmin(admin.ModelAdmin):
 class MenuItemsAdmin(admin.ModelAdmin):
     list_display = ["id","item_name","category","item_price","item_description"]
 
+@admin.register(models.Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ["id", "type", "args", "status", "attempts", "run_at", "locked_by"]
+    list_filter = ["type", "status"]
+
 admin.site.register(models.MenuTemplate)
 admin.site.register(models.MenuTemplateItems)
 admin.site.register(models.Plan)
@@ -1,5 +1,7 @@
-from openai import OpenAI
 from langchain_core.prompts import ChatPromptTemplate
+from app.clients import backoff_delay
+from app.providers import openai_client
+from app.llm_scheduler import llm_scheduler, estimate_tokens, LLMCapacityExceeded
 import os
 import time
 import base64
@@ -7,6 +9,9 @@ import base64
 from dotenv import load_dotenv
 load_dotenv()
 
+# Token budget charged for one generated image on top of the prompt.
+IMAGE_TOKENS = 1500
+
 class Image:
 
     def image(self, dish_name, ingredients, max_retries=5, wait_seconds=5):
@@ -16,8 +21,6 @@ class Image:
         for attempt in range(max_retries):
             try: 
 
-                client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
                 prompt_template = ChatPromptTemplate.from_template(
                 """Generate a high-quality, realistic image of the dish called '{dish}' made with the following ingredients: {ingredients}.
                 Show the ENTIRE plate fully visible from edge to edge — absolutely no cropping or zooming.
@@ -33,14 +36,15 @@ class Image:
                     ingredients=", ".join(ingredients)
                 )
 
-                response = client.responses.create(
-                    model="gpt-4.1",  
-                    input=final_prompt,
-                    tools=[{
-                        "type": "image_generation",
-                        "size": "1024x1024"
-                    }],
-                )
+                with llm_scheduler.slot(estimate_tokens(final_prompt, IMAGE_TOKENS)):
+                    response = openai_client().responses.create(
+                        model="gpt-4.1",  
+                        input=final_prompt,
+                        tools=[{
+                            "type": "image_generation",
+                            "size": "1024x1024"
+                        }],
+                    )
 
                 for output in response.output:
                     if output.type == "image_generation_call":
@@ -49,10 +53,12 @@ class Image:
                         # print("Output saved: output2.png")
                         return output.result
 
+            except LLMCapacityExceeded:
+                raise
             except Exception as e:
                 last_exception = e
                 print(f"Error: {str(e)}")
-                time.sleep(wait_seconds)  
+                time.sleep(backoff_delay(attempt + 1, base=wait_seconds, cap=60))
        
         print("Error: ", str(last_exception))
         return {
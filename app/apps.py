@@ -1,5 +1,4 @@
 from django.apps import AppConfig
-from app.utils import start_scheduler
 
 class AppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
@@ -7,4 +6,5 @@ class AppConfig(AppConfig):
 
     def ready(self):
         import app.signals
-        start_scheduler()
+        import app.tasks
+        import app.videos
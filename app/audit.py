@@ -0,0 +1,131 @@
+import logging
+import threading
+from app import models
+from django.db import transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+EXCLUDED_FIELDS = [
+    "created_at",
+    "updated_at",
+    "is_deleted",
+    "recipe",
+    "image",
+    "video",
+    "video_id",
+    "image_variants",
+]
+
+_state = threading.local()
+
+
+def audited_fields(model):
+    """Concrete (name, attname) pairs diffed for ``model``, computed once per model."""
+    cache = model.__dict__.get("_audit_fields")
+    if cache is None:
+        cache = tuple(
+            (field.name, field.attname)
+            for field in model._meta.concrete_fields
+            if field.name not in EXCLUDED_FIELDS and not field.primary_key
+        )
+        model._audit_fields = cache
+    return cache
+
+
+def snapshot(instance):
+    """Remember the loaded field values so a later save can be diffed."""
+    values = instance.__dict__
+    instance._audit_original = {
+        attname: values[attname] for _, attname in audited_fields(type(instance)) if attname in values
+    }
+
+
+def snapshot_stored(instance, using=None):
+    """
+    Snapshot ``instance`` from its stored row before it is saved, unless an
+    earlier save already left a snapshot. Only instances that are written
+    pay for the lookup; new instances have nothing to diff against.
+    """
+    if instance._state.adding or getattr(instance, "_audit_original", None) is not None:
+        return
+    values = instance.__dict__
+    attnames = [attname for _, attname in audited_fields(type(instance)) if attname in values]
+    instance._audit_original = (
+        type(instance)._base_manager.using(using).filter(pk=instance.pk).values(*attnames).first()
+    )
+
+
+def diff(instance):
+    """Changed fields as ``[(name, new_value)]`` since the last snapshot."""
+    original = getattr(instance, "_audit_original", None)
+    if original is None:
+        return []
+    return [
+        (name, getattr(instance, attname))
+        for name, attname in audited_fields(type(instance))
+        if attname in original and original[attname] != getattr(instance, attname)
+    ]
+
+
+class AuditCollector:
+    """
+    Collects recipe changes for the current request and writes one
+    Recipe_Process_Audit row per recipe when the request finishes.
+
+    Changes are only collected once the transaction they were made in
+    commits, so rolled-back saves never reach the audit log.
+    """
+
+    @staticmethod
+    def begin():
+        _state.pending = {}
+
+    @staticmethod
+    def active():
+        return getattr(_state, "pending", None) is not None
+
+    @staticmethod
+    def record(recipe_id, lines):
+        if not recipe_id or not lines or not AuditCollector.active():
+            return
+        transaction.on_commit(lambda: AuditCollector._collect(recipe_id, lines))
+
+    @staticmethod
+    def _collect(recipe_id, lines):
+        pending = getattr(_state, "pending", None)
+        if pending is not None:
+            pending.setdefault(recipe_id, []).extend(lines)
+
+    @staticmethod
+    def flush(user):
+        pending = getattr(_state, "pending", None)
+        if not pending:
+            return []
+        try:
+            if user is None or not user.is_authenticated:
+                return []
+            restaurants = dict(models.Recipe.objects.filter(id__in=pending).values_list("id", "resturant_id"))
+            now = timezone.now()
+            rows = [
+                models.Recipe_Process_Audit(
+                    dish_name_id=recipe_id,
+                    changed_by=user,
+                    changes_made="\n".join(lines),
+                    datetime=now,
+                    resturant_id=restaurants[recipe_id],
+                )
+                for recipe_id, lines in pending.items()
+                if recipe_id in restaurants
+            ]
+            return models.Recipe_Process_Audit.objects.bulk_create(rows)
+        except Exception as e:
+            logger.error(f"Error writing recipe audit log: {str(e)}")
+            return []
+        finally:
+            pending.clear()
+
+    @staticmethod
+    def clear():
+        _state.pending = None
@@ -58,4 +58,16 @@ class PriorityGenericLevel(models.TextChoices):
 class  Availability(models.TextChoices):
     AVAILABLE = "A", "Available"
     LOW_STOCK = "LS", "Low Stock"
-    OUT_OFF_STOCK = "OOS", "Out Of Stock"
\ No newline at end of file
+    OUT_OFF_STOCK = "OOS", "Out Of Stock"
+class JobStatus(models.TextChoices):
+    QUEUED = "QD", "Queued"
+    RUNNING = "RN", "Running"
+    DONE = "DN", "Done"
+    FAILED = "FL", "Failed"
+    CANCELLED = "CL", "Cancelled"
+
+class VideoGenerationStatus(models.TextChoices):
+    QUEUED = "QD", "Queued"
+    RENDERING = "RD", "Rendering"
+    COMPLETED = "CP", "Completed"
+    FAILED = "FL", "Failed"
@@ -0,0 +1,213 @@
+import os
+import time
+import random
+import logging
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+import boto3
+import httpx
+import requests
+from botocore.config import Config
+from django.conf import settings
+from openai import OpenAI
+from requests.adapters import HTTPAdapter
+
+
+logger = logging.getLogger(__name__)
+
+# (connect, read) seconds for calls that do not pass their own timeout.
+DEFAULT_TIMEOUT = (5, 60)
+POOL_SIZE = 20
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 20
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Methods that are safe to send twice. POST is only retried when the caller opts in.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Exponential backoff with full jitter for retry number ``attempt`` (1-based)."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class HostMetrics:
+    """Latency and retry counters per outbound host, kept in memory for the stats endpoint."""
+
+    def __init__(self, window=500):
+        self.window = window
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def record(self, host, seconds, status=None, retry=False, error=False):
+        with self.lock:
+            entry = self.hosts.setdefault(
+                host,
+                {"requests": 0, "retries": 0, "errors": 0, "seconds": 0.0, "statuses": {}, "recent": deque(maxlen=self.window)},
+            )
+            entry["requests"] += 1
+            entry["retries"] += int(retry)
+            entry["errors"] += int(error)
+            entry["seconds"] += seconds
+            entry["recent"].append(seconds)
+            if status is not None:
+                entry["statuses"][str(status)] = entry["statuses"].get(str(status), 0) + 1
+
+    def stats(self):
+        with self.lock:
+            hosts = {host: dict(entry, recent=sorted(entry["recent"])) for host, entry in self.hosts.items()}
+        result = {}
+        for host, entry in hosts.items():
+            recent = entry.pop("recent")
+            entry["avg_ms"] = round(entry["seconds"] / entry["requests"] * 1000, 1)
+            entry["p50_ms"] = round(recent[len(recent) // 2] * 1000, 1)
+            entry["p95_ms"] = round(recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000, 1)
+            entry["seconds"] = round(entry["seconds"], 3)
+            result[host] = entry
+        return result
+
+
+metrics = HostMetrics()
+
+
+class PooledSession(requests.Session):
+    """
+    ``requests`` session with a keep-alive connection pool, a default timeout
+    and retries with jittered exponential backoff on connection errors and
+    429/5xx responses (honouring Retry-After). Every attempt is timed per host.
+    """
+
+    def __init__(self, pool_size=POOL_SIZE, max_retries=MAX_RETRIES):
+        super().__init__()
+        self.max_retries = max_retries
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, *args, retry=None, **kwargs):
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        if retry is None:
+            retry = method.upper() in IDEMPOTENT_METHODS
+        # A streamed request body cannot be sent again.
+        if hasattr(kwargs.get("data"), "read"):
+            retry = False
+        host = urlsplit(url).netloc
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.record(host, time.monotonic() - started, retry=attempt > 0, error=True)
+                if not retry or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                delay = backoff_delay(attempt)
+                logger.warning(f"{method} {host} failed ({str(e)}), retry {attempt} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            metrics.record(
+                host, time.monotonic() - started, response.status_code, retry=attempt > 0, error=response.status_code >= 500
+            )
+            if not retry or attempt >= self.max_retries or response.status_code not in RETRY_STATUSES:
+                return response
+            attempt += 1
+            delay = backoff_delay(attempt)
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = min(max(delay, int(retry_after)), BACKOFF_CAP)
+            logger.warning(f"{method} {host} returned {response.status_code}, retry {attempt} in {delay:.1f}s")
+            response.close()
+            time.sleep(delay)
+
+
+class MeteredTransport(httpx.HTTPTransport):
+    """httpx transport that times every attempt the OpenAI SDK makes (its retries included)."""
+
+    def handle_request(self, request):
+        started = time.monotonic()
+        host = request.url.netloc.decode()
+        retry = request.headers.get("x-stainless-retry-count", "0") != "0"
+        try:
+            response = super().handle_request(request)
+        except Exception:
+            metrics.record(host, time.monotonic() - started, retry=retry, error=True)
+            raise
+        metrics.record(
+            host, time.monotonic() - started, response.status_code, retry=retry, error=response.status_code >= 500
+        )
+        return response
+
+
+class ClientRegistry:
+    """
+    Process-wide outbound clients, created on first use and shared by all
+    threads so connections are kept alive between calls. Clients are
+    recreated in a forked child rather than sharing the parent's sockets.
+    """
+
+    def __init__(self):
+        self.clients = {}
+        self.pid = None
+        # Reentrant: a factory may ask the registry for another client (OpenAI -> its httpx client).
+        self.lock = threading.RLock()
+
+    def get(self, name, factory):
+        if self.pid != os.getpid():
+            with self.lock:
+                if self.pid != os.getpid():
+                    self.clients = {}
+                    self.pid = os.getpid()
+        client = self.clients.get(name)
+        if client is None:
+            with self.lock:
+                client = self.clients.get(name)
+                if client is None:
+                    client = self.clients[name] = factory()
+        return client
+
+
+registry = ClientRegistry()
+
+
+def http():
+    """Shared ``requests`` session for Synthesia, presigned S3 uploads and image downloads."""
+    return registry.get("http", PooledSession)
+
+
+def openai_http_client():
+    return registry.get(
+        "openai_http",
+        lambda: httpx.Client(
+            transport=MeteredTransport(limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)),
+            timeout=httpx.Timeout(120, connect=5),
+        ),
+    )
+
+
+def openai_client():
+    """Shared OpenAI client; the SDK retries 429/5xx with jittered exponential backoff."""
+    return registry.get(
+        "openai",
+        lambda: OpenAI(api_key=settings.OPENAI_API_KEY, http_client=openai_http_client(), max_retries=MAX_RETRIES),
+    )
+
+
+def s3_client():
+    """Shared boto3 S3 client with a connection pool and standard-mode (jittered backoff) retries."""
+    return registry.get(
+        "s3",
+        lambda: boto3.client(
+            "s3",
+            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            region_name=settings.AWS_S3_REGION_NAME,
+            config=Config(
+                max_pool_connections=POOL_SIZE,
+                connect_timeout=DEFAULT_TIMEOUT[0],
+                read_timeout=DEFAULT_TIMEOUT[1],
+                retries={"mode": "standard", "max_attempts": MAX_RETRIES + 1},
+            ),
+        ),
+    )
@@ -0,0 +1,70 @@
+import logging
+from app import models
+from django.db import IntegrityError
+from django.db.models import F
+
+
+logger = logging.getLogger(__name__)
+
+
+class RecipeDocumentService:
+    """
+    Keeps one pre-rendered RecipeSerializer payload per recipe.
+
+    Writers bump ``generation`` and clear the document; readers rebuild a
+    missing document and only store it if the generation they started from
+    is still current, so a rebuild racing with a write never wins.
+    """
+
+    @staticmethod
+    def build(recipe_id):
+        from app.serializers import RecipeSerializer
+
+        queryset = RecipeSerializer.setup_eager_loading(models.Recipe.objects.filter(id=recipe_id))
+        recipe = queryset.first()
+        if recipe is None:
+            return None
+        # Built without a request: file fields stay relative and are made
+        # absolute per request in absolutize().
+        return RecipeSerializer(recipe, context={}).data
+
+    @staticmethod
+    def get_document(recipe_id):
+        row = models.RecipeDocument.objects.filter(recipe_id=recipe_id).values_list("document", "generation").first()
+        if row is None:
+            try:
+                models.RecipeDocument.objects.create(recipe_id=recipe_id)
+            except IntegrityError:
+                pass
+            generation = 0
+        else:
+            document, generation = row
+            if document is not None:
+                return document
+
+        document = RecipeDocumentService.build(recipe_id)
+        if document is not None:
+            stored = models.RecipeDocument.objects.filter(recipe_id=recipe_id, generation=generation).update(document=document)
+            if not stored:
+                logger.info(f"Recipe document {recipe_id} changed while rebuilding, not storing")
+        return document
+
+    @staticmethod
+    def invalidate(recipe_ids):
+        recipe_ids = [recipe_id for recipe_id in recipe_ids if recipe_id]
+        if not recipe_ids:
+            return 0
+        return models.RecipeDocument.objects.filter(recipe_id__in=recipe_ids).update(
+            document=None, generation=F("generation") + 1
+        )
+
+    @staticmethod
+    def absolutize(document, request):
+        document = dict(document)
+        if document.get("video"):
+            document["video"] = request.build_absolute_uri(document["video"])
+        for key in ("starch_preparation", "design_your_plate"):
+            section = document.get(key)
+            if section and section.get("image"):
+                document[key] = {**section, "image": request.build_absolute_uri(section["image"])}
+        return document
@@ -0,0 +1,106 @@
+import hashlib
+from app import models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+
+# (model, lookup from the child back to the recipe). Many-to-many relations
+# use the auto-created through table: it has no timestamps, so its highest
+# pk and row count stand in for them.
+RECIPE_CHILDREN = (
+    (models.Steps, "recipe"),
+    (models.Tag, "recipe"),
+    (models.Ingredient, "recipe"),
+    (models.Essentials, "recipe"),
+    (models.Starch_Preparation, "recipe"),
+    (models.Starch_Preparation_Steps, "starch_preparation__recipe"),
+    (models.Design_Your_Plate, "recipe"),
+    (models.Design_Your_Plate_Steps, "design_plate__recipe"),
+    (models.Rating, "recipe"),
+    (models.recipe_images, "recipe"),
+    (models.Cooking_Deviation_Comment, "recipe"),
+    (models.Real_time_Variable_Comment, "recipe"),
+    (models.Recipe.wine_pairing.through, "recipe"),
+    (models.Recipe.predefined_ingredients.through, "recipe"),
+    (models.Recipe.predefined_starch.through, "recipe"),
+    (models.Recipe.predefined_vegetables.through, "recipe"),
+    # Shared rows whose names are part of the recipe document; renaming one
+    # changes it without touching the recipe or the through tables.
+    (models.Wine, "recipe_wine"),
+    (models.Predefined_Ingredients, "recipe_predefined_ingredients"),
+    (models.Predefined_Starch, "recipe_predefined_starch"),
+    (models.Predefined_Vegetable, "recipe_predefined_vegetables"),
+)
+RECIPE_FIELDS = ("updated_at", "cusinie_type__updated_at")
+
+MENU_CHILDREN = (
+    (models.Menu.menu_item.through, "menu"),
+    (models.Menu.recipes.through, "menu"),
+    (models.MenuItems, "menu_item"),
+    (models.MenuCategoryies, "menu_category__menu_item"),
+    (models.Recipe, "menu_recipes"),
+    (models.Ingredient, "recipe__menu_item_e__menu_item"),
+)
+MENU_FIELDS = ("updated_at",)
+
+TASK_CHILDREN = (
+    (models.Message, "task_id"),
+    (models.User, "user__task_id"),
+)
+TASK_FIELDS = (
+    "updated_at",
+    "staff__updated_at",
+    "staff__resturant__updated_at",
+    "user__updated_at",
+) + tuple(f"task_name__{field}" for field in RECIPE_FIELDS)
+
+
+def _child_versions(children, outer="pk", prefix="v"):
+    annotations = {}
+    for index, (model, lookup) in enumerate(children):
+        stamp = "updated_at" if any(field.name == "updated_at" for field in model._meta.fields) else "pk"
+        rows = model.objects.filter(**{lookup: OuterRef(outer)}).order_by().values(lookup)
+        annotations[f"{prefix}{index}_stamp"] = Subquery(rows.annotate(value=Max(stamp)).values("value"))
+        annotations[f"{prefix}{index}_count"] = Subquery(rows.annotate(value=Count("pk", distinct=True)).values("value"))
+    return annotations
+
+
+def version_etag(queryset, pk, fields, versions, salt=""):
+    """
+    Strong ETag for one row of ``queryset`` from the version vector of the
+    row and its children, fetched in a single query. None if the row is not
+    in the queryset.
+    """
+    row = queryset.filter(pk=pk).annotate(**versions).values_list(*fields, *versions).first()
+    if row is None:
+        return None
+    return '"%s"' % hashlib.sha1(repr((salt,) + row).encode()).hexdigest()
+
+
+def recipe_etag(queryset, pk, request):
+    versions = _child_versions(RECIPE_CHILDREN)
+    return version_etag(queryset, pk, RECIPE_FIELDS, versions, salt=request.build_absolute_uri("/"))
+
+
+def menu_etag(queryset, pk, request):
+    versions = _child_versions(MENU_CHILDREN)
+    return version_etag(queryset, pk, MENU_FIELDS, versions, salt=request.build_absolute_uri("/"))
+
+
+def task_etag(queryset, pk, request):
+    versions = _child_versions(TASK_CHILDREN)
+    versions.update(_child_versions(RECIPE_CHILDREN, outer="task_name", prefix="r"))
+    return version_etag(queryset, pk, TASK_FIELDS, versions, salt=request.build_absolute_uri("/"))
+
+
+def not_modified(request, etag):
+    """A 304 response if the client already holds ``etag``, otherwise None."""
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return None
+    etags = parse_etags(if_none_match)
+    if "*" in etags or etag in etags:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
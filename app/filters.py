@@ -4,8 +4,7 @@ from django_filters import CharFilter, BooleanFilter, DateFilter, NumberFilter,C
 from app.models import *
 from django.db.models.query_utils import Q
 from app import choices
-from functools import reduce
-from operator import or_
+from app.search import RecipeSearchService, IngredientMatcher
 
 
 def placeholder(text):
@@ -57,30 +56,19 @@ class RecipeFilter(django_filters.FilterSet):
     profile = django_filters.CharFilter(method='filter_by_profile')
     flavor = django_filters.CharFilter(method='filter_by_flavor')
     tag = django_filters.CharFilter(field_name='recipe_tag__name', lookup_expr='icontains')
-    ingredients = filters.BaseInFilter(field_name='recipe_ingredient__title', lookup_expr='in')
     resturant = django_filters.CharFilter(field_name='resturant', lookup_expr='exact')
     is_draft = django_filters.BooleanFilter(field_name='is_draft')
     status = django_filters.ChoiceFilter(choices=choices.RecipeStatus.choices, field_name='status', lookup_expr='iexact')
     is_deleted = django_filters.BooleanFilter(field_name='is_deleted')
     
     def global_search(self, queryset, name, value):
-        return queryset.filter(
-            Q(dish_name__icontains=value) |
-            Q(description__icontains=value) |
-            Q(cusinie_type__category_name__icontains=value) |  
-            Q(availability__icontains=value) |
-            Q(status__icontains=value) |
-            Q(station_to_prepare_dish__icontains=value) |
-            Q(predefined_ingredients__name__icontains=value) |  
-            Q(wine_pairing__wine_type__icontains=value)
-        ).distinct()
+        return RecipeSearchService.filter(queryset, value)
 
     def filter_by_ingredients(self, queryset, name, value):
         ingredients = [ingredient.strip() for ingredient in value.split(',') if ingredient.strip()]
         
         if ingredients:
-            query = reduce(or_, (Q(predefined_ingredients__name__icontains=ingredient) for ingredient in ingredients))
-            return queryset.filter(query).distinct()
+            return IngredientMatcher.filter_recipes(queryset, ingredients)
         
         return queryset
 
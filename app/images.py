@@ -0,0 +1,200 @@
+import io
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+from urllib.parse import urlsplit
+from app.clients import http
+
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (320, 640, 1024)
+VARIANT_FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+VARIANT_QUALITY = 80
+MAX_SOURCE_BYTES = 25 * 1024 * 1024
+
+# Model label -> fields holding the source image, in order of preference.
+# Each model stores its derivatives in an ``image_variants`` JSONField.
+SOURCES = {
+    "app.recipe_images": ("image", "image_url"),
+    "app.starch_preparation": ("image", "image_url"),
+    "app.design_your_plate": ("image", "image_url"),
+    "app.menu": ("image", "image_url"),
+    "app.editorimage": ("image",),
+}
+
+
+def render_variants(data, widths=VARIANT_WIDTHS, formats=tuple(VARIANT_FORMATS)):
+    """
+    Resize encoded image ``data`` to each of ``widths`` (never upscaling) and
+    encode it in each format. Returns ``[(format, width, bytes)]``.
+
+    Runs in the process pool, so it must not touch Django.
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        source = ImageOps.exif_transpose(source)
+        source.load()
+    if source.mode not in ("RGB", "RGBA"):
+        source = source.convert("RGBA" if "transparency" in source.info or source.mode in ("LA", "PA") else "RGB")
+    flat = source
+    if source.mode == "RGBA":
+        flat = Image.new("RGB", source.size, (255, 255, 255))
+        flat.paste(source, mask=source.getchannel("A"))
+
+    sizes = sorted({min(width, source.width) for width in widths})
+    variants = []
+    for width in sizes:
+        height = max(1, round(source.height * width / source.width))
+        for fmt in formats:
+            image = source if fmt == "webp" else flat
+            if width != image.width:
+                image = image.resize((width, height), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, VARIANT_FORMATS[fmt], quality=VARIANT_QUALITY, optimize=fmt == "jpeg")
+            variants.append((fmt, width, buffer.getvalue()))
+    return variants
+
+
+_pool = None
+
+
+def variant_pool():
+    """Process pool for Pillow work; ``spawn`` keeps children free of the worker's threads and connections."""
+    global _pool
+    if _pool is None:
+        workers = getattr(settings, "IMAGE_VARIANT_WORKERS", None) or min(4, multiprocessing.cpu_count())
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+class ImageVariantService:
+    """
+    Precomputes resized WebP/JPEG derivatives of uploaded and AI-generated
+    images and exposes them as srcset strings.
+    """
+
+    @staticmethod
+    def source(instance):
+        """The image ``instance`` shows: a FieldFile or a URL, or None."""
+        for field in SOURCES[instance._meta.label_lower]:
+            value = getattr(instance, field)
+            if value:
+                return value
+        return None
+
+    @staticmethod
+    def source_key(source):
+        return source.name if isinstance(source, FieldFile) else source
+
+    @staticmethod
+    def is_stale(instance):
+        source = ImageVariantService.source(instance)
+        current = (instance.image_variants or {}).get("source")
+        return (ImageVariantService.source_key(source) if source else None) != current
+
+    @staticmethod
+    def allowed_url(url):
+        """Whether ``url`` is in the media bucket (or ``IMAGE_SOURCE_HOSTS``); client-supplied URLs elsewhere are never fetched."""
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            return False
+        host = parts.hostname.lower()
+        allowed = {name.lower() for name in getattr(settings, "IMAGE_SOURCE_HOSTS", [])}
+        allowed.add(urlsplit(settings.MEDIA_URL).hostname)
+        bucket = getattr(settings, "AWS_STORAGE_BUCKET_NAME", None)
+        if bucket:
+            region = getattr(settings, "AWS_S3_REGION_NAME", None)
+            allowed |= {f"{bucket}.s3.amazonaws.com", f"{bucket}.s3.{region}.amazonaws.com"}
+            # Path-style bucket URLs.
+            if host in ("s3.amazonaws.com", f"s3.{region}.amazonaws.com") and parts.path.startswith(f"/{bucket}/"):
+                return True
+        return host in allowed
+
+    @staticmethod
+    def schedule(instance):
+        from app.jobs import JobQueue
+
+        label = instance._meta.label_lower
+        if label not in SOURCES or not ImageVariantService.is_stale(instance):
+            return None
+        source = ImageVariantService.source(instance)
+        if source and not isinstance(source, FieldFile) and not ImageVariantService.allowed_url(source):
+            return None
+        return JobQueue.enqueue(
+            "image_variants", label, instance.pk, delay=1, dedupe_key=f"image_variants:{label}:{instance.pk}"
+        )
+
+    @staticmethod
+    def read(source):
+        if isinstance(source, FieldFile):
+            with source.open("rb") as file:
+                data = file.read(MAX_SOURCE_BYTES + 1)
+        else:
+            if not ImageVariantService.allowed_url(source):
+                raise ValueError(f"Image source outside the media storage: {source}")
+            # No redirects: they could lead off the allowed hosts.
+            with http().get(source, stream=True, timeout=(10, 60), allow_redirects=False) as response:
+                response.raise_for_status()
+                if response.is_redirect:
+                    raise ValueError(f"Image source redirects: {source}")
+                data = response.raw.read(MAX_SOURCE_BYTES + 1, decode_content=True)
+        if len(data) > MAX_SOURCE_BYTES:
+            raise ValueError(f"Image larger than {MAX_SOURCE_BYTES} bytes: {source}")
+        return data
+
+    @staticmethod
+    def render(data):
+        global _pool
+        try:
+            return variant_pool().submit(render_variants, data).result(timeout=120)
+        except BrokenProcessPool:
+            # A crashed child (e.g. out of memory) breaks the whole pool; start a new one next time.
+            _pool = None
+            raise
+
+    @staticmethod
+    def generate(label, pk):
+        """Render, store and record the derivatives of one image. Raises on failure so the job retries."""
+        from django.apps import apps
+
+        model = apps.get_model(label)
+        instance = model.objects.filter(pk=pk).first()
+        if instance is None or not ImageVariantService.is_stale(instance):
+            return None
+
+        source = ImageVariantService.source(instance)
+        variants = None
+        if source:
+            data = ImageVariantService.read(source)
+            rendered = ImageVariantService.render(data)
+            digest = hashlib.sha1(data).hexdigest()[:12]
+            variants = {"source": ImageVariantService.source_key(source)}
+            for fmt, width, content in rendered:
+                name = default_storage.save(
+                    f"variants/{model._meta.model_name}/{pk}/{digest}-{width}.{fmt}", ContentFile(content)
+                )
+                variants.setdefault(fmt, []).append({"width": width, "url": default_storage.url(name)})
+
+        # update() so storing the derivatives does not trigger another run.
+        model.objects.filter(pk=pk).update(image_variants=variants, updated_at=timezone.now())
+        return variants
+
+    @staticmethod
+    def srcset(instance):
+        """``{"webp": "url 320w, ...", "jpeg": ...}`` once derivatives exist, otherwise None."""
+        variants = getattr(instance, "image_variants", None)
+        if not variants or ImageVariantService.is_stale(instance):
+            return None
+        return {
+            fmt: ", ".join(f"{variant['url']} {variant['width']}w" for variant in variants.get(fmt, []))
+            for fmt in VARIANT_FORMATS
+            if variants.get(fmt)
+        }
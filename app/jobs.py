@@ -0,0 +1,260 @@
+import os
+import zlib
+import random
+import socket
+import logging
+import threading
+import traceback
+from datetime import timedelta
+from app import models, choices
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+
+class JobType:
+    def __init__(self, name, func, concurrency=1, max_attempts=5, backoff=30, timeout=600, on_failure=None):
+        self.name = name
+        self.func = func
+        # Jobs of this type running at once across all workers.
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        # Base delay in seconds before a retry; doubles with every attempt.
+        self.backoff = backoff
+        # Lease length. Workers renew it while the job runs, so a job is only
+        # handed out again once its worker has stopped renewing (crashed).
+        self.timeout = timeout
+        # Called with the job args and ``error`` once the last attempt failed.
+        self.on_failure = on_failure
+
+
+HANDLERS = {}
+
+
+def register(name, concurrency=1, max_attempts=5, backoff=30, timeout=600, on_failure=None):
+    """
+    Register the decorated function as the handler for jobs of type ``name``.
+    Handlers must raise on failure so the job is retried.
+    """
+    def decorator(func):
+        HANDLERS[name] = JobType(name, func, concurrency, max_attempts, backoff, timeout, on_failure)
+        return func
+    return decorator
+
+
+class JobQueue:
+    """
+    Durable job queue stored in the Job table. Jobs are enqueued inside the
+    caller's transaction, so they only become visible to workers once the
+    data they refer to is committed, and survive worker restarts.
+    """
+
+    @staticmethod
+    def enqueue(name, *args, delay=0, run_at=None, dedupe_key=None, debounce=False):
+        """
+        Queue a job of type ``name``. With ``dedupe_key``, a job already queued
+        under the same key is returned instead of adding another; ``debounce``
+        also moves that job's run_at out to the new one, so it runs once a
+        burst of calls has settled. While ``JOB_QUEUE_MUTED`` is set the job is
+        returned unsaved.
+        """
+        job_type = HANDLERS.get(name)
+        if job_type is None:
+            raise ValueError(f"Unknown job type: {name}")
+        run_at = run_at or timezone.now() + timedelta(seconds=delay)
+        job = models.Job(
+            type=name, args=list(args), run_at=run_at, max_attempts=job_type.max_attempts, dedupe_key=dedupe_key
+        )
+        # Set by ai_loadtest: its writes must not queue jobs a real worker would run against the real providers.
+        if getattr(settings, "JOB_QUEUE_MUTED", False):
+            return job
+        if dedupe_key is None:
+            job.save()
+            return job
+        existing = JobQueue.pending(dedupe_key)
+        if existing is None:
+            try:
+                with transaction.atomic():
+                    job.save()
+                return job
+            except IntegrityError:
+                existing = JobQueue.pending(dedupe_key)
+        if existing is not None and debounce and existing.run_at < run_at:
+            models.Job.objects.filter(id=existing.id, status=choices.JobStatus.QUEUED).update(
+                run_at=run_at, updated_at=timezone.now()
+            )
+            existing.run_at = run_at
+        return existing
+
+    @staticmethod
+    def pending(dedupe_key):
+        return models.Job.objects.filter(dedupe_key=dedupe_key, status=choices.JobStatus.QUEUED).first()
+
+    @staticmethod
+    def cancel(job_id):
+        """Cancel a job that has not started yet. Returns True if it was cancelled."""
+        # Rows scheduled before the queue existed hold APScheduler job ids.
+        if not job_id or not str(job_id).isdigit():
+            return False
+        return bool(
+            models.Job.objects.filter(id=job_id, status=choices.JobStatus.QUEUED).update(
+                status=choices.JobStatus.CANCELLED, finished_at=timezone.now()
+            )
+        )
+
+    @staticmethod
+    def claim(worker_id, types=None, limit=None):
+        """
+        Lease due jobs to ``worker_id``, respecting each type's concurrency
+        across all workers. Running jobs are counted under a per-type lock
+        held until the leases commit, and a compare-and-set on the job row
+        makes sure two workers never lease the same job.
+        """
+        now = timezone.now()
+        types = [name for name in (types or HANDLERS) if name in HANDLERS]
+        claimed = []
+        for name in types:
+            job_type = HANDLERS[name]
+            if limit is not None and len(claimed) >= limit:
+                break
+            due = models.Job.objects.filter(type=name).filter(
+                Q(status=choices.JobStatus.QUEUED, run_at__lte=now)
+                | Q(status=choices.JobStatus.RUNNING, locked_until__lte=now)
+            ).order_by("run_at", "id")
+            with transaction.atomic():
+                JobQueue._lock_type(name)
+                running = models.Job.objects.filter(
+                    type=name, status=choices.JobStatus.RUNNING, locked_until__gt=now
+                ).count()
+                capacity = job_type.concurrency - running
+                if limit is not None:
+                    capacity = min(capacity, limit - len(claimed))
+                if capacity <= 0:
+                    continue
+                if connection.features.has_select_for_update_skip_locked:
+                    due = due.select_for_update(skip_locked=True)
+                for job in due[:capacity]:
+                    if job.status == choices.JobStatus.RUNNING and job.attempts >= job.max_attempts:
+                        job.last_error = f"Lease held by {job.locked_by} expired on the last attempt"
+                        JobQueue._failed(job, job_type, job.last_error)
+                        continue
+                    leased = models.Job.objects.filter(
+                        id=job.id, status=job.status, locked_until=job.locked_until
+                    ).update(
+                        status=choices.JobStatus.RUNNING,
+                        attempts=job.attempts + 1,
+                        locked_by=worker_id,
+                        locked_until=now + timedelta(seconds=job_type.timeout),
+                        updated_at=now,
+                    )
+                    if leased:
+                        job.status = choices.JobStatus.RUNNING
+                        job.attempts += 1
+                        job.locked_by = worker_id
+                        claimed.append(job)
+        return claimed
+
+    @staticmethod
+    def _lock_type(name):
+        """
+        Serialise claims of one job type until the transaction ends. Postgres
+        takes an advisory lock; SQLite serialises writers, so a competing
+        claim fails instead of over-leasing.
+        """
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [zlib.crc32(f"job_claim:{name}".encode())])
+
+    @staticmethod
+    def run(job):
+        """Run a leased job and record the outcome. Returns True on success."""
+        job_type = HANDLERS.get(job.type)
+        try:
+            if job_type is None:
+                raise ValueError(f"No handler registered for job type {job.type}")
+            job_type.func(*job.args)
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.type}) failed on attempt {job.attempts}: {str(e)}")
+            JobQueue._failed(job, job_type, traceback.format_exc())
+            return False
+        models.Job.objects.filter(id=job.id, locked_by=job.locked_by).update(
+            status=choices.JobStatus.DONE,
+            locked_until=None,
+            last_error=None,
+            finished_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+        return True
+
+    @staticmethod
+    def renew(jobs):
+        """Extend the leases of jobs this worker is still running, so they are not handed out again."""
+        now = timezone.now()
+        for job in jobs:
+            job_type = HANDLERS.get(job.type)
+            if job_type is not None:
+                models.Job.objects.filter(id=job.id, locked_by=job.locked_by, status=choices.JobStatus.RUNNING).update(
+                    locked_until=now + timedelta(seconds=job_type.timeout), updated_at=now
+                )
+
+    @staticmethod
+    def _failed(job, job_type, error):
+        now = timezone.now()
+        update = {"locked_until": None, "last_error": error, "updated_at": now}
+        final = job_type is None or job.attempts >= job.max_attempts
+        if final:
+            update.update(status=choices.JobStatus.FAILED, finished_at=now)
+        else:
+            delay = job_type.backoff * 2 ** (job.attempts - 1)
+            update.update(
+                status=choices.JobStatus.QUEUED,
+                run_at=now + timedelta(seconds=delay + random.uniform(0, delay / 2)),
+            )
+        leased = models.Job.objects.filter(id=job.id, locked_by=job.locked_by, status=choices.JobStatus.RUNNING)
+        try:
+            with transaction.atomic():
+                leased.update(**update)
+        except IntegrityError:
+            # A newer job was queued under the same dedupe_key while this one
+            # ran; it repeats the work, so it takes the place of the retry.
+            pending = JobQueue.pending(job.dedupe_key)
+            leased.update(
+                status=choices.JobStatus.CANCELLED,
+                locked_until=None,
+                last_error=f"{error}\nRetry superseded by job {pending.id if pending else None}",
+                finished_at=now,
+                updated_at=now,
+            )
+        if final and job_type is not None and job_type.on_failure is not None:
+            try:
+                job_type.on_failure(*job.args, error=error)
+            except Exception as e:
+                logger.error(f"Failure hook of job {job.id} ({job.type}) raised: {str(e)}")
+
+    @staticmethod
+    def stats():
+        """Queue depth per job type: counts by status and the age of the oldest due job."""
+        now = timezone.now()
+        result = {
+            name: {"concurrency": job_type.concurrency, "oldest_due_seconds": None}
+            for name, job_type in HANDLERS.items()
+        }
+        rows = models.Job.objects.values("type", "status").annotate(count=Count("id"))
+        for row in rows:
+            entry = result.setdefault(row["type"], {"concurrency": None, "oldest_due_seconds": None})
+            entry[choices.JobStatus(row["status"]).label.lower()] = row["count"]
+        oldest = (
+            models.Job.objects.filter(status=choices.JobStatus.QUEUED, run_at__lte=now)
+            .values("type").annotate(oldest=Min("run_at"))
+        )
+        for row in oldest:
+            result[row["type"]]["oldest_due_seconds"] = int((now - row["oldest"]).total_seconds())
+        return result
+
+    @staticmethod
+    def worker_id():
+        return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
@@ -0,0 +1,230 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from app.providers import provider
+
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def normalize(value):
+    """
+    Canonical form of prompt inputs for the cache key: whitespace collapsed,
+    case folded, and lists of strings sorted since their order carries no
+    meaning in our prompts (e.g. available ingredients).
+    """
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    if isinstance(value, dict):
+        return {str(key): normalize(item) for key, item in sorted(value.items())}
+    if isinstance(value, (list, tuple, set)):
+        items = [normalize(item) for item in value]
+        if all(isinstance(item, str) for item in items):
+            items.sort()
+        return items
+    return value
+
+
+def cache_key(operation, template, config, inputs, normalizer=normalize):
+    """Content address of an LLM call: AI provider, prompt template, model settings and normalized inputs."""
+    payload = json.dumps(
+        {
+            "operation": operation,
+            # Answers of the fake provider must never be served to real traffic.
+            "provider": provider(),
+            "template": hashlib.sha256(template.encode()).hexdigest(),
+            "config": config,
+            "inputs": normalizer(inputs),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return f"llm:{operation}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class LLMCache:
+    """
+    Caches LLM responses by content address. Entries live in a bounded
+    in-process LRU with a TTL and in the shared Django cache, so other
+    workers can reuse them. Concurrent identical calls are coalesced: one
+    caller goes upstream and the rest wait for its result.
+    """
+
+    def __init__(self, max_entries=1024, ttl=7 * 24 * 3600, alias="default"):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.alias = alias
+        self.entries = OrderedDict()
+        self.flights = {}
+        self.lock = threading.Lock()
+        self.counters = {}
+
+    def _count(self, operation, **increments):
+        with self.lock:
+            counters = self.counters.setdefault(
+                operation,
+                {
+                    "hits": 0,
+                    "shared_hits": 0,
+                    "coalesced": 0,
+                    "misses": 0,
+                    "errors": 0,
+                    "upstream_seconds": 0.0,
+                    "saved_seconds": 0.0,
+                },
+            )
+            for name, amount in increments.items():
+                counters[name] += amount
+
+    def _local_get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return _MISSING
+            value, cost, expires = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return _MISSING
+            self.entries.move_to_end(key)
+            return value, cost
+
+    def _local_set(self, key, value, cost):
+        with self.lock:
+            self.entries[key] = (value, cost, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def _shared_get(self, key):
+        try:
+            return caches[self.alias].get(key, _MISSING)
+        except Exception as e:
+            logger.error(f"Error reading LLM cache: {str(e)}")
+            return _MISSING
+
+    def _shared_set(self, key, value, cost):
+        try:
+            caches[self.alias].set(key, (value, cost), self.ttl)
+        except Exception as e:
+            logger.error(f"Error writing LLM cache: {str(e)}")
+
+    def get_or_call(self, operation, key, call):
+        """Return the cached response for ``key``, calling ``call()`` at most once across concurrent callers."""
+        cached = self._local_get(key)
+        if cached is not _MISSING:
+            self._count(operation, hits=1, saved_seconds=cached[1])
+            return cached[0]
+
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            self._count(operation, coalesced=1, saved_seconds=flight.value[1])
+            return flight.value[0]
+
+        try:
+            cached = self._shared_get(key)
+            if cached is not _MISSING:
+                value, cost = cached
+                self._local_set(key, value, cost)
+                self._count(operation, shared_hits=1, saved_seconds=cost)
+            else:
+                started = time.monotonic()
+                value = call()
+                cost = time.monotonic() - started
+                self._local_set(key, value, cost)
+                self._shared_set(key, value, cost)
+                self._count(operation, misses=1, upstream_seconds=cost)
+            flight.value = (value, cost)
+            return value
+        except Exception as e:
+            flight.error = e
+            self._count(operation, errors=1)
+            raise
+        finally:
+            with self.lock:
+                self.flights.pop(key, None)
+            flight.done.set()
+
+    def get_many(self, operation, keys):
+        """
+        Cached values for those of ``keys`` that have one, for callers that
+        batch their misses into a single upstream call themselves.
+        """
+        found = {}
+        missing = []
+        for key in keys:
+            cached = self._local_get(key)
+            if cached is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = cached[0]
+                self._count(operation, hits=1, saved_seconds=cached[1])
+        if missing:
+            try:
+                shared = caches[self.alias].get_many(missing)
+            except Exception as e:
+                logger.error(f"Error reading LLM cache: {str(e)}")
+                shared = {}
+            for key, (value, cost) in shared.items():
+                self._local_set(key, value, cost)
+                found[key] = value
+                self._count(operation, shared_hits=1, saved_seconds=cost)
+        return found
+
+    def set_many(self, operation, values, seconds):
+        """Store the results of one upstream call that answered all of ``values``, which took ``seconds``."""
+        if not values:
+            return
+        cost = seconds / len(values)
+        for key, value in values.items():
+            self._local_set(key, value, cost)
+        try:
+            caches[self.alias].set_many({key: (value, cost) for key, value in values.items()}, self.ttl)
+        except Exception as e:
+            logger.error(f"Error writing LLM cache: {str(e)}")
+        self._count(operation, misses=len(values), upstream_seconds=seconds)
+
+    def stats(self):
+        """Per-operation hit rate and upstream time saved, plus in-process cache occupancy."""
+        with self.lock:
+            operations = {name: dict(counters) for name, counters in self.counters.items()}
+            size = len(self.entries)
+        for counters in operations.values():
+            served = counters["hits"] + counters["shared_hits"] + counters["coalesced"]
+            total = served + counters["misses"]
+            counters["hit_rate"] = round(served / total, 4) if total else None
+            counters["upstream_seconds"] = round(counters["upstream_seconds"], 3)
+            counters["saved_seconds"] = round(counters["saved_seconds"], 3)
+        return {"entries": size, "max_entries": self.max_entries, "ttl": self.ttl, "operations": operations}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+llm_cache = LLMCache(
+    max_entries=getattr(settings, "LLM_CACHE_MAX_ENTRIES", 1024),
+    ttl=getattr(settings, "LLM_CACHE_TTL", 7 * 24 * 3600),
+    alias=getattr(settings, "LLM_CACHE_ALIAS", "default"),
+)
@@ -0,0 +1,234 @@
+import time
+import heapq
+import itertools
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+
+
+INTERACTIVE = 0
+BACKGROUND = 1
+
+_context = threading.local()
+
+
+class LLMCapacityExceeded(Exception):
+    """The tenant's LLM budget or the shared queue cannot take this call within its wait limit."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+def estimate_tokens(prompt, completion=0):
+    """Rough token count of a call: about four characters per prompt token plus the expected completion."""
+    return len(str(prompt)) // 4 + completion
+
+
+class TokenBucket:
+    """Budget refilled continuously at ``per_minute``; reservations may run it into debt."""
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until ``amount`` is available (capped at one full bucket)."""
+        self.refill(now)
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def remaining(self, now):
+        self.refill(now)
+        return max(0, int(self.level))
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount):
+        self.level = min(self.capacity, self.level + min(amount, self.capacity))
+
+
+class Tenant:
+    def __init__(self, concurrency, requests_per_minute, tokens_per_minute):
+        self.concurrency = concurrency
+        self.active = 0
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.rejected = 0
+        self.completed = 0
+
+
+class LLMScheduler:
+    """
+    Admission control in front of every OpenAI call made by this process.
+
+    Each restaurant gets its own concurrency limit and per-minute request
+    and token budgets, so one tenant bulk-editing recipes cannot use up
+    the shared rate limit. Calls wait for one of the global slots in a
+    priority queue where interactive (request) calls go ahead of background
+    jobs. A call that could not start within its priority's wait limit
+    (budget exhausted, or too many calls queued ahead) is rejected straight
+    away with a retry-after instead of timing out later.
+    """
+
+    def __init__(self):
+        self.lock = threading.Condition()
+        self.tenants = {}
+        self.queue = []
+        self.sequence = itertools.count()
+        self.active = 0
+        # Moving average of call duration, to estimate queueing time.
+        self.average_seconds = 5.0
+
+    @property
+    def max_concurrency(self):
+        return getattr(settings, "LLM_MAX_CONCURRENCY", 8)
+
+    def max_wait(self, priority):
+        if priority == INTERACTIVE:
+            return getattr(settings, "LLM_INTERACTIVE_MAX_WAIT", 20)
+        return getattr(settings, "LLM_BACKGROUND_MAX_WAIT", 600)
+
+    def tenant_state(self, tenant):
+        state = self.tenants.get(tenant)
+        if state is None:
+            state = self.tenants[tenant] = Tenant(
+                getattr(settings, "LLM_TENANT_CONCURRENCY", 3),
+                getattr(settings, "LLM_TENANT_REQUESTS_PER_MINUTE", 60),
+                getattr(settings, "LLM_TENANT_TOKENS_PER_MINUTE", 200000),
+            )
+        return state
+
+    def _runnable(self, entry):
+        """Whether ``entry`` is the first queued call whose tenant has a free slot, and a global slot is free."""
+        if self.active >= self.max_concurrency:
+            return False
+        for queued in sorted(self.queue):
+            if self.tenants[queued[2]].active < self.tenants[queued[2]].concurrency:
+                return queued is entry
+        return False
+
+    def acquire(self, tenant, tokens, priority):
+        max_wait = self.max_wait(priority)
+        with self.lock:
+            state = self.tenant_state(tenant)
+            now = time.monotonic()
+            budget_wait = max(state.requests.wait_time(1, now), state.tokens.wait_time(tokens, now))
+            ahead = sum(1 for queued in self.queue if queued[0] <= priority)
+            queue_wait = (ahead // self.max_concurrency) * self.average_seconds if ahead >= self.max_concurrency else 0
+            if budget_wait + queue_wait > max_wait:
+                state.rejected += 1
+                raise LLMCapacityExceeded(
+                    f"AI capacity for this restaurant is used up, retry in {int(budget_wait + queue_wait) + 1}s",
+                    budget_wait + queue_wait,
+                )
+            # Reserve the budget now so calls queued behind this one see it spent.
+            state.requests.take(1)
+            state.tokens.take(tokens)
+
+        if budget_wait:
+            time.sleep(budget_wait)
+
+        with self.lock:
+            entry = (priority, next(self.sequence), tenant)
+            heapq.heappush(self.queue, entry)
+            deadline = time.monotonic() + max_wait - budget_wait
+            while not self._runnable(entry):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.queue.remove(entry)
+                    heapq.heapify(self.queue)
+                    state.requests.give_back(1)
+                    state.tokens.give_back(tokens)
+                    state.rejected += 1
+                    self.lock.notify_all()
+                    raise LLMCapacityExceeded("AI service is busy, please retry shortly", self.average_seconds)
+                self.lock.wait(remaining)
+            self.queue.remove(entry)
+            heapq.heapify(self.queue)
+            self.active += 1
+            state.active += 1
+
+    def release(self, tenant, seconds):
+        with self.lock:
+            state = self.tenants[tenant]
+            self.active -= 1
+            state.active -= 1
+            state.completed += 1
+            self.average_seconds = 0.8 * self.average_seconds + 0.2 * seconds
+            self.lock.notify_all()
+
+    @contextmanager
+    def slot(self, tokens=0, context=None):
+        """
+        Hold a scheduler slot for one LLM call of about ``tokens`` tokens.
+        ``context`` (from ``current()``) carries tenant and priority into
+        threads that do not have the request's.
+        """
+        context = context or self.current()
+        self.acquire(context["tenant"], tokens, context["priority"])
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(context["tenant"], time.monotonic() - started)
+
+    def call(self, func, tokens=0, context=None):
+        with self.slot(tokens, context):
+            return func()
+
+    @contextmanager
+    def tenant(self, resturant_id, priority=BACKGROUND):
+        """Attribute LLM calls made inside the block (e.g. by a background job) to ``resturant_id``."""
+        previous = getattr(_context, "value", None)
+        _context.value = {"tenant": resturant_id, "priority": priority}
+        try:
+            yield
+        finally:
+            _context.value = previous
+
+    def current(self):
+        """Tenant and priority for calls from this thread: an explicit ``tenant()`` block, else the request user."""
+        # The request's user, as authenticated by DRF (which sets it on the Django request too).
+        from app.middleware import get_current_user
+
+        explicit = getattr(_context, "value", None)
+        if explicit is not None:
+            return explicit
+        user = get_current_user()
+        if user is not None and getattr(user, "is_authenticated", False):
+            return {"tenant": getattr(user, "resturant_id", None), "priority": INTERACTIVE}
+        return {"tenant": None, "priority": BACKGROUND}
+
+    def stats(self):
+        with self.lock:
+            now = time.monotonic()
+            return {
+                "active": self.active,
+                "max_concurrency": self.max_concurrency,
+                "queued": {
+                    "interactive": sum(1 for entry in self.queue if entry[0] == INTERACTIVE),
+                    "background": sum(1 for entry in self.queue if entry[0] == BACKGROUND),
+                },
+                "average_call_seconds": round(self.average_seconds, 2),
+                "tenants": {
+                    str(tenant): {
+                        "active": state.active,
+                        "concurrency": state.concurrency,
+                        "requests_remaining": state.requests.remaining(now),
+                        "tokens_remaining": state.tokens.remaining(now),
+                        "completed": state.completed,
+                        "rejected": state.rejected,
+                    }
+                    for tenant, state in self.tenants.items()
+                },
+            }
+
+
+llm_scheduler = LLMScheduler()
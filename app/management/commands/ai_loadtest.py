@@ -0,0 +1,197 @@
+import json
+import time
+import uuid
+import random
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Q
+from rest_framework.test import APIClient
+from app import models, utils, views
+from app.jobs import HANDLERS
+from app.llm_scheduler import llm_scheduler
+from app.providers import FAKE, FAKE_WINES
+from app.wine_index import WinePairingIndex
+
+
+SCENARIOS = ("generate_recipe", "wine_pairing", "spell_check", "enrichment")
+CUISINES = ("Italian", "French", "Thai", "Mexican", "Japanese", "Indian", "Greek", "Peruvian")
+PROTEINS = ("chicken", "salmon", "lamb", "tofu", "short ribs", "shrimp", "duck", "pork belly", "halibut", "mushrooms")
+SIDES = ("risotto", "polenta", "jasmine rice", "couscous", "mashed potatoes", "soba", "flatbread", "grilled corn")
+FLAVOURS = ("miso glaze", "chimichurri", "lemon butter", "red curry", "mole", "harissa", "pesto", "teriyaki")
+TYPOS = ("Chiken with lemmon buter", "Slow braized short ribs", "Pan seared salmon with asparagas", "Tomatoe basil soupe")
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else None
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the AI endpoints and enrichment jobs against the fake AI provider: runs each scenario "
+        "with concurrent clients and reports throughput and p50/p95/p99 latency"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenario", action="append", dest="scenarios", choices=SCENARIOS, help="Repeatable; default all")
+        parser.add_argument("--requests", type=int, default=50, help="Requests per scenario")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--user", help="Email of the user to call the endpoints as (default: first superuser)")
+        parser.add_argument("--chat-latency", type=float, help="Override FAKE_CHAT_LATENCY (seconds)")
+        parser.add_argument("--image-latency", type=float, help="Override FAKE_IMAGE_LATENCY (seconds)")
+        parser.add_argument("--failure-rate", type=float, help="Override FAKE_AI_FAILURE_RATE")
+        parser.add_argument("--seed", type=int, default=0, help="Seed for the generated inputs and the fakes")
+        parser.add_argument("--unthrottled", action="store_true", help="Lift the per-restaurant LLM budgets")
+        parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+        parser.add_argument(
+            "--allow-production", action="store_true", help="Run even though DEBUG is off (writes to this database)"
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["allow_production"]:
+            raise CommandError(
+                "DEBUG is off, so this looks like a production database; pass --allow-production to load test it anyway"
+            )
+        self.configure(options)
+        user = (
+            models.User.objects.filter(email=options["user"]).first()
+            if options["user"]
+            else models.User.objects.filter(is_superuser=True).first()
+        )
+        if user is None:
+            raise CommandError("No user to run the load test as; pass --user or create a superuser")
+
+        self.random = random.Random(options["seed"])
+        self.run_id = uuid.uuid4().hex[:8]
+        self.user = user
+        count = options["requests"]
+        # Wines above this id that only the fake pairings use are removed afterwards.
+        last_wine_id = models.Wine.objects.aggregate(Max("id"))["id__max"] or 0
+        recipes = [
+            models.Recipe.objects.create(
+                dish_name=f"Load test {self.run_id} {self.dish()}", resturant_id=user.resturant_id, user=user
+            )
+            for _ in range(count)
+        ]
+        results = {}
+        try:
+            for scenario in options["scenarios"] or SCENARIOS:
+                requests = [getattr(self, f"prepare_{scenario}")(recipes[i]) for i in range(count)]
+                results[scenario] = self.run(scenario, requests, options["concurrency"])
+                if not options["json"]:
+                    self.report(scenario, results[scenario])
+        finally:
+            self.cleanup([recipe.id for recipe in recipes], last_wine_id)
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+
+    @staticmethod
+    def cleanup(recipe_ids, last_wine_id):
+        """
+        Remove the load test's recipes and the fake wines it added, so real
+        pairings never reuse fake wine rows.
+        """
+        models.Recipe.objects.filter(id__in=recipe_ids).delete()
+        fake_wines = Q()
+        for name, wine_type, *_ in FAKE_WINES:
+            fake_wines |= Q(wine_name=name, wine_type=wine_type)
+        models.Wine.objects.filter(fake_wines, id__gt=last_wine_id, recipe_wine__isnull=True).delete()
+        index = WinePairingIndex.get(build=False)
+        if index is not None:
+            for recipe_id in recipe_ids:
+                index.remove(recipe_id)
+
+    def configure(self, options):
+        """
+        Switch this process to the fake provider, with the latency and failure
+        overrides, and stop its writes from queueing jobs for the real workers.
+        """
+        settings.AI_PROVIDER = FAKE
+        settings.JOB_QUEUE_MUTED = True
+        settings.FAKE_AI_SEED = options["seed"]
+        for option, name in (
+            ("chat_latency", "FAKE_CHAT_LATENCY"),
+            ("image_latency", "FAKE_IMAGE_LATENCY"),
+            ("failure_rate", "FAKE_AI_FAILURE_RATE"),
+        ):
+            if options[option] is not None:
+                setattr(settings, name, options[option])
+        if options["unthrottled"]:
+            settings.LLM_MAX_CONCURRENCY = max(settings.LLM_MAX_CONCURRENCY, options["concurrency"] * 2)
+            settings.LLM_TENANT_CONCURRENCY = settings.LLM_MAX_CONCURRENCY
+            settings.LLM_TENANT_REQUESTS_PER_MINUTE = 10 ** 6
+            settings.LLM_TENANT_TOKENS_PER_MINUTE = 10 ** 9
+            llm_scheduler.tenants.clear()
+        # Rebuilt on next use with the fake provider.
+        views.culinary_ai.llm = None
+        utils.culinaryAi.llm = None
+
+    def dish(self):
+        return f"{self.random.choice(FLAVOURS)} {self.random.choice(PROTEINS)} with {self.random.choice(SIDES)}"
+
+    def prepare_generate_recipe(self, recipe):
+        body = {
+            "available_ingredients": self.random.sample(PROTEINS + SIDES, 4),
+            "cuisine_style": self.random.choice(CUISINES),
+            "target_audience": f"load test {self.run_id}",
+            "price_range": self.random.randint(10, 60),
+        }
+        return "post", "/api/ai-recipe-generation/generate_recipe/", body
+
+    def prepare_wine_pairing(self, recipe):
+        body = {"dish_description": f"{self.dish()} and {self.random.choice(FLAVOURS)}", "recipe_id": recipe.id}
+        return "post", "/api/wine-pairing/get_wine_pairing/", body
+
+    def prepare_spell_check(self, recipe):
+        body = {
+            f"field_{index}": {"title": f"{self.random.choice(TYPOS)} {self.random.choice(PROTEINS)}", "index": index}
+            for index in range(5)
+        }
+        return "post", "/api/spell-check/", body
+
+    def prepare_enrichment(self, recipe):
+        return "job", "recipe_enrichment", recipe.id
+
+    def call(self, request):
+        """Latency of one request and whether it succeeded."""
+        kind, target, payload = request
+        started = time.monotonic()
+        try:
+            if kind == "job":
+                HANDLERS[target].func(payload)
+                ok = True
+            else:
+                client = APIClient()
+                client.force_authenticate(self.user)
+                ok = getattr(client, kind)(target, payload, format="json").status_code < 400
+        except Exception:
+            ok = False
+        finally:
+            connection.close()
+        return time.monotonic() - started, ok
+
+    def run(self, scenario, requests, concurrency):
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(self.call, requests))
+        elapsed = time.monotonic() - started
+        latencies = sorted(seconds for seconds, _ in outcomes)
+        return {
+            "requests": len(outcomes),
+            "errors": sum(1 for _, ok in outcomes if not ok),
+            "concurrency": concurrency,
+            "seconds": round(elapsed, 3),
+            "throughput_per_second": round(len(outcomes) / elapsed, 2) if elapsed else None,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+            "max_ms": round(latencies[-1] * 1000, 1),
+        }
+
+    def report(self, scenario, result):
+        self.stdout.write(
+            f"{scenario:<16} {result['requests']} requests, {result['errors']} errors, "
+            f"{result['throughput_per_second']}/s, p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms, "
+            f"p99 {result['p99_ms']}ms, max {result['max_ms']}ms"
+        )
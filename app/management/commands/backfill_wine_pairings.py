@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import signal
+import logging
+import threading
+from itertools import zip_longest
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from app import models
+from app.llm_scheduler import llm_scheduler, LLMCapacityExceeded
+from app.utils import culinaryAi, bulk_store_wine_pairings
+from app.wine_index import WinePairingIndex, recipe_description
+
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Spaces calls from all threads evenly at ``per_minute``."""
+
+    def __init__(self, per_minute):
+        self.interval = 60 / per_minute
+        self.next_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_at)
+            self.next_at = start + self.interval
+        time.sleep(start - now)
+
+
+class Checkpoint:
+    """Recipes already handled by earlier runs, in a JSON file written atomically after every batch."""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        self.failed = {}
+        if os.path.exists(path):
+            with open(path) as file:
+                data = json.load(file)
+            self.done = set(data.get("done", []))
+            self.failed = {int(recipe_id): error for recipe_id, error in data.get("failed", {}).items()}
+
+    def save(self):
+        data = {"updated_at": timezone.now().isoformat(), "done": sorted(self.done), "failed": self.failed}
+        with open(f"{self.path}.tmp", "w") as file:
+            json.dump(data, file)
+        os.replace(f"{self.path}.tmp", self.path)
+
+
+class Command(BaseCommand):
+    help = "Generate wine pairings for recipes that have none, restaurant by restaurant"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--resturant", type=int, action="append", dest="resturants", help="Only this restaurant (repeatable)")
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--rate", type=float, default=30, help="LLM calls per minute across all workers")
+        parser.add_argument("--batch-size", type=int, default=50, help="Pairings written (and checkpointed) per batch")
+        parser.add_argument("--limit", type=int, default=None)
+        parser.add_argument("--checkpoint", default="wine_pairing_backfill.json")
+        parser.add_argument("--retry-failed", action="store_true", help="Retry recipes that failed in an earlier run")
+        parser.add_argument("--max-attempts", type=int, default=3)
+        parser.add_argument("--dry-run", action="store_true", help="Only count the recipes missing pairings")
+
+    def handle(self, *args, **options):
+        checkpoint = Checkpoint(options["checkpoint"])
+        skip = checkpoint.done | (set() if options["retry_failed"] else set(checkpoint.failed))
+        recipes = models.Recipe.objects.filter(is_deleted=False, is_draft=False, wine_pairing__isnull=True)
+        if options["resturants"]:
+            recipes = recipes.filter(resturant_id__in=options["resturants"])
+
+        per_tenant = {}
+        for recipe_id, resturant_id in recipes.order_by("resturant_id", "id").values_list("id", "resturant_id"):
+            if recipe_id not in skip:
+                per_tenant.setdefault(resturant_id, []).append(recipe_id)
+        for resturant_id, recipe_ids in per_tenant.items():
+            self.stdout.write(f"Restaurant {resturant_id}: {len(recipe_ids)} recipes missing wine pairings")
+        if options["dry_run"]:
+            return
+
+        # Interleave restaurants so the workers spread over tenants instead of queueing on one tenant's budget.
+        tenants = [[(recipe_id, resturant_id) for recipe_id in recipe_ids] for resturant_id, recipe_ids in per_tenant.items()]
+        queue = [item for row in zip_longest(*tenants) for item in row if item is not None][:options["limit"]]
+        if not queue:
+            self.stdout.write(self.style.SUCCESS("Nothing to backfill"))
+            return
+
+        self.limiter = RateLimiter(options["rate"])
+        self.max_attempts = options["max_attempts"]
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        started = time.monotonic()
+        logger.info(f"Backfilling wine pairings for {len(queue)} recipes with {options['workers']} workers")
+        # Build the index up front; match() does not wait for it, so the first recipes would miss reuse.
+        WinePairingIndex.get()
+
+        pending = {}
+        descriptions = {}
+        stored = failed = 0
+        in_flight = set()
+        queued = iter(queue)
+        with ThreadPoolExecutor(max_workers=options["workers"]) as executor:
+            while True:
+                while not self.stopping and len(in_flight) < options["workers"] * 2:
+                    item = next(queued, None)
+                    if item is None:
+                        break
+                    in_flight.add(executor.submit(self.pair, *item))
+                if not in_flight:
+                    break
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    recipe_id, description, wine_pairing, error = future.result()
+                    if error is not None:
+                        checkpoint.failed[recipe_id] = error
+                        failed += 1
+                        continue
+                    pending[recipe_id] = wine_pairing
+                    descriptions[recipe_id] = description
+                if len(pending) >= options["batch_size"] or (not in_flight and pending):
+                    stored += self.flush(pending, descriptions, checkpoint)
+                    self.stdout.write(f"Stored {stored}/{len(queue)} pairings ({failed} failed)")
+        if pending:
+            stored += self.flush(pending, descriptions, checkpoint)
+        checkpoint.save()
+        connection.close()
+        self.stdout.write(
+            self.style.SUCCESS(f"Stored {stored} wine pairings, {failed} failed, in {time.monotonic() - started:.0f}s")
+        )
+
+    def pair(self, recipe_id, resturant_id):
+        """Pairing for one recipe as ``(recipe_id, description, pairing JSON, error)``."""
+        try:
+            recipe = models.Recipe.objects.prefetch_related("recipe_ingredient", "predefined_ingredients").get(id=recipe_id)
+            description = recipe_description(recipe)
+            match = WinePairingIndex.match(description, recipe_id=recipe_id)
+            if match is not None:
+                return recipe_id, description, match.as_json(), None
+            for attempt in range(1, self.max_attempts + 1):
+                self.limiter.wait()
+                try:
+                    with llm_scheduler.tenant(resturant_id):
+                        return recipe_id, description, culinaryAi.get_wine_pairing(description), None
+                except LLMCapacityExceeded as e:
+                    if attempt == self.max_attempts or self.stopping:
+                        raise
+                    time.sleep(e.retry_after)
+        except Exception as e:
+            logger.error(f"Error generating wine pairing for recipe {recipe_id}: {str(e)}")
+            return recipe_id, None, None, str(e)
+        finally:
+            connection.close()
+
+    @staticmethod
+    def flush(pending, descriptions, checkpoint):
+        """Write the pending pairings in one bulk store and checkpoint them."""
+        try:
+            result = bulk_store_wine_pairings(pending, descriptions)
+        except Exception as e:
+            logger.error(f"Error storing wine pairings: {str(e)}")
+            for recipe_id in pending:
+                checkpoint.failed[recipe_id] = str(e)
+            result = {}
+        else:
+            for recipe_id in pending:
+                if recipe_id in result:
+                    checkpoint.done.add(recipe_id)
+                    checkpoint.failed.pop(recipe_id, None)
+                else:
+                    checkpoint.failed[recipe_id] = "No usable wines in the pairing"
+        pending.clear()
+        descriptions.clear()
+        checkpoint.save()
+        return len(result)
+
+    def stop(self, signum, frame):
+        logger.info("Wine pairing backfill stopping after in-flight recipes")
+        self.stopping = True
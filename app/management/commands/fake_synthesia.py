@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from app.providers import fake_synthesia_server
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local fake of the Synthesia API for offline video generation. Point "
+        "SYNTHESIA_URL at http://localhost:<port>/v2/videos/fromTemplate and "
+        "SYNTHESIA_API_URL at http://localhost:<port>/v2 (or set AI_PROVIDER=fake to run one in-process)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--render-seconds", type=float, default=30, help="Time until a video is complete")
+        parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of videos that end up failed")
+        parser.add_argument("--video-mb", type=float, default=0, help="Size of the served video, to exercise streaming")
+
+    def handle(self, *args, **options):
+        server = fake_synthesia_server(
+            options["port"],
+            options["render_seconds"],
+            options["fail_rate"],
+            int(options["video_mb"] * 1024 * 1024),
+            host="0.0.0.0",
+        )
+        self.stdout.write(self.style.SUCCESS(f"Fake Synthesia listening on http://localhost:{options['port']}/v2"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
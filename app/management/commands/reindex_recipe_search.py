@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from app import models
+from app.search import RecipeSearchService
+
+
+class Command(BaseCommand):
+    help = "Rebuild the recipe full-text search index"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        recipe_ids = list(models.Recipe.objects.order_by("id").values_list("id", flat=True))
+        for start in range(0, len(recipe_ids), batch_size):
+            RecipeSearchService.index(recipe_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {len(recipe_ids)} recipes"))
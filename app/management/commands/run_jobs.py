@@ -0,0 +1,105 @@
+import json
+import time
+import signal
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from django.core.management.base import BaseCommand
+from django.db import connection
+from app.jobs import HANDLERS, JobQueue
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run every job that is due, then exit")
+        parser.add_argument("--stats", action="store_true", help="Print queue depth per job type and exit")
+        parser.add_argument("--type", action="append", dest="types", help="Only run jobs of this type (repeatable)")
+        parser.add_argument("--threads", type=int, default=None, help="Worker threads (default: sum of type concurrency)")
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            self.stdout.write(json.dumps(JobQueue.stats(), indent=2))
+            return
+
+        types = options["types"] or list(HANDLERS)
+        unknown = [name for name in types if name not in HANDLERS]
+        if unknown:
+            self.stderr.write(f"Unknown job types: {', '.join(unknown)}")
+            return
+        threads = options["threads"] or sum(HANDLERS[name].concurrency for name in types)
+        worker_id = JobQueue.worker_id()
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        logger.info(f"Job worker {worker_id} started for {', '.join(types)} with {threads} threads")
+
+        processed = 0
+        in_flight = set()
+        running = {}
+        # Renew leases well before the shortest one runs out.
+        renew_every = min(HANDLERS[name].timeout for name in types) / 3
+        renewed_at = time.monotonic()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            while not self.stopping:
+                free = threads - len(in_flight)
+                try:
+                    jobs = JobQueue.claim(worker_id, types, limit=free) if free else []
+                except Exception as e:
+                    # e.g. a dropped connection or "database is locked"; try again after a pause.
+                    logger.error(f"Error claiming jobs: {str(e)}")
+                    connection.close()
+                    jobs = []
+                    time.sleep(options["poll_interval"] * 5)
+                for job in jobs:
+                    future = executor.submit(self.run_job, job)
+                    in_flight.add(future)
+                    running[future] = job
+                if not in_flight:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+                done, in_flight = wait(in_flight, timeout=options["poll_interval"], return_when=FIRST_COMPLETED)
+                processed += len(done)
+                for future in done:
+                    running.pop(future, None)
+                if running and time.monotonic() - renewed_at > renew_every:
+                    self.renew(list(running.values()))
+                    renewed_at = time.monotonic()
+            # Let leased jobs finish so they are not left to expire.
+            while in_flight:
+                done, in_flight = wait(in_flight, timeout=renew_every)
+                processed += len(done)
+                for future in done:
+                    running.pop(future, None)
+                if running:
+                    self.renew(list(running.values()))
+        connection.close()
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} jobs"))
+
+    @staticmethod
+    def run_job(job):
+        try:
+            return JobQueue.run(job)
+        except Exception as e:
+            # JobQueue.run records handler errors itself; this is the queue failing to record them.
+            logger.error(f"Error running job {job.id} ({job.type}): {str(e)}")
+            return False
+        finally:
+            connection.close()
+
+    @staticmethod
+    def renew(jobs):
+        try:
+            JobQueue.renew(jobs)
+        except Exception as e:
+            logger.error(f"Error renewing job leases: {str(e)}")
+
+    def stop(self, signum, frame):
+        logger.info("Job worker stopping after in-flight jobs")
+        self.stopping = True
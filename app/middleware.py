@@ -1,6 +1,7 @@
 import threading
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from app.utils import set_current_user
+from app.audit import AuditCollector
 
 _request = threading.local()
 
@@ -42,3 +43,19 @@ class CurrentUserMiddleware:
         except Exception as e:
             print(f"Error Extracting user: {e}")
         return user
+
+
+class AuditMiddleware:
+    """Scopes the recipe audit collector to the request and writes it out at the end."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        AuditCollector.begin()
+        try:
+            response = self.get_response(request)
+            AuditCollector.flush(getattr(request, "user", None))
+            return response
+        finally:
+            AuditCollector.clear()
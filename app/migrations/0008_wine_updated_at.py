@@ -0,0 +1,18 @@
+# Generated by Django 4.2.6 on 2026-10-18 16:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_recipedocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wine',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.6 on 2026-10-18 15:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_wine_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loginlog',
+            index=models.Index(fields=['timestamp', 'id'], name='loginlog_timestamp_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['created_at', 'id'], name='notification_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['created_at', 'id'], name='recipe_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe_process_audit',
+            index=models.Index(fields=['created_at', 'id'], name='recipe_audit_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['created_at', 'id'], name='task_created_id_idx'),
+        ),
+    ]
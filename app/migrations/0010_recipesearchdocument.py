@@ -0,0 +1,64 @@
+# Generated by Django 4.2.6 on 2026-10-18 15:56
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import UnaccentExtension
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        # "simple" with accents stripped, matching the SQLite table's remove_diacritics.
+        schema_editor.execute("CREATE TEXT SEARCH CONFIGURATION app_unaccent (COPY = simple)")
+        schema_editor.execute(
+            "ALTER TEXT SEARCH CONFIGURATION app_unaccent ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple"
+        )
+        schema_editor.execute(
+            "CREATE INDEX recipe_search_vector_gin ON app_recipesearchdocument USING gin (search_vector)"
+        )
+    elif schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE app_recipesearch_fts USING fts5(title, body, keywords, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS recipe_search_vector_gin")
+        schema_editor.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS app_unaccent")
+    elif schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS app_recipesearch_fts")
+
+
+def backfill_search_documents(apps, schema_editor):
+    from app.search import RecipeSearchService
+
+    Recipe = apps.get_model("app", "Recipe")
+    recipe_ids = list(Recipe.objects.order_by("id").values_list("id", flat=True))
+    for start in range(0, len(recipe_ids), 500):
+        RecipeSearchService.index(recipe_ids[start:start + 500], apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        migrations.CreateModel(
+            name='RecipeSearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.TextField(blank=True, default='')),
+                ('body', models.TextField(blank=True, default='')),
+                ('keywords', models.TextField(blank=True, default='')),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='app.recipe')),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+from django.contrib.postgres.operations import TrigramExtension, UnaccentExtension
+from django.db import migrations
+
+
+# unaccent() is only STABLE, so it cannot back an index directly; wrap it
+# (with its dictionary pinned) in an IMMUTABLE function.
+CREATE_FUNCTION = """
+CREATE OR REPLACE FUNCTION app_unaccent_lower(text) RETURNS text AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, lower($1))
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+"""
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(CREATE_FUNCTION)
+    schema_editor.execute(
+        "CREATE INDEX predefined_ingredient_name_trgm ON app_predefined_ingredients "
+        "USING gin (app_unaccent_lower(name) gin_trgm_ops)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX ingredient_title_trgm ON app_ingredient "
+        "USING gin (app_unaccent_lower(title) gin_trgm_ops)"
+    )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS ingredient_title_trgm")
+    schema_editor.execute("DROP INDEX IF EXISTS predefined_ingredient_name_trgm")
+    schema_editor.execute("DROP FUNCTION IF EXISTS app_unaccent_lower(text)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_recipesearchdocument'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        UnaccentExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
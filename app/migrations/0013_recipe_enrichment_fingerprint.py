@@ -0,0 +1,26 @@
+# Generated by Django 4.2.6 on 2026-10-18 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_job'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='job',
+            name='job_active_dedupe_key_uniq',
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='enrichment_fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=40, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'QD')), fields=('dedupe_key',), name='job_queued_dedupe_key_uniq'),
+        ),
+    ]
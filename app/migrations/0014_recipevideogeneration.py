@@ -0,0 +1,38 @@
+# Generated by Django 4.2.6 on 2026-10-18 16:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_recipe_enrichment_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeVideoGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('QD', 'Queued'), ('RD', 'Rendering'), ('CP', 'Completed'), ('FL', 'Failed')], default='QD', max_length=2)),
+                ('params', models.JSONField(default=dict)),
+                ('synthesia_video_id', models.CharField(blank=True, max_length=64, null=True)),
+                ('synthesia_status', models.CharField(blank=True, max_length=32, null=True)),
+                ('polls', models.PositiveIntegerField(default=0)),
+                ('next_poll_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('job', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app.job')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='video_generations', to='app.recipe')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='video_generations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'abstract': False,
+            },
+        ),
+    ]
@@ -4,6 +4,7 @@ from django.utils.translation import gettext as _
 from django.utils import timezone
 from datetime import date, timedelta
 from app import choices
+from django.contrib.postgres.search import SearchVectorField
 class BaseModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
@@ -122,6 +123,8 @@ class Wine(models.Model):
     reason_for_pairing = models.TextField(default="")
     proteins = models.CharField(max_length=255,null=True,blank=True)
     region_name = models.CharField(max_length=255,null=True,blank=True)
+    # Recipe ETags include the version of their wines (app/etags.py).
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ['wine_name', 'wine_type']
@@ -193,6 +196,11 @@ class Recipe(BaseModel):
     foodCostPct= models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     salePrice= models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     manualCostPerServing= models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    # Hash of the inputs the last AI enrichment ran with; written with .update().
+    enrichment_fingerprint = models.CharField(max_length=40, null=True, blank=True, editable=False)
+
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=["created_at", "id"], name="recipe_created_id_idx")]
 
     def __str__(self):
         return self.dish_name if self.dish_name else "N/A" + " " + str(self.id)
@@ -201,6 +209,8 @@ class recipe_images(BaseModel):
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name="recipe_image")
     image = models.ImageField(upload_to="recipe_image",null=True,blank=True)
     image_url = models.URLField(null=True, blank=True, max_length=500)
+    # Resized derivatives written by the image_variants job (app/images.py).
+    image_variants = models.JSONField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return str(self.id) + " " + str(self.recipe.dish_name + " " + str(self.recipe.id))
@@ -242,6 +252,8 @@ class Starch_Preparation(BaseModel):
     image = models.ImageField(upload_to="starch_preparation", null=True, blank=True)
     title = models.CharField(max_length=256,null=True,blank=True)
     image_url = models.URLField(null=True, blank=True, max_length=500)
+    # Resized derivatives written by the image_variants job (app/images.py).
+    image_variants = models.JSONField(null=True, blank=True, editable=False)
     def __str__(self):
         return self.title + " " + str(self.id)
     
@@ -256,6 +268,8 @@ class Design_Your_Plate(BaseModel):
     image = models.ImageField(upload_to="design_your_plate", null=True, blank=True)
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name="recipe_Design_your_plate")
     image_url = models.URLField(null=True, blank=True, max_length=500)
+    # Resized derivatives written by the image_variants job (app/images.py).
+    image_variants = models.JSONField(null=True, blank=True, editable=False)
     def __str__(self):
         return str(self.id)
     
@@ -288,6 +302,9 @@ class Recipe_Process_Audit(BaseModel):
     datetime = models.DateTimeField(default=timezone.now)
     resturant = models.ForeignKey(Resturant, on_delete=models.SET_NULL, related_name="recipe_audit_restaurant", null=True, blank=True)
 
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=["created_at", "id"], name="recipe_audit_created_id_idx")]
+
     def __str__(self):
         return self.changes_made + self.changed_by.username
 
@@ -334,6 +351,9 @@ class Task(BaseModel):
     image_url = models.URLField(null=True, blank=True, max_length=500)
     video = models.URLField(null=True, blank=True, max_length=500)
     resturant = models.ForeignKey(Resturant, on_delete=models.SET_NULL, related_name="task_restaurant", null=True, blank=True)
+
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=["created_at", "id"], name="task_created_id_idx")]
     
     def __str__(self):
         return str(self.id) + " " +self.task_name.dish_name + self.staff.username
@@ -349,6 +369,9 @@ class Notification(BaseModel):
     related_dish = models.ForeignKey(to=Recipe, on_delete=models.CASCADE, related_name="related_dish")
     seen_by_users = models.ManyToManyField(User, related_name="seen_notifications")
 
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=["created_at", "id"], name="notification_created_id_idx")]
+
     def __str__(self):
         return self.title + " " + str(self.id)
 
@@ -369,6 +392,8 @@ class Menu(BaseModel):
     description = models.TextField(null=True,blank=True)
     image = models.ImageField(upload_to='menu/',null=True,blank=True)    
     image_url = models.URLField(null=True, blank=True, max_length=500)
+    # Resized derivatives written by the image_variants job (app/images.py).
+    image_variants = models.JSONField(null=True, blank=True, editable=False)
     def __str__(self):
         return str(self.id) + " " + self.title + " " + self.description
     
@@ -410,6 +435,9 @@ class LoginLog(models.Model):
     user_agent = models.TextField(null=True, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["timestamp", "id"], name="loginlog_timestamp_id_idx")]
+
     def __str__(self):
         return f"{self.user.username} - {self.timestamp}"
 
@@ -467,7 +495,85 @@ class EditorTemplate(BaseModel):
 class EditorImage(BaseModel):
     resturant = models.ForeignKey(Resturant, on_delete=models.CASCADE, related_name="editor_image_restaurant", null=True, blank=True)
     image = models.URLField(null=True, blank=True, max_length=500)
+    # Resized derivatives written by the image_variants job (app/images.py).
+    image_variants = models.JSONField(null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Editor Image"
-        verbose_name_plural = "Editor Images"
\ No newline at end of file
+        verbose_name_plural = "Editor Images"
+
+class RecipeDocument(models.Model):
+    recipe = models.OneToOneField(Recipe, on_delete=models.CASCADE, related_name="document")
+    document = models.JSONField(null=True, blank=True)
+    generation = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.recipe_id} (generation {self.generation})"
+
+
+class RecipeSearchDocument(models.Model):
+    recipe = models.OneToOneField(Recipe, on_delete=models.CASCADE, related_name="search_document")
+    title = models.TextField(default="", blank=True)
+    body = models.TextField(default="", blank=True)
+    keywords = models.TextField(default="", blank=True)
+    # Postgres only; the GIN index (or the SQLite FTS5 table) is created by
+    # migration 0009 depending on the database vendor.
+    search_vector = SearchVectorField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.recipe_id} {self.title}"
+
+
+class Job(models.Model):
+    type = models.CharField(max_length=64)
+    args = models.JSONField(default=list, blank=True)
+    status = models.CharField(max_length=2, choices=choices.JobStatus.choices, default=choices.JobStatus.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    # A running job whose lease has expired is picked up again (at-least-once).
+    locked_by = models.CharField(max_length=128, null=True, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    # At most one queued job per key. A running job does not count: it may
+    # already have read the inputs a newer job is queued for.
+    dedupe_key = models.CharField(max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="job_status_run_at_idx"),
+            models.Index(fields=["type", "status"], name="job_type_status_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["dedupe_key"],
+                condition=models.Q(status=choices.JobStatus.QUEUED),
+                name="job_queued_dedupe_key_uniq",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.type}{self.args} ({self.get_status_display()})"
+
+
+class RecipeVideoGeneration(BaseModel):
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name="video_generations")
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, related_name="video_generations", null=True, blank=True)
+    status = models.CharField(max_length=2, choices=choices.VideoGenerationStatus.choices, default=choices.VideoGenerationStatus.QUEUED)
+    # Validated RecipeVideoGenerationSerializer data the Synthesia payload is built from.
+    params = models.JSONField(default=dict)
+    synthesia_video_id = models.CharField(max_length=64, null=True, blank=True)
+    synthesia_status = models.CharField(max_length=32, null=True, blank=True)
+    polls = models.PositiveIntegerField(default=0)
+    next_poll_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    # Job currently responsible for moving this generation forward.
+    job = models.ForeignKey(Job, on_delete=models.SET_NULL, related_name="+", null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.recipe_id} {self.get_status_display()}"
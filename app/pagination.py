@@ -1,4 +1,11 @@
+import json
+import base64
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 
 
 class CustomPageNumberPagination(PageNumberPagination):
@@ -11,3 +18,121 @@ class CustomPageNumberPagination(PageNumberPagination):
         response = super().get_paginated_response(data)
         response.data["page"] = self.page.number
         return response
+
+
+class KeysetPagination(CustomPageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset mode.
+
+    Sending ``?cursor=`` (empty for the first page) switches to keyset mode:
+    rows are ordered by ``keyset_ordering`` (view attribute, default
+    ``(-created_at, -id)``) and each page seeks past the last row of the
+    previous one instead of using OFFSET, so deep pages cost the same as the
+    first. The response keeps the page-number shape; ``count`` is None since
+    no COUNT(*) is run, and ``next``/``previous`` carry opaque cursors.
+    Client-chosen orderings cannot be seeked and are rejected with 400.
+    """
+
+    cursor_query_param = "cursor"
+    keyset_ordering = ("-created_at", "-id")
+    invalid_cursor_message = "Invalid cursor."
+    unsupported_ordering_message = "Cursor pagination cannot be combined with ?ordering= or ?search=; use ?page= instead."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        if self.ordered_by_client(queryset, request):
+            raise ValidationError({self.cursor_query_param: [self.unsupported_ordering_message]})
+        self.request = request
+        self.ordering = tuple(getattr(view, "keyset_ordering", self.keyset_ordering))
+        page_size = self.get_page_size(request)
+        values, self.page_number, backwards = self.decode_cursor(request, queryset.model)
+
+        ordering = self.ordering
+        if backwards:
+            ordering = tuple(field[1:] if field.startswith("-") else f"-{field}" for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, values))
+
+        rows = list(queryset[: page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if backwards:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+
+        self.first_row = rows[0] if rows else None
+        self.last_row = rows[-1] if rows else None
+        return rows
+
+    @staticmethod
+    def ordered_by_client(queryset, request):
+        """Whether the rows are ordered by something other than ``keyset_ordering``."""
+        # Search results are ranked by relevance (RecipeSearchService.filter).
+        return bool(request.query_params.get(api_settings.ORDERING_PARAM)) or "search_rank" in queryset.query.annotations
+
+    @staticmethod
+    def seek_filter(ordering, values):
+        """Rows strictly after ``values`` in ``ordering`` (row-value comparison)."""
+        condition = Q()
+        for index in reversed(range(len(ordering))):
+            field = ordering[index].lstrip("-")
+            lookup = "lt" if ordering[index].startswith("-") else "gt"
+            step = Q(**{f"{field}__{lookup}": values[index]})
+            if index < len(ordering) - 1:
+                step |= Q(**{field: values[index]}) & condition
+            condition = step
+        return condition
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, 1, False
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            cursor = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            fields = [model._meta.get_field(field.lstrip("-")) for field in self.ordering]
+            if len(cursor["v"]) != len(fields):
+                raise ValueError
+            values = [field.to_python(value) for field, value in zip(fields, cursor["v"])]
+            return values, int(cursor["p"]), cursor["d"] == "prev"
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, page_number, direction):
+        # isoformat() keeps microseconds; the seek needs the exact value.
+        values = [getattr(row, field.lstrip("-")) for field in self.ordering]
+        values = [value.isoformat() if hasattr(value, "isoformat") else value for value in values]
+        cursor = json.dumps({"v": values, "p": page_number, "d": direction})
+        encoded = base64.urlsafe_b64encode(cursor.encode()).decode().rstrip("=")
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or self.last_row is None:
+            return None
+        return self.encode_cursor(self.last_row, self.page_number + 1, "next")
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or self.first_row is None:
+            return None
+        return self.encode_cursor(self.first_row, max(self.page_number - 1, 1), "prev")
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            "count": None,
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+            "page": self.page_number,
+        })
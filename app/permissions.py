@@ -70,4 +70,8 @@ class IsSubscribedORSuperUser(BasePermission):
         if not user.resturant.plan_end_date or user.resturant.plan_end_date <= timezone.now().date():
             raise PermissionDenied("Your restaurant's subscription has expired. Please renew it to continue.")
         
-        return True
\ No newline at end of file
+        return True
+
+class IsSuperUser(BasePermission):
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.is_superuser
@@ -0,0 +1,386 @@
+import io
+import json
+import base64
+import time
+import uuid
+import random
+import hashlib
+import logging
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from PIL import Image as PILImage
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from app import clients
+
+
+logger = logging.getLogger(__name__)
+
+OPENAI = "openai"
+FAKE = "fake"
+
+
+def provider():
+    """The AI backend in use: ``openai``, or ``fake`` for deterministic local fakes (``AI_PROVIDER``)."""
+    return getattr(settings, "AI_PROVIDER", OPENAI)
+
+
+def is_fake():
+    return provider() == FAKE
+
+
+class FakeProviderError(Exception):
+    """A failure injected by a fake backend (``FAKE_AI_FAILURE_RATE``)."""
+
+
+class FakeBackend:
+    """
+    Latency and failures of a fake backend: each call takes ``latency``
+    seconds give or take ``jitter`` (a fraction of it) and fails with
+    probability ``failure_rate``. Randomness is seeded so runs repeat.
+    """
+
+    def __init__(self, latency, jitter=None, failure_rate=None, seed=None):
+        self.latency = latency
+        self.jitter = getattr(settings, "FAKE_AI_JITTER", 0.3) if jitter is None else jitter
+        self.failure_rate = getattr(settings, "FAKE_AI_FAILURE_RATE", 0.0) if failure_rate is None else failure_rate
+        self.random = random.Random(getattr(settings, "FAKE_AI_SEED", 0) if seed is None else seed)
+        self.lock = threading.Lock()
+
+    def delay(self):
+        with self.lock:
+            return max(0.0, self.latency * (1 + self.random.uniform(-self.jitter, self.jitter)))
+
+    def maybe_fail(self):
+        with self.lock:
+            failed = self.random.random() < self.failure_rate
+        if failed:
+            raise FakeProviderError("Fake provider failure (503 Service Unavailable)")
+
+    def call(self):
+        """Wait for one call's latency, then fail it if it is one of the unlucky ones."""
+        time.sleep(self.delay())
+        self.maybe_fail()
+
+
+def digest(text, size=8):
+    return hashlib.sha256(text.encode()).hexdigest()[:size]
+
+
+def choose(options, seed):
+    return options[int(digest(seed), 16) % len(options)]
+
+
+FAKE_WINES = (
+    ("Barolo", "Red Wine", "earthy", "full bodied", "beef", "italy"),
+    ("Chablis", "White Wine", "acidic", "light", "fish", "france"),
+    ("Rioja Reserva", "Red Wine", "spicy", "medium bodied", "lamb", "spain"),
+    ("Riesling Kabinett", "White Wine", "fruity", "delicate", "pork", "germany"),
+    ("Pinot Noir", "Red Wine", "earthy", "light", "duck", "france"),
+    ("Prosecco", "Sparkling Wine", "crisp", "light", "vegetable", "italy"),
+    ("Sauternes", "Dessert Wine", "sweet", "creamy", "chocolate (Dark)", "france"),
+    ("Malbec", "Red Wine", "bold", "full bodied", "beef", "argentina"),
+)
+
+
+def fake_wine_pairing(prompt):
+    first = int(digest(prompt), 16) % len(FAKE_WINES)
+    wines = [FAKE_WINES[first], FAKE_WINES[(first + 1) % len(FAKE_WINES)]]
+    return json.dumps(
+        [
+            {
+                "wine_name": name,
+                "wine_type": wine_type,
+                "flavor": flavor,
+                "profile": profile,
+                "reason_for_pairing": f"The {flavor} notes of the {name} balance the dish.",
+                "proteins": proteins,
+                "region_name": region,
+            }
+            for name, wine_type, flavor, profile, proteins, region in wines
+        ]
+    )
+
+
+def fake_menu(prompt):
+    dish = f"{choose(('Braised', 'Roasted', 'Seared', 'Grilled'), prompt)} {choose(('Chicken', 'Salmon', 'Lamb', 'Tofu'), prompt + 'x')}"
+    return json.dumps(
+        {
+            "welcome": "WELCOME",
+            "to": "TO",
+            "plateprep": "PLATEPREP",
+            "training_phrase": "THIS IS THE TRAINING VIDEO OF",
+            "ingridiants_start": "Let's start by gathering our ingredients. You'll need:",
+            "cuisine_style": "",
+            "menu_class": "",
+            "dish_name": f"{dish} {digest(prompt, 4).upper()}",
+            "description": f"{dish} finished with a pan sauce.",
+            "win_pairings": [FAKE_WINES[0][0], FAKE_WINES[1][0]],
+            "ingredients": [
+                {"Ingredient name": "olive oil", "Quantity": "1", "Unit": "tbsp"},
+                {"Ingredient name": dish.split()[-1].lower(), "Quantity": "6", "Unit": "oz"},
+            ],
+            "essentials_needed": [{"Equipment name": "saute pan", "Quantity": "1"}],
+            "steps": ["Preheat the pan.", "Sear on both sides.", "Rest and slice."],
+            "starch_preparation": "Warm the starch in a second pan.",
+            "plating_instructions": "Plate the starch first and the protein on top.",
+            "food_cost": "$12",
+        }
+    )
+
+
+def fake_reply(prompt, json_mode=False):
+    """A deterministic answer to one of our prompts, in the shape the real model is asked for."""
+    if json_mode:
+        # Batched spell check: the texts are the JSON object on the last line; echo them uncorrected.
+        lines = [line for line in prompt.splitlines() if line.strip()]
+        try:
+            return json.dumps(json.loads(lines[-1]))
+        except (IndexError, ValueError):
+            return "{}"
+    if "Translate the following JSON object" in prompt:
+        menu = prompt.split("return the full JSON in the same structure:", 1)[-1]
+        return menu.split("CRITICAL REQUIREMENTS", 1)[0].strip()
+    if '"wine_name"' in prompt:
+        return fake_wine_pairing(prompt)
+    if '"plateprep"' in prompt:
+        return fake_menu(prompt)
+    if "spelling correction" in prompt or "spelling mistakes" in prompt:
+        return prompt.rsplit("input ", 1)[-1].strip()
+    return "OK"
+
+
+def fake_png(prompt, size=512):
+    """A solid-colour PNG whose colour depends on ``prompt``, base64 encoded like the image API returns."""
+    color = tuple(bytes.fromhex(digest(prompt, 6)))
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (size, size), color).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+class FakeChatModel(BaseChatModel):
+    """LangChain chat model answering with ``fake_reply``; streams it in 16-character chunks."""
+
+    backend: FakeBackend
+
+    @property
+    def _llm_type(self):
+        return "fake"
+
+    @staticmethod
+    def prompt(messages):
+        return "\n".join(str(message.content) for message in messages)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.backend.call()
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=fake_reply(self.prompt(messages))))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        text = fake_reply(self.prompt(messages))
+        chunks = [text[i:i + 16] for i in range(0, len(text), 16)] or [""]
+        delay = self.backend.delay()
+        # About a tenth of the latency before the first token, the rest spread over the chunks.
+        time.sleep(delay * 0.1)
+        self.backend.maybe_fail()
+        for chunk in chunks:
+            time.sleep(delay * 0.9 / len(chunks))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+
+class FakeOpenAI:
+    """
+    The parts of the OpenAI client we use (``chat.completions.create`` and
+    ``responses.create`` with the image generation tool), answered locally.
+    """
+
+    def __init__(self):
+        self.chat_backend = FakeBackend(getattr(settings, "FAKE_CHAT_LATENCY", 1.0))
+        self.image_backend = FakeBackend(getattr(settings, "FAKE_IMAGE_LATENCY", 5.0))
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create_completion))
+        self.responses = SimpleNamespace(create=self.create_response)
+
+    def create_completion(self, model, messages, response_format=None, **kwargs):
+        self.chat_backend.call()
+        prompt = "\n".join(message["content"] for message in messages)
+        content = fake_reply(prompt, json_mode=(response_format or {}).get("type") == "json_object")
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    def create_response(self, model, input, tools=(), **kwargs):
+        self.image_backend.call()
+        output = [SimpleNamespace(type="image_generation_call", result=fake_png(str(input)))]
+        return SimpleNamespace(output=output)
+
+
+def chat_model(config):
+    """The LangChain chat model for ``config`` (a ``CulinaryConfig``) on the configured provider."""
+    if is_fake():
+        return FakeChatModel(backend=FakeBackend(getattr(settings, "FAKE_CHAT_LATENCY", 1.0)))
+    from langchain_openai import ChatOpenAI
+
+    if not settings.OPENAI_API_KEY:
+        raise ImproperlyConfigured("OPENAI_API_KEY is not set")
+    return ChatOpenAI(
+        model=config.model_name,
+        temperature=config.temperature,
+        max_tokens=config.max_tokens,
+        openai_api_key=settings.OPENAI_API_KEY,
+        http_client=clients.openai_http_client(),
+        max_retries=clients.MAX_RETRIES,
+    )
+
+
+def openai_client():
+    """Shared OpenAI client for direct SDK calls (spell check, image generation) on the configured provider."""
+    if is_fake():
+        return clients.registry.get("fake_openai", FakeOpenAI)
+    if not settings.OPENAI_API_KEY:
+        raise ImproperlyConfigured("OPENAI_API_KEY is not set")
+    return clients.openai_client()
+
+
+# Smallest payload that still looks like an MP4 (an ``ftyp`` box).
+FAKE_VIDEO = b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom" + b"\x00" * 1024
+
+
+class FakeSynthesia:
+    def __init__(self, render_seconds, fail_rate, video_size):
+        self.render_seconds = render_seconds
+        self.fail_rate = fail_rate
+        self.video_size = max(video_size, len(FAKE_VIDEO))
+        self.videos = {}
+        self.lock = threading.Lock()
+
+    def create(self, payload):
+        video_id = str(uuid.uuid4())
+        with self.lock:
+            self.videos[video_id] = {
+                "created": time.monotonic(),
+                "fails": random.random() < self.fail_rate,
+                "title": payload.get("title"),
+            }
+        return video_id
+
+    def status(self, video_id, base_url):
+        with self.lock:
+            video = self.videos.get(video_id)
+        if video is None:
+            return None
+        body = {"id": video_id, "title": video["title"], "status": "in_progress"}
+        if time.monotonic() - video["created"] >= self.render_seconds:
+            if video["fails"]:
+                body.update(status="failed", message="Rendering failed (fake)")
+            else:
+                body.update(
+                    status="complete",
+                    download=f"{base_url}/download/{video_id}.mp4?response-content-disposition=attachment%3Bfilename%3D%22{video_id}.mp4%22",
+                )
+        return body
+
+    def delete(self, video_id):
+        with self.lock:
+            return self.videos.pop(video_id, None) is not None
+
+
+class FakeSynthesiaHandler(BaseHTTPRequestHandler):
+    synthesia = None
+
+    def base_url(self):
+        return f"http://{self.headers.get('Host')}"
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def video_id(self):
+        return self.path.split("?")[0].rstrip("/").rsplit("/", 1)[-1]
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.startswith("/v2/videos"):
+            return self.send_json(404, {"error": "Not found"})
+        self.send_json(201, {"id": self.synthesia.create(payload), "status": "in_progress"})
+
+    def do_GET(self):
+        if self.path.startswith("/download/"):
+            size = self.synthesia.video_size
+            self.send_response(200)
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            self.wfile.write(FAKE_VIDEO)
+            padding = bytes(64 * 1024)
+            remaining = size - len(FAKE_VIDEO)
+            while remaining > 0:
+                self.wfile.write(padding[:remaining])
+                remaining -= len(padding)
+            return
+        if not self.path.startswith("/v2/videos/"):
+            return self.send_json(404, {"error": "Not found"})
+        body = self.synthesia.status(self.video_id(), self.base_url())
+        if body is None:
+            return self.send_json(404, {"error": "Video not found"})
+        self.send_json(200, body)
+
+    def do_PUT(self):
+        # Image uploads of offline runs (``fake_upload_url``) are accepted and dropped.
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self.path.startswith("/uploads/"):
+            return self.send_json(404, {"error": "Not found"})
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_DELETE(self):
+        if self.path.startswith("/v2/videos/") and self.synthesia.delete(self.video_id()):
+            self.send_response(204)
+            self.end_headers()
+            return
+        self.send_json(404, {"error": "Video not found"})
+
+    def log_message(self, format, *args):
+        logger.debug(f"Fake Synthesia: {format % args}")
+
+
+def fake_synthesia_server(port=0, render_seconds=30, fail_rate=0.0, video_size=0, host="127.0.0.1"):
+    """A fake Synthesia API server (not yet serving); ``port=0`` picks a free port."""
+    handler = type("Handler", (FakeSynthesiaHandler,), {"synthesia": FakeSynthesia(render_seconds, fail_rate, video_size)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def _start_fake_synthesia():
+    # The same server takes the fake image uploads.
+    server = fake_synthesia_server(
+        render_seconds=getattr(settings, "FAKE_SYNTHESIA_RENDER_SECONDS", 30),
+        fail_rate=getattr(settings, "FAKE_AI_FAILURE_RATE", 0.0),
+    )
+    threading.Thread(target=server.serve_forever, name="fake-synthesia", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/v2"
+
+
+def synthesia_api_url():
+    """Base URL of the Synthesia API; with the fake provider, an in-process fake server started on first use."""
+    if is_fake():
+        return clients.registry.get("fake_synthesia", _start_fake_synthesia)
+    return settings.SYNTHESIA_API_URL
+
+
+def synthesia_url():
+    """URL videos are created from their template at."""
+    if is_fake():
+        return f"{synthesia_api_url()}/videos/fromTemplate"
+    return settings.SYNTHESIA_URL
+
+
+def fake_upload_url(filename):
+    """Stand-in for a presigned S3 upload URL when the fake provider is used."""
+    return f"{synthesia_api_url().rsplit('/v2', 1)[0]}/uploads/{filename}"
+
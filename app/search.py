@@ -0,0 +1,238 @@
+import re
+import logging
+import unicodedata
+from app import models
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from rest_framework.filters import SearchFilter
+
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "app_recipesearch_fts"
+# Created by the recipesearchdocument migration: "simple" plus unaccent, so "creme" matches "crème" as on SQLite.
+SEARCH_CONFIG = "app_unaccent"
+
+
+def search_terms(value):
+    return re.findall(r"\w+", (value or "").lower())
+
+
+class RecipeSearchService:
+    """
+    Maintains one RecipeSearchDocument per recipe and answers ranked
+    full-text queries against it: tsvector + GIN on Postgres, an FTS5 table
+    on SQLite, plain icontains on the document anywhere else.
+    """
+
+    @staticmethod
+    def document_fields(recipe):
+        keywords = [
+            recipe.cusinie_type.category_name if recipe.cusinie_type else "",
+            recipe.get_availability_display(),
+            recipe.get_status_display(),
+            recipe.station_to_prepare_dish,
+            recipe.main_dish,
+            *(ingredient.title for ingredient in recipe.recipe_ingredient.all()),
+            *(ingredient.name for ingredient in recipe.predefined_ingredients.all()),
+            *(tag.name for tag in recipe.recipe_tag.all()),
+            *(wine.wine_type for wine in recipe.wine_pairing.all()),
+        ]
+        return {
+            "title": recipe.dish_name or "",
+            "body": recipe.description or "",
+            "keywords": " ".join(keyword for keyword in keywords if keyword),
+        }
+
+    @staticmethod
+    def index(recipe_ids, apps=None):
+        """(Re)build the documents of ``recipe_ids``; ``apps`` is the historical app registry when run from a migration."""
+        recipe_ids = set(recipe_ids)
+        if not recipe_ids:
+            return
+        Recipe = apps.get_model("app", "Recipe") if apps else models.Recipe
+        RecipeSearchDocument = apps.get_model("app", "RecipeSearchDocument") if apps else models.RecipeSearchDocument
+        recipes = Recipe.objects.filter(id__in=recipe_ids).select_related("cusinie_type").prefetch_related(
+            "recipe_ingredient", "predefined_ingredients", "recipe_tag", "wine_pairing"
+        )
+        documents = {}
+        for recipe in recipes:
+            documents[recipe.id] = RecipeSearchService.document_fields(recipe)
+            RecipeSearchDocument.objects.update_or_create(recipe=recipe, defaults=documents[recipe.id])
+
+        if connection.vendor == "postgresql":
+            RecipeSearchDocument.objects.filter(recipe_id__in=documents).update(
+                search_vector=SearchVector("title", weight="A", config=SEARCH_CONFIG)
+                + SearchVector("keywords", weight="B", config=SEARCH_CONFIG)
+                + SearchVector("body", weight="C", config=SEARCH_CONFIG)
+            )
+        elif connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                placeholders = ", ".join(["%s"] * len(recipe_ids))
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", list(recipe_ids))
+                cursor.executemany(
+                    f"INSERT INTO {FTS_TABLE} (rowid, title, body, keywords) VALUES (%s, %s, %s, %s)",
+                    [(recipe_id, doc["title"], doc["body"], doc["keywords"]) for recipe_id, doc in documents.items()],
+                )
+
+    @staticmethod
+    def schedule(recipe_ids):
+        """
+        Reindex ``recipe_ids`` once the current transaction commits. Calls
+        within one transaction share a single pending reindex.
+        """
+        recipe_ids = {recipe_id for recipe_id in recipe_ids if recipe_id}
+        if not recipe_ids:
+            return
+        if connection.in_atomic_block:
+            for _, callback, *_ in getattr(connection, "run_on_commit", []):
+                if isinstance(callback, _PendingReindex):
+                    callback.recipe_ids |= recipe_ids
+                    return
+        transaction.on_commit(_PendingReindex(recipe_ids))
+
+    @staticmethod
+    def filter(queryset, value):
+        """Restrict ``queryset`` to recipes matching ``value``, annotated with ``search_rank``."""
+        if "search_rank" in queryset.query.annotations:
+            return queryset
+        terms = search_terms(value)
+        if not terms:
+            return queryset
+
+        if connection.vendor == "postgresql":
+            query = SearchQuery(" & ".join(f"{term}:*" for term in terms), search_type="raw", config=SEARCH_CONFIG)
+            queryset = queryset.filter(search_document__search_vector=query).annotate(
+                search_rank=SearchRank(F("search_document__search_vector"), query)
+            )
+        elif connection.vendor == "sqlite":
+            match = " ".join(f'"{term}"*' for term in terms)
+            table = queryset.model._meta.db_table
+            queryset = queryset.filter(
+                id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+            ).annotate(
+                search_rank=RawSQL(
+                    f'SELECT -rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id"',
+                    [match],
+                    output_field=FloatField(),
+                )
+            )
+        else:
+            condition = Q()
+            for term in terms:
+                condition &= (
+                    Q(search_document__title__icontains=term)
+                    | Q(search_document__body__icontains=term)
+                    | Q(search_document__keywords__icontains=term)
+                )
+            queryset = queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+        return queryset.order_by("-search_rank", *queryset.query.order_by)
+
+
+def normalize(text):
+    """Lower-case and strip accents, mirroring app_unaccent_lower() on Postgres."""
+    decomposed = unicodedata.normalize("NFKD", (text or "").lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def trigrams(text):
+    """pg_trgm style trigrams: each word padded with two leading spaces and one trailing."""
+    grams = set()
+    for word in re.findall(r"\w+", text):
+        padded = f"  {word} "
+        grams.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return grams
+
+
+def word_similarity(term, text):
+    """Approximates pg_trgm's word_similarity(): best match of ``term`` against any run of words in ``text``."""
+    term_grams = trigrams(term)
+    if not term_grams:
+        return 0.0
+    words = re.findall(r"\w+", text)
+    best = 0.0
+    for start in range(len(words)):
+        for end in range(start + 1, len(words) + 1):
+            grams = trigrams(" ".join(words[start:end]))
+            best = max(best, len(term_grams & grams) / len(term_grams | grams))
+    return best
+
+
+class IngredientMatcher:
+    """
+    Resolves free-text ingredient terms to Predefined_Ingredients and
+    Ingredient ids, tolerating accents and small typos. Postgres answers with
+    one trigram-indexed query; other databases fall back to comparing
+    trigrams in Python.
+    """
+
+    threshold = 0.6
+
+    @staticmethod
+    def match(terms):
+        terms = [normalize(term).strip() for term in terms]
+        terms = [term for term in terms if term]
+        if not terms:
+            return set(), set()
+        if connection.vendor == "postgresql":
+            return IngredientMatcher._match_postgres(terms)
+        return IngredientMatcher._match_python(terms)
+
+    @staticmethod
+    def _match_postgres(terms):
+        predefined_table = models.Predefined_Ingredients._meta.db_table
+        ingredient_table = models.Ingredient._meta.db_table
+        parts, params = [], []
+        for term in terms:
+            parts.append(f"SELECT 'p', id FROM {predefined_table} WHERE %s <%% app_unaccent_lower(name)")
+            parts.append(f"SELECT 'i', id FROM {ingredient_table} WHERE %s <%% app_unaccent_lower(title)")
+            params += [term, term]
+        predefined_ids, ingredient_ids = set(), set()
+        with connection.cursor() as cursor:
+            cursor.execute(" UNION ".join(parts), params)
+            for kind, pk in cursor.fetchall():
+                (predefined_ids if kind == "p" else ingredient_ids).add(pk)
+        return predefined_ids, ingredient_ids
+
+    @staticmethod
+    def _match_python(terms):
+        def matching(rows):
+            return {
+                pk for pk, name in rows
+                if any(word_similarity(term, normalize(name)) >= IngredientMatcher.threshold for term in terms)
+            }
+
+        predefined_ids = matching(models.Predefined_Ingredients.objects.exclude(name=None).values_list("id", "name"))
+        ingredient_ids = matching(models.Ingredient.objects.exclude(title=None).values_list("id", "title"))
+        return predefined_ids, ingredient_ids
+
+    @staticmethod
+    def filter_recipes(queryset, terms):
+        """Recipes using any ingredient matching any of ``terms``, as id semi-joins (no DISTINCT)."""
+        predefined_ids, ingredient_ids = IngredientMatcher.match(terms)
+        through = models.Recipe.predefined_ingredients.through
+        return queryset.filter(
+            Q(id__in=through.objects.filter(predefined_ingredients_id__in=predefined_ids).values("recipe_id"))
+            | Q(id__in=models.Ingredient.objects.filter(id__in=ingredient_ids).values("recipe_id"))
+        )
+
+
+class _PendingReindex:
+    def __init__(self, recipe_ids):
+        self.recipe_ids = set(recipe_ids)
+
+    def __call__(self):
+        try:
+            RecipeSearchService.index(self.recipe_ids)
+        except Exception as e:
+            logger.error(f"Error reindexing recipes {sorted(self.recipe_ids)}: {str(e)}")
+
+
+class RecipeSearchFilter(SearchFilter):
+    """SearchFilter backend that answers ``?search=`` from the recipe search index."""
+
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get(self.search_param, "")
+        return RecipeSearchService.filter(queryset, value)
@@ -1,8 +1,10 @@
 from django.utils import timezone
 from rest_framework.serializers import ModelSerializer
 from app import models, choices
+from app.images import ImageVariantService
 from rest_framework import serializers
-from django.db.models import Avg, Count
+from django.db.models import Avg, Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -290,14 +292,17 @@ class StepSerializer(serializers.ModelSerializer):
 
 class StarchPreparationSerializer(serializers.ModelSerializer):
     steps = serializers.SerializerMethodField(required=False)
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = models.Starch_Preparation
-        fields = ("id", "title", "image","steps","image_url")
+        fields = ("id", "title", "image","steps","image_url", "srcset")
+
+    def get_srcset(self, obj):
+        return ImageVariantService.srcset(obj)
 
     def get_steps(self, obj):
-        step = models.Starch_Preparation_Steps.objects.filter(starch_preparation=obj)
-        return StarchPreparationStepsSerializer(step, many=True).data
+        return StarchPreparationStepsSerializer(obj.starch.all(), many=True).data
     
     def to_representation(self, instance):
         response = super().to_representation(instance)
@@ -313,13 +318,16 @@ class StarchPreparationStepsSerializer(serializers.ModelSerializer):
 
 class DesignYourPlateSerializer(serializers.ModelSerializer):
     steps = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
     class Meta:
         model = models.Design_Your_Plate
-        fields = ("id", "image", "steps","image_url")
+        fields = ("id", "image", "steps","image_url", "srcset")
+
+    def get_srcset(self, obj):
+        return ImageVariantService.srcset(obj)
 
     def get_steps(self, obj):
-        step = models.Design_Your_Plate_Steps.objects.filter(design_plate=obj)
-        return DesignYourPlateStepsSerializer(step, many=True).data
+        return DesignYourPlateStepsSerializer(obj.design_steps.all(), many=True).data
 
     def to_representation(self, instance):
         response = super().to_representation(instance)
@@ -485,7 +493,7 @@ class RecipeSerializer(ModelSerializer):
 
     class Meta:
         model = models.Recipe
-        exclude = ("user",)
+        exclude = ("user", "enrichment_fingerprint")
     
     # def validate_predefined_ingredients(self, predefined_ingredients):
     #     if isinstance(predefined_ingredients, str):
@@ -544,44 +552,68 @@ class RecipeSerializer(ModelSerializer):
             raise serializers.ValidationError("A recipe with this name already exists.")
         return value
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load every relation the recipe detail reads up front, so one recipe
+        or a list of N recipes costs the same fixed number of queries.
+        """
+        rating_stats = models.Rating.objects.filter(recipe=OuterRef("pk")).values("recipe")
+        return queryset.select_related("cusinie_type").annotate(
+            rating_average=Subquery(rating_stats.annotate(value=Avg("rating")).values("value")),
+            rating_count=Coalesce(Subquery(rating_stats.annotate(value=Count("rating")).values("value")), 0),
+        ).prefetch_related(
+            "recipe_tag",
+            "recipe_ingredient",
+            "recipe_essentials",
+            "recipe_steps",
+            Prefetch("starch_preparation", queryset=models.Starch_Preparation.objects.prefetch_related("starch")),
+            Prefetch("recipe_Design_your_plate", queryset=models.Design_Your_Plate.objects.prefetch_related("design_steps")),
+            "recipe_cooking_deviation_comment",
+            "recipe_real_time_variable_comment",
+            "recipe_image",
+            "wine_pairing",
+            "predefined_ingredients",
+            "predefined_starch",
+            "predefined_vegetables",
+        )
+
     def get_rating(self, obj):
-        rating_data = models.Rating.objects.filter(recipe=obj).aggregate(average_rating=Avg('rating'),
-            total_count=Count('rating'))
+        if hasattr(obj, "rating_count"):
+            rating_data = {"average_rating": obj.rating_average, "total_count": obj.rating_count}
+        else:
+            rating_data = models.Rating.objects.filter(recipe=obj).aggregate(average_rating=Avg('rating'),
+                total_count=Count('rating'))
         average = rating_data['average_rating'] if rating_data['average_rating'] is not None else 0
         total_count = rating_data['total_count']
         return {"average_rating": round(average, 3), "total_count": total_count}
     
     def get_tags(self, obj):
-        tag = models.Tag.objects.filter(recipe = obj.id)
-        return TagSerializer(tag, many=True).data
+        return TagSerializer(obj.recipe_tag.all(), many=True).data
     
     def get_ingredient(self,obj):
-        ingredient = models.Ingredient.objects.filter(recipe=obj.id)
-        return IngredientSerializer(ingredient, many=True).data
+        return IngredientSerializer(obj.recipe_ingredient.all(), many=True).data
     
     def get_essential(self, obj):
-        essentail = models.Essentials.objects.filter(recipe=obj.id)
-        return EssentialsSerializer(essentail, many=True).data
+        return EssentialsSerializer(obj.recipe_essentials.all(), many=True).data
     
     def get_steps(self, obj):
-        steps = models.Steps.objects.filter(recipe=obj.id).order_by('id')
+        steps = sorted(obj.recipe_steps.all(), key=lambda step: step.id)
         return StepSerializer(steps, many=True).data
     
     def get_starch_preparation(self, obj):
-        starch = models.Starch_Preparation.objects.filter(recipe=obj.id).first()
+        starch = next(iter(obj.starch_preparation.all()), None)
         return StarchPreparationSerializer(starch, context=self.context).data
     
     def get_design_your_plate(self, obj):
-        design = models.Design_Your_Plate.objects.filter(recipe=obj).first()
+        design = next(iter(obj.recipe_Design_your_plate.all()), None)
         return DesignYourPlateSerializer(design, context=self.context).data
     
     def get_Cooking_Deviation_Comment(self,obj):
-        pre = models.Cooking_Deviation_Comment.objects.filter(recipe=obj.id)
-        return CookingDeviationCommentSerializer(pre, many=True).data
+        return CookingDeviationCommentSerializer(obj.recipe_cooking_deviation_comment.all(), many=True).data
     
     def get_Real_time_Variable_Comment(self,obj):
-        pre = models.Real_time_Variable_Comment.objects.filter(recipe=obj.id)
-        return RealTimeVariableCommentSerializer(pre, many=True).data
+        return RealTimeVariableCommentSerializer(obj.recipe_real_time_variable_comment.all(), many=True).data
 
     def to_representation(self, instance):
         response =  super().to_representation(instance)
@@ -611,7 +643,10 @@ class RecipeSerializer(ModelSerializer):
         predefined_vegetables = instance.predefined_vegetables
         response['predefined_vegetables'] = PredefinedVegetableSerializer(predefined_vegetables, many=True).data
 
-        response['video'] = request.build_absolute_uri(instance.video.url) if instance.video else None
+        if instance.video:
+            response['video'] = request.build_absolute_uri(instance.video.url) if request else instance.video.url
+        else:
+            response['video'] = None
         if instance.cusinie_type:
             response['cusinie_type'] = {
                 'id':instance.cusinie_type.id,
@@ -667,6 +702,12 @@ class TaskSerializer(ModelSerializer):
                 raise ValidationError({"video": "File does not exist on aws"}, code=400)
         return data
     
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Embed the full recipe of every task without a query per task."""
+        recipes = RecipeSerializer.setup_eager_loading(models.Recipe.objects.all())
+        return queryset.prefetch_related(Prefetch("task_name", queryset=recipes))
+
     def get_task_details(self, obj):
         if obj.task_name:
             return RecipeSerializer(obj.task_name, context=self.context).data
@@ -780,9 +821,13 @@ class RecipeWineSerializer(ModelSerializer):
 class RecipeImagesSerializer(ModelSerializer):  
     # image = serializers.ImageField()
     image_url = serializers.CharField()
+    srcset = serializers.SerializerMethodField()
     class Meta:
         model = models.recipe_images
-        fields = "id","image_url"
+        fields = "id","image_url","srcset"
+
+    def get_srcset(self, obj):
+        return ImageVariantService.srcset(obj)
     
     # def validate_image(self, value):
     #     if not value:
@@ -836,6 +881,25 @@ class RecipeVideoGenerationSerializer(serializers.Serializer):
             "language": ret['language']
         }
 
+class RecipeVideoGenerationStatusSerializer(serializers.ModelSerializer):
+    status = serializers.CharField(source="get_status_display")
+    job_id = serializers.IntegerField(source="job.id", default=None)
+    attempts = serializers.IntegerField(source="job.attempts", default=None)
+    video = serializers.SerializerMethodField()
+
+    class Meta:
+        model = models.RecipeVideoGeneration
+        fields = [
+            "id", "recipe", "status", "synthesia_video_id", "synthesia_status", "polls",
+            "next_poll_at", "error", "job_id", "attempts", "video", "created_at", "updated_at",
+        ]
+
+    def get_video(self, instance):
+        if instance.status != choices.VideoGenerationStatus.COMPLETED or not instance.recipe.video:
+            return None
+        request = self.context.get("request")
+        return request.build_absolute_uri(instance.recipe.video.url) if request else instance.recipe.video.url
+
 class NotificationSerializer(serializers.ModelSerializer):
     is_seen = serializers.SerializerMethodField()
     
@@ -894,10 +958,14 @@ class IngredientTitleSerializer(serializers.ModelSerializer):
 class MenuSerializer(serializers.ModelSerializer):
     menu_item = serializers.ListField(write_only=True)
     recipes = serializers.ListField(write_only=True)
+    srcset = serializers.SerializerMethodField()
     class Meta:
         model = models.Menu
-        fields = ['id', "title", "description", "image", "created_at", "menu_item", "recipes"]
+        fields = ['id', "title", "description", "image", "srcset", "created_at", "menu_item", "recipes"]
         read_only_fields = ['created_at']
+
+    def get_srcset(self, obj):
+        return ImageVariantService.srcset(obj)
     
     # def validate(self, data):
     #     recipes = data.get('recipes', [])
@@ -1005,9 +1073,13 @@ class CategorySerializer(serializers.ModelSerializer):
         return value
 
 class MenuListSerializer(serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField()
     class Meta:
         model = models.Menu
-        fields = ['id',"title","description","image","created_at"]
+        fields = ['id',"title","description","image","srcset","created_at"]
+
+    def get_srcset(self, obj):
+        return ImageVariantService.srcset(obj)
     
     def to_representation(self, instance):
         response = super().to_representation(instance)
@@ -1083,6 +1155,16 @@ class ListRecipeSerializer(serializers.ModelSerializer):
         model = models.Recipe
         fields = ["id", "dish_name", "description", "is_draft", "recipe_image","is_deleted"]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Only the images are read per row; drop any other prefetches."""
+        return queryset.prefetch_related(None).prefetch_related(
+            Prefetch(
+                "recipe_image",
+                queryset=models.recipe_images.objects.only("id", "recipe_id", "image", "image_url", "image_variants"),
+            )
+        )
+
 class TemplateGenerationSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Recipe
@@ -1246,9 +1328,13 @@ class EditorSmallDetailsSerializer(serializers.ModelSerializer):
     
 
 class EditorImageSerializer(serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField()
     class Meta:
         model = models.EditorImage
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'srcset']
+
+    def get_srcset(self, obj):
+        return ImageVariantService.srcset(obj)
     
     def create(self, validated_data):
         request = self.context.get('request')
@@ -1,114 +1,224 @@
-import time
+import json
 import base64
+import hashlib
 import logging
 import datetime
-import requests
-import threading
 from app import models
 from typing import Optional
 from app.ai_image import Image
 from django.utils import timezone
+from django.apps import apps
 from django.dispatch import receiver
 import django.utils.timezone as timezone
 from datetime import datetime, timedelta
 from app.starch_image import StarchImage
-from app.middleware import get_current_user
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete, m2m_changed
+from app.documents import RecipeDocumentService
+from app.search import RecipeSearchService
+from app.sync import recipe_children_changed
+from app import audit
+from app.audit import AuditCollector
 from app.utils import fetch_and_get_wine_pairing
 from django.contrib.auth.signals import user_logged_in
 from app.serializers import FileUploadRequestSerializer
-from apscheduler.schedulers.background import BackgroundScheduler
+from app import jobs
+from app.jobs import JobQueue
+from app.images import ImageVariantService
+from app.spellcheck import CulinarySpellChecker
+from app.clients import http
+from app.llm_scheduler import llm_scheduler
+from app.wine_index import recipe_description
+from app.providers import is_fake, fake_upload_url
 
 
 logger = logging.getLogger(__name__)
-scheduler = BackgroundScheduler()
-scheduler.start()
 
 
-EXCLUDED_FIELDS = [
-    "created_at",
-    "updated_at",
-    "is_deleted",
-    "recipe",
-    "image",
-    "video",
-    "video_id",
-]
+AUDITED_MODELS = (
+    models.Recipe,
+    models.Steps,
+    models.Tag,
+    models.Essentials,
+    models.Starch_Preparation,
+    models.Design_Your_Plate,
+    models.Cooking_Deviation_Comment,
+    models.Real_time_Variable_Comment,
+)
+
+
+def snapshot_audited_instance(sender, instance, using=None, **kwargs):
+    if AuditCollector.active():
+        audit.snapshot_stored(instance, using)
+
+
+def log_recipe_and_process_update(sender, instance, created, **kwargs):
+    if not AuditCollector.active():
+        return
+    if not created:
+        changes = audit.diff(instance)
+        if changes:
+            recipe_id = instance.id if sender is models.Recipe else instance.recipe_id
+            lines = [f"{sender.__name__}: {instance.id}"]
+            lines += [f"{name}: {value}" for name, value in changes]
+            AuditCollector.record(recipe_id, lines)
+    audit.snapshot(instance)
+
+
+for model in AUDITED_MODELS:
+    pre_save.connect(snapshot_audited_instance, sender=model, dispatch_uid=f"audit_snapshot_{model.__name__}")
+    post_save.connect(log_recipe_and_process_update, sender=model, dispatch_uid=f"audit_log_{model.__name__}")
+
+
+# Recipe document invalidation
+@receiver(post_save, sender=models.Recipe)
+def invalidate_recipe_document(sender, instance, **kwargs):
+    RecipeDocumentService.invalidate([instance.id])
 
 
-# @receiver(post_save, sender=models.Wine)
 @receiver(post_save, sender=models.Steps)
-@receiver(post_save, sender=models.Predefined_Ingredients)
-@receiver(post_save, sender=models.Cooking_Deviation_Comment)
-@receiver(post_save, sender=models.Design_Your_Plate)
-@receiver(post_save, sender=models.Starch_Preparation)
-@receiver(post_save, sender=models.Essentials)
 @receiver(post_save, sender=models.Tag)
-@receiver(post_save, sender=models.Recipe)
+@receiver(post_save, sender=models.Ingredient)
+@receiver(post_save, sender=models.Essentials)
+@receiver(post_save, sender=models.Starch_Preparation)
+@receiver(post_save, sender=models.Design_Your_Plate)
+@receiver(post_save, sender=models.Rating)
+@receiver(post_save, sender=models.recipe_images)
+@receiver(post_save, sender=models.Cooking_Deviation_Comment)
 @receiver(post_save, sender=models.Real_time_Variable_Comment)
-def log_recipe_and_process_update(sender, instance, created, **kwargs):
-
-    user = get_current_user()
-    if user is None or not user.is_authenticated:
+@receiver(post_delete, sender=models.Steps)
+@receiver(post_delete, sender=models.Tag)
+@receiver(post_delete, sender=models.Ingredient)
+@receiver(post_delete, sender=models.Essentials)
+@receiver(post_delete, sender=models.Starch_Preparation)
+@receiver(post_delete, sender=models.Design_Your_Plate)
+@receiver(post_delete, sender=models.Rating)
+@receiver(post_delete, sender=models.recipe_images)
+@receiver(post_delete, sender=models.Cooking_Deviation_Comment)
+@receiver(post_delete, sender=models.Real_time_Variable_Comment)
+def invalidate_recipe_document_for_child(sender, instance, **kwargs):
+    RecipeDocumentService.invalidate([instance.recipe_id])
+
+
+@receiver(post_save, sender=models.Starch_Preparation_Steps)
+@receiver(post_delete, sender=models.Starch_Preparation_Steps)
+def invalidate_recipe_document_for_starch_step(sender, instance, **kwargs):
+    RecipeDocumentService.invalidate(
+        models.Starch_Preparation.objects.filter(id=instance.starch_preparation_id).values_list("recipe_id", flat=True)
+    )
+
+
+@receiver(post_save, sender=models.Design_Your_Plate_Steps)
+@receiver(post_delete, sender=models.Design_Your_Plate_Steps)
+def invalidate_recipe_document_for_design_step(sender, instance, **kwargs):
+    RecipeDocumentService.invalidate(
+        models.Design_Your_Plate.objects.filter(id=instance.design_plate_id).values_list("recipe_id", flat=True)
+    )
+
+
+SHARED_RECIPE_RELATIONS = {
+    models.Wine: "recipe_wine",
+    models.Predefined_Ingredients: "recipe_predefined_ingredients",
+    models.Predefined_Starch: "recipe_predefined_starch",
+    models.Predefined_Vegetable: "recipe_predefined_vegetables",
+    models.MenuCategoryies: "recipe_cusine_type",
+}
+
+
+@receiver(post_save, sender=models.Wine)
+@receiver(post_save, sender=models.Predefined_Ingredients)
+@receiver(post_save, sender=models.Predefined_Starch)
+@receiver(post_save, sender=models.Predefined_Vegetable)
+@receiver(post_save, sender=models.MenuCategoryies)
+@receiver(pre_delete, sender=models.Wine)
+@receiver(pre_delete, sender=models.Predefined_Ingredients)
+@receiver(pre_delete, sender=models.Predefined_Starch)
+@receiver(pre_delete, sender=models.Predefined_Vegetable)
+@receiver(pre_delete, sender=models.MenuCategoryies)
+def invalidate_recipe_documents_for_shared(sender, instance, created=False, **kwargs):
+    # Rows referenced by many recipes; the relation is gone by post_delete.
+    if created:
+        return
+    related = getattr(instance, SHARED_RECIPE_RELATIONS[sender])
+    RecipeDocumentService.invalidate(list(related.values_list("id", flat=True)))
+
+
+@receiver(m2m_changed, sender=models.Recipe.wine_pairing.through)
+@receiver(m2m_changed, sender=models.Recipe.predefined_ingredients.through)
+@receiver(m2m_changed, sender=models.Recipe.predefined_starch.through)
+@receiver(m2m_changed, sender=models.Recipe.predefined_vegetables.through)
+def invalidate_recipe_document_for_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            RecipeDocumentService.invalidate([instance.id])
         return
+    if action in ("post_add", "post_remove"):
+        RecipeDocumentService.invalidate(list(pk_set))
+    elif action == "pre_clear":
+        recipe_ids = sender.objects.filter(**{instance._meta.model_name: instance}).values_list("recipe_id", flat=True)
+        RecipeDocumentService.invalidate(list(recipe_ids))
+
+
+# Recipe search index maintenance
+@receiver(post_save, sender=models.Recipe)
+@receiver(post_delete, sender=models.Recipe)
+def reindex_recipe_search(sender, instance, **kwargs):
+    RecipeSearchService.schedule([instance.id])
+
+
+@receiver(post_save, sender=models.Tag)
+@receiver(post_save, sender=models.Ingredient)
+@receiver(post_delete, sender=models.Tag)
+@receiver(post_delete, sender=models.Ingredient)
+def reindex_recipe_search_for_child(sender, instance, **kwargs):
+    RecipeSearchService.schedule([instance.recipe_id])
 
-    recipe = instance.recipe if hasattr(instance, "recipe") else instance
-    changes = []
 
+@receiver(post_save, sender=models.Wine)
+@receiver(post_save, sender=models.Predefined_Ingredients)
+@receiver(post_save, sender=models.MenuCategoryies)
+def reindex_recipe_search_for_shared(sender, instance, created=False, **kwargs):
     if created:
-        pass
-    else:
-        for field in instance._meta.fields:
-            if field.name in EXCLUDED_FIELDS:
-                continue
-
-            new_value = field.value_from_object(instance)
-            original_value = getattr(instance, f"__original_{field.name}", None)
-
-            if field.name != "id" and new_value != original_value:
-                changes.append(
-                    {sender.__name__: instance.id, field.name: f"{new_value}"}
-                )
+        return
+    related = getattr(instance, SHARED_RECIPE_RELATIONS[sender])
+    RecipeSearchService.schedule(related.values_list("id", flat=True))
 
-        if changes:
-            changes_made = "\n".join(
-                [
-                    f"{key}: {value}"
-                    for change in changes
-                    for key, value in change.items()
-                ]
-            )
-            res = models.Recipe_Process_Audit.objects.create(
-                dish_name=recipe,
-                changed_by=user,
-                changes_made=changes_made,
-                datetime=timezone.now(),
-            )
 
-    def set_original_values(sender, instance, **kwargs):
-        for field in instance._meta.fields:
-            if field.name not in EXCLUDED_FIELDS:
-                setattr(
-                    instance,
-                    f"__original_{field.name}",
-                    field.value_from_object(instance),
-                )
+@receiver(m2m_changed, sender=models.Recipe.wine_pairing.through)
+@receiver(m2m_changed, sender=models.Recipe.predefined_ingredients.through)
+def reindex_recipe_search_for_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            RecipeSearchService.schedule([instance.id])
+        return
+    if action in ("post_add", "post_remove"):
+        RecipeSearchService.schedule(pk_set)
+    elif action == "pre_clear":
+        RecipeSearchService.schedule(
+            sender.objects.filter(**{instance._meta.model_name: instance}).values_list("recipe_id", flat=True)
+        )
+
 
-    for model in [
-        models.Wine,
-        models.Steps,
-        models.Predefined_Ingredients,
-        models.Cooking_Deviation_Comment,
-        models.Design_Your_Plate,
-        models.Starch_Preparation,
-        models.Starch_Preparation_Steps,
-        models.Design_Your_Plate_Steps,
-        models.Essentials,
-        models.Tag,
-        models.Recipe,
-        models.Real_time_Variable_Comment,
-    ]:
-        post_save.connect(set_original_values, sender=model)
+# Bulk child writes (app/sync.py) skip post_save; handle them per recipe.
+@receiver(recipe_children_changed, sender=models.Recipe)
+def handle_recipe_children_changed(sender, recipe, changes, **kwargs):
+    RecipeDocumentService.invalidate([recipe.id])
+    if models.Tag in changes or models.Ingredient in changes:
+        RecipeSearchService.schedule([recipe.id])
+    if models.Ingredient in changes:
+        JobSchedulerService.schedule_recipe_enrichment(recipe.id)
+    if models.recipe_images in changes:
+        result = changes[models.recipe_images]
+        for image in result.created + [instance for instance, _ in result.updated]:
+            ImageVariantService.schedule(image)
+
+    lines = []
+    for model, result in changes.items():
+        if model not in AUDITED_MODELS:
+            continue
+        for instance, changed in result.updated:
+            lines.append(f"{model.__name__}: {instance.id}")
+            lines += [f"{field}: {new_value}" for field, (_, new_value) in changed.items()]
+    AuditCollector.record(recipe.id, lines)
 
 
 # @receiver(post_save, sender=models.Recipe)
@@ -196,11 +306,15 @@ class ImageUploadService:
             S3 URL if successful, None otherwise
         """
         try:
-            serializer = FileUploadRequestSerializer(data={"file": filename})
-            serializer.is_valid(raise_exception=True)
-            presigned_url = serializer.generate_presigned_url()
+            if is_fake():
+                # Offline runs upload to the fake server instead of the bucket.
+                presigned_url = fake_upload_url(filename)
+            else:
+                serializer = FileUploadRequestSerializer(data={"file": filename})
+                serializer.is_valid(raise_exception=True)
+                presigned_url = serializer.generate_presigned_url()
 
-            response = requests.put(
+            response = http().put(
                 presigned_url,
                 data=image_data,
                 headers={"Content-Type": "image/png"},
@@ -239,7 +353,9 @@ class ImageUploadService:
             return None
 
 
-# Background job functions
+# Background job functions, run by `manage.py run_jobs`. Unexpected errors
+# are re-raised so the queue retries the job with backoff.
+@jobs.register("recipe_image", concurrency=2, max_attempts=3, backoff=60)
 def generate_recipe_image_job(recipe_id):
     """
     Background job to generate and upload recipe image
@@ -255,36 +371,38 @@ def generate_recipe_image_job(recipe_id):
         # Generate image
         ingredients = list(recipe.recipe_ingredient.values_list("title", flat=True))
         image_generator = Image()
-        base64_image = image_generator.image(
-            dish_name=recipe.dish_name, ingredients=ingredients
-        )
+        with llm_scheduler.tenant(recipe.resturant_id):
+            base64_image = image_generator.image(
+                dish_name=recipe.dish_name, ingredients=ingredients
+            )
 
+        # Failures raise so the job is retried and enrichment is not stamped as done.
         if not base64_image:
-            logger.warning(f"No image generated for recipe {recipe_id}")
-            return
+            raise RuntimeError(f"No image generated for recipe {recipe_id}")
 
         # Process and upload image
         image_data = ImageUploadService.process_base64_image(base64_image)
         if not image_data:
-            logger.error(f"Failed to process image data for recipe {recipe_id}")
-            return
+            raise RuntimeError(f"Failed to process image data for recipe {recipe_id}")
 
         filename = f"{recipe.dish_name.replace(' ', '_')}_{recipe_id}.png"
         s3_url = ImageUploadService.upload_to_s3(image_data, filename)
 
-        if s3_url:
-            # Save to database
-            models.recipe_images.objects.create(recipe=recipe, image_url=s3_url)
-            logger.info(f"Successfully created image for recipe {recipe_id}")
-        else:
-            logger.error(f"Failed to upload image for recipe {recipe_id}")
+        if not s3_url:
+            raise RuntimeError(f"Failed to upload image for recipe {recipe_id}")
+
+        # Save to database
+        models.recipe_images.objects.create(recipe=recipe, image_url=s3_url)
+        logger.info(f"Successfully created image for recipe {recipe_id}")
 
     except models.Recipe.DoesNotExist:
         logger.error(f"Recipe {recipe_id} not found")
     except Exception as e:
         logger.error(f"Error generating recipe image for {recipe_id}: {str(e)}")
+        raise
 
 
+@jobs.register("wine_pairing", concurrency=4, max_attempts=3, backoff=30)
 def generate_wine_pairing_job(recipe_id):
     """
     Background job to generate wine pairing
@@ -296,40 +414,27 @@ def generate_wine_pairing_job(recipe_id):
             logger.info(f"Skipping wine pairing for draft recipe {recipe_id}")
             return
 
-        # Get ingredients description
-        ingredients_list = list(
-            recipe.recipe_ingredient.values_list("title", flat=True)
-        )
-        predefined_list = list(
-            recipe.predefined_ingredients.values_list("name", flat=True)
-        )
-        all_ingredients = ingredients_list + predefined_list
-
-        if not all_ingredients:
-            description = recipe.dish_name
-        elif len(all_ingredients) == 1:
-            description = f"{recipe.dish_name} with {all_ingredients[0]}"
-        else:
-            ingredients_text = (
-                ", ".join(all_ingredients[:-1]) + ", and " + all_ingredients[-1]
-            )
-            description = f"{recipe.dish_name} with {ingredients_text}"
-
-        fetch_and_get_wine_pairing(description, recipe_id)
+        with llm_scheduler.tenant(recipe.resturant_id):
+            response = fetch_and_get_wine_pairing(recipe_description(recipe), recipe_id)
+        if response.status_code >= 400:
+            # Raise so the job is retried instead of finishing without a pairing.
+            raise RuntimeError(response.data.get("error"))
         logger.info(f"Wine pairing generated for recipe {recipe_id}")
 
     except models.Recipe.DoesNotExist:
         logger.error(f"Recipe {recipe_id} not found")
     except Exception as e:
         logger.error(f"Error generating wine pairing for recipe {recipe_id}: {str(e)}")
+        raise
 
 
+@jobs.register("starch_image", concurrency=2, max_attempts=3, backoff=60)
 def generate_starch_image_job(starch_prep_id):
     """
     Background job to generate starch preparation image
     """
     try:
-        starch_prep = models.Starch_Preparation.objects.get(id=starch_prep_id)
+        starch_prep = models.Starch_Preparation.objects.select_related("recipe").get(id=starch_prep_id)
 
         if starch_prep.image_url:
             logger.info(f"Starch preparation {starch_prep_id} already has image")
@@ -341,9 +446,10 @@ def generate_starch_image_job(starch_prep_id):
 
         # Generate image
         image_generator = StarchImage()
-        base64_image = image_generator.image(
-            dish_name=starch_prep.title, steps=steps_text
-        )
+        with llm_scheduler.tenant(starch_prep.recipe.resturant_id):
+            base64_image = image_generator.image(
+                dish_name=starch_prep.title, steps=steps_text
+            )
 
         if not base64_image:
             logger.warning(
@@ -377,83 +483,76 @@ def generate_starch_image_job(starch_prep_id):
         logger.error(f"Starch preparation {starch_prep_id} not found")
     except Exception as e:
         logger.error(f"Error generating starch image for {starch_prep_id}: {str(e)}")
+        raise
 
 
-class JobSchedulerService:
-    """Service to manage background jobs using APScheduler"""
+def recipe_enrichment_fingerprint(recipe):
+    """Hash of the inputs the recipe image and wine pairing prompts are built from."""
+    ingredients = sorted(recipe.recipe_ingredient.values_list("title", flat=True), key=str)
+    predefined = sorted(recipe.predefined_ingredients.values_list("name", flat=True), key=str)
+    payload = json.dumps([recipe.dish_name, ingredients, predefined, recipe.is_draft])
+    return hashlib.sha1(payload.encode()).hexdigest()
 
-    @staticmethod
-    def schedule_job_with_delay(func, args, delay_seconds=1, job_id_prefix="job"):
-        """Schedule a job to run after a delay"""
-        try:
-            job_id = f"{job_id_prefix}_{args[0]}_{int(time.time())}"
-            run_time = datetime.now() + timedelta(seconds=delay_seconds)
-
-            scheduler.add_job(
-                func=func,
-                args=args,
-                trigger="date",
-                run_date=run_time,
-                id=job_id,
-                replace_existing=True,
-                max_instances=1,
-            )
-            logger.info(f"Scheduled job {job_id} to run at {run_time}")
-            return job_id
-        except Exception as e:
-            logger.error(f"Error scheduling job {job_id_prefix}: {str(e)}")
-            return None
 
-    @staticmethod
-    def schedule_recipe_image_generation(recipe_id, delay_seconds=1):
-        """Schedule recipe image generation job"""
-        return JobSchedulerService.schedule_job_with_delay(
-            generate_recipe_image_job, [recipe_id], delay_seconds, "recipe_image"
-        )
+@jobs.register("recipe_enrichment", concurrency=4, max_attempts=3, backoff=60)
+def recipe_enrichment_job(recipe_id):
+    """
+    Generate the recipe image and wine pairing, skipping the AI calls when the
+    dish name, ingredients and draft state are the same as on the last run.
+    """
+    try:
+        recipe = models.Recipe.objects.get(id=recipe_id)
+    except models.Recipe.DoesNotExist:
+        logger.error(f"Recipe {recipe_id} not found")
+        return
+
+    fingerprint = recipe_enrichment_fingerprint(recipe)
+    if fingerprint == recipe.enrichment_fingerprint:
+        logger.info(f"Enrichment inputs of recipe {recipe_id} unchanged, skipping")
+        return
+
+    # Both steps raise when they produce nothing, so a failed run is retried
+    # instead of being stamped as done.
+    generate_recipe_image_job(recipe_id)
+    generate_wine_pairing_job(recipe_id)
+    # update() so stamping the fingerprint does not fire post_save again.
+    models.Recipe.objects.filter(id=recipe_id).update(enrichment_fingerprint=fingerprint)
+
+
+@jobs.register("image_variants", concurrency=2, max_attempts=3, backoff=30)
+def generate_image_variants_job(model_label, pk):
+    """Background job to render the responsive derivatives of an image"""
+    ImageVariantService.generate(model_label, pk)
+    # Variants are stored with update(), which the document receivers do not see.
+    model = apps.get_model(model_label)
+    if any(field.name == "recipe" for field in model._meta.fields):
+        RecipeDocumentService.invalidate(list(model.objects.filter(pk=pk).values_list("recipe_id", flat=True)))
+
+
+class JobSchedulerService:
+    """Queues the recipe background jobs; a pending job per object absorbs repeated saves."""
+
+    # Quiet period after the last edit before a recipe is enriched.
+    enrichment_debounce_seconds = 30
 
     @staticmethod
-    def schedule_wine_pairing_generation(recipe_id, delay_seconds=2):
-        """Schedule wine pairing generation job"""
-        return JobSchedulerService.schedule_job_with_delay(
-            generate_wine_pairing_job, [recipe_id], delay_seconds, "wine_pairing"
+    def schedule_recipe_enrichment(recipe_id):
+        return JobQueue.enqueue(
+            "recipe_enrichment",
+            recipe_id,
+            delay=JobSchedulerService.enrichment_debounce_seconds,
+            dedupe_key=f"recipe_enrichment:{recipe_id}",
+            debounce=True,
         )
 
     @staticmethod
     def schedule_starch_image_generation(starch_prep_id, delay_seconds=10):
-        """Schedule starch image generation job with delay for steps to be saved"""
-        starch_perp = models.Starch_Preparation.objects.get(id=starch_prep_id)
-        if starch_perp.image_url:
-            logger.info(
-                f"Starch preparation {starch_prep_id} already has image, skipping generation"
-            )
-            return None
+        """Delayed so the preparation steps are saved before the image prompt is built."""
         logger.info(
             f"Scheduling starch image generation for {starch_prep_id} after {delay_seconds}s delay"
-        ) 
-        return JobSchedulerService.schedule_job_with_delay(
-            generate_starch_image_job, [starch_prep_id], delay_seconds, "starch_image"
         )
-
-
-# Alternative: Simple threading approach (fallback if APScheduler has issues)
-class ThreadingJobService:
-    """Fallback service using threading for background jobs"""
-
-    @staticmethod
-    def run_delayed_job(func, args, delay_seconds=1):
-        """Run a job in a separate thread after a delay"""
-
-        def delayed_execution():
-            try:
-                time.sleep(delay_seconds)
-                func(*args)
-            except Exception as e:
-                logger.error(f"Error in threaded job: {str(e)}")
-
-        thread = threading.Thread(target=delayed_execution, daemon=True)
-        thread.start()
-        logger.info(
-            f"Started background thread for {func.__name__} with {delay_seconds}s delay"
+        return JobQueue.enqueue(
+            "starch_image", starch_prep_id, delay=delay_seconds, dedupe_key=f"starch_image:{starch_prep_id}"
         )
 
 
@@ -461,33 +560,63 @@ class ThreadingJobService:
 @receiver(post_save, sender=models.Recipe)
 def handle_recipe_post_save(sender, instance, created, **kwargs):
     """
-    Handle recipe post-save operations - schedule background jobs
+    Handle recipe post-save operations - queue background jobs
     """
     try:
-        # Try APScheduler first, fallback to threading
-        try:
-            JobSchedulerService.schedule_recipe_image_generation(
-                instance.id, delay_seconds=1
-            )
-            JobSchedulerService.schedule_wine_pairing_generation(
-                instance.id, delay_seconds=2
-            )
-            logger.info(f"Scheduled APScheduler jobs for recipe {instance.id}")
-        except Exception as e:
-            logger.warning(f"APScheduler failed, using threading fallback: {str(e)}")
-            # Fallback to threading
-            ThreadingJobService.run_delayed_job(
-                generate_recipe_image_job, [instance.id], 1
-            )
-            ThreadingJobService.run_delayed_job(
-                generate_wine_pairing_job, [instance.id], 2
-            )
-            logger.info(f"Scheduled threading jobs for recipe {instance.id}")
-
+        JobSchedulerService.schedule_recipe_enrichment(instance.id)
     except Exception as e:
         logger.error(f"Error scheduling jobs for recipe {instance.id}: {str(e)}")
 
 
+@receiver(post_save, sender=models.Ingredient)
+@receiver(post_delete, sender=models.Ingredient)
+def handle_ingredient_change(sender, instance, **kwargs):
+    if instance.recipe_id:
+        JobSchedulerService.schedule_recipe_enrichment(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=models.Recipe.predefined_ingredients.through)
+def handle_predefined_ingredients_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            JobSchedulerService.schedule_recipe_enrichment(instance.id)
+        return
+    recipe_ids = []
+    if action in ("post_add", "post_remove"):
+        recipe_ids = pk_set
+    elif action == "pre_clear":
+        recipe_ids = sender.objects.filter(**{instance._meta.model_name: instance}).values_list("recipe_id", flat=True)
+    for recipe_id in recipe_ids:
+        JobSchedulerService.schedule_recipe_enrichment(recipe_id)
+
+
+@receiver(post_save, sender=models.recipe_images)
+@receiver(post_save, sender=models.Starch_Preparation)
+@receiver(post_save, sender=models.Design_Your_Plate)
+@receiver(post_save, sender=models.Menu)
+@receiver(post_save, sender=models.EditorImage)
+def handle_image_post_save(sender, instance, **kwargs):
+    try:
+        ImageVariantService.schedule(instance)
+    except Exception as e:
+        logger.error(f"Error scheduling image variants for {sender.__name__} {instance.pk}: {str(e)}")
+
+
+@receiver(post_save, sender=models.Predefined_Ingredients)
+@receiver(post_save, sender=models.Predefined_Starch)
+@receiver(post_save, sender=models.Predefined_Vegetable)
+@receiver(post_save, sender=models.MenuCategoryies)
+@receiver(post_save, sender=models.DictionaryItem)
+@receiver(post_delete, sender=models.Predefined_Ingredients)
+@receiver(post_delete, sender=models.Predefined_Starch)
+@receiver(post_delete, sender=models.Predefined_Vegetable)
+@receiver(post_delete, sender=models.MenuCategoryies)
+@receiver(post_delete, sender=models.DictionaryItem)
+def handle_spellcheck_lexicon_change(sender, **kwargs):
+    # Rebuilt on next use in this process; other processes pick it up within SPELLCHECK_LEXICON_TTL.
+    CulinarySpellChecker.invalidate()
+
+
 @receiver(user_logged_in)
 def log_user_login(sender, request, user, **kwargs):
     """
@@ -509,50 +638,16 @@ def log_user_login(sender, request, user, **kwargs):
 @receiver(post_save, sender=models.Starch_Preparation)
 def handle_starch_preparation_post_save(sender, instance, created, **kwargs):
     """
-    Handle starch preparation post-save operations - schedule background job
+    Handle starch preparation post-save operations - queue background job
     """
+    if instance.image_url:
+        logger.info(
+            f"Starch preparation {instance.id} already has image, skipping generation"
+        )
+        return
     try:
-        # Try APScheduler first, fallback to threading
-        try:
-            if not instance.image_url:
-                JobSchedulerService.schedule_starch_image_generation(
-                    instance.id, delay_seconds=10
-                )
-                logger.info(
-                    f"Scheduled APScheduler job for starch preparation {instance.id}"
-                )
-            else:
-                logger.info(
-                    f"Starch preparation {instance.id} already has image, skipping generation"
-                )
-                return
-            
-        except Exception as e:
-            logger.warning(f"APScheduler failed, using threading fallback: {str(e)}")
-            # # Fallback to threading
-            # ThreadingJobService.run_delayed_job(
-            #     generate_starch_image_job, [instance.id], 10
-            # )
-            # logger.info(f"Scheduled threading job for starch preparation {instance.id}")
-
+        JobSchedulerService.schedule_starch_image_generation(instance.id, delay_seconds=10)
     except Exception as e:
         logger.error(
             f"Error scheduling job for starch preparation {instance.id}: {str(e)}"
         )
-
-
-# Graceful shutdown
-import atexit
-
-
-def shutdown_scheduler():
-    """Shutdown scheduler gracefully"""
-    try:
-        if scheduler.running:
-            scheduler.shutdown(wait=True)
-            logger.info("Scheduler shutdown successfully")
-    except Exception as e:
-        logger.error(f"Error shutting down scheduler: {str(e)}")
-
-
-atexit.register(shutdown_scheduler)
@@ -0,0 +1,246 @@
+import re
+import time
+import logging
+import threading
+from pathlib import Path
+from dataclasses import dataclass, field
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+MAX_DISTANCE = 2
+PREFIX_LENGTH = 7
+# Culinary terms outrank general English words when choosing between suggestions.
+LEXICON_FREQUENCY = 1_000_000
+WORDLIST_PATH = Path(__file__).resolve().parent / "data" / "english_words.txt"
+
+# Regular suffixes accepted on dictionary words: (suffix, replacement for the stem).
+INFLECTIONS = (("s", ""), ("es", ""), ("ies", "y"), ("ed", ""), ("ed", "e"), ("ing", ""), ("ing", "e"), ("ly", ""))
+
+TOKEN = re.compile(r"[^\W\d_]+(?:['’][^\W\d_]+)*")
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance between ``a`` and ``b``, or ``limit + 1`` once it exceeds ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+            row_min = min(row_min, current[j])
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def deletes(word, distance):
+    """All strings reachable from ``word`` by removing up to ``distance`` characters."""
+    found = set()
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {term[:i] + term[i + 1:] for term in frontier for i in range(len(term))} - found
+        found |= frontier
+    return found
+
+
+def match_case(word, template):
+    if template.isupper() and len(template) > 1:
+        return word.upper()
+    if template[:1].isupper():
+        return word[:1].upper() + word[1:]
+    return word
+
+
+@dataclass
+class SpellCheckResult:
+    text: str
+    # Tokens the index could not resolve confidently; left unchanged in ``text``.
+    unresolved: list = field(default_factory=list)
+
+
+class SymSpell:
+    """
+    Symmetric-delete spelling index: every dictionary word and every lookup
+    term are reduced to their deletes (of a fixed-length prefix) and matched
+    through a hash table, so a lookup costs a few dictionary probes instead
+    of a scan of the vocabulary.
+    """
+
+    def __init__(self, max_distance=MAX_DISTANCE, prefix_length=PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.words = {}
+        self.index = {}
+
+    def add(self, word, frequency=1):
+        word = word.lower()
+        if word in self.words:
+            self.words[word] = max(self.words[word], frequency)
+            return
+        self.words[word] = frequency
+        prefix = word[:self.prefix_length]
+        for key in deletes(prefix, self.max_distance) | {prefix}:
+            self.index.setdefault(key, []).append(word)
+
+    def __contains__(self, word):
+        return word in self.words
+
+    def lookup(self, term):
+        """Suggestions as ``[(distance, word)]`` closest first, most frequent first among equals."""
+        term = term.lower()
+        if term in self.words:
+            return [(0, term)]
+        prefix = term[:self.prefix_length]
+        candidates = set()
+        for key in deletes(prefix, self.max_distance) | {prefix}:
+            candidates.update(self.index.get(key, ()))
+        suggestions = []
+        for word in candidates:
+            distance = edit_distance(term, word, self.max_distance)
+            if distance <= self.max_distance:
+                suggestions.append((distance, -self.words[word], word))
+        suggestions.sort()
+        return [(distance, word) for distance, _, word in suggestions]
+
+
+class CulinarySpellChecker:
+    """
+    Offline spell checker over the culinary lexicon (predefined ingredients,
+    starches, vegetables, menu categories, dictionary terms) and a general
+    English word list. Tokens it cannot correct with confidence are reported
+    as unresolved so the caller can ask the LLM about just those.
+    """
+
+    _instance = None
+    _built_at = 0.0
+    _lock = threading.Lock()
+
+    def __init__(self, index, lexicon_words=(), full_wordlist=False):
+        self.index = index
+        self.lexicon_words = set(lexicon_words)
+        # Only a configured frequency dictionary is complete enough to correct
+        # to a general English word; the bundled list just backs ``known()``.
+        self.full_wordlist = full_wordlist
+        # Token -> correction; recipe text repeats the same words constantly.
+        self.memo = {}
+
+    @staticmethod
+    def lexicon():
+        from app import models
+
+        names = []
+        for model, column in (
+            (models.Predefined_Ingredients, "name"),
+            (models.Predefined_Starch, "name"),
+            (models.Predefined_Vegetable, "name"),
+            (models.MenuCategoryies, "category_name"),
+            (models.DictionaryItem, "term"),
+        ):
+            names.extend(model.objects.exclude(**{f"{column}__isnull": True}).values_list(column, flat=True))
+        return names
+
+    @staticmethod
+    def wordlist():
+        """Words of the general word list with a frequency, from ``word`` or ``word count`` lines, most common first."""
+        path = getattr(settings, "SPELLCHECK_WORDLIST", None) or WORDLIST_PATH
+        with open(path, encoding="utf-8") as file:
+            lines = [line.split() for line in file if line.strip()]
+        return [
+            (parts[0], int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else len(lines) - rank)
+            for rank, parts in enumerate(lines)
+        ]
+
+    @classmethod
+    def build(cls):
+        started = time.monotonic()
+        index = SymSpell()
+        for word, frequency in cls.wordlist():
+            index.add(word, frequency)
+        lexicon_words = set()
+        for name in cls.lexicon():
+            for token in TOKEN.findall(name):
+                index.add(token, LEXICON_FREQUENCY)
+                lexicon_words.add(token.lower())
+        logger.info(f"Built spell check index of {len(index.words)} words in {time.monotonic() - started:.2f}s")
+        return cls(index, lexicon_words, full_wordlist=bool(getattr(settings, "SPELLCHECK_WORDLIST", None)))
+
+    def known(self, word):
+        """In the dictionary, directly or as a regular inflection of a dictionary word."""
+        if word in self.index:
+            return True
+        for suffix, replacement in INFLECTIONS:
+            stem = word[:-len(suffix)]
+            if not word.endswith(suffix) or len(stem) < 3 or stem + replacement not in self.index:
+                continue
+            # "tomatos" is not a plural of "tomato" when "tomatoes" is the known one.
+            if suffix != "s" or stem + "es" not in self.index:
+                return True
+        return False
+
+    def correct_token(self, token):
+        """The confident correction of ``token`` (possibly itself), or None if the LLM should decide."""
+        if token not in self.memo:
+            if len(self.memo) > 50000:
+                self.memo.clear()
+            self.memo[token] = self._correct_token(token)
+        return self.memo[token]
+
+    def _correct_token(self, token):
+        word = token.lower().replace("’", "'")
+        # Abbreviations, units and very short words are left alone.
+        if len(word) < 3 or (token.isupper() and len(token) > 1) or self.known(word):
+            return token
+        suggestions = self.index.lookup(word)
+        if not suggestions:
+            return None
+        distance, best = suggestions[0]
+        if len(word) < 4:
+            return None
+        if best not in self.lexicon_words and not self.full_wordlist:
+            # Valid words missing from the small bundled list ("miso", "sorrel")
+            # would otherwise be "corrected" to a close common word.
+            return None
+        runners_up = [other for other_distance, other in suggestions[1:] if other_distance == distance]
+        if distance == 1 and not runners_up:
+            return match_case(best, token)
+        if distance == 1 and self.index.words[best] >= 10 * max(self.index.words[other] for other in runners_up):
+            return match_case(best, token)
+        if distance == 2 and len(word) >= 6 and len(suggestions) == 1:
+            return match_case(best, token)
+        return None
+
+    def check(self, text):
+        unresolved = []
+
+        def replace(match):
+            corrected = self.correct_token(match.group())
+            if corrected is None:
+                unresolved.append(match.group())
+                return match.group()
+            return corrected
+
+        return SpellCheckResult(TOKEN.sub(replace, text), unresolved)
+
+    @classmethod
+    def get(cls):
+        """Shared checker, rebuilt after the lexicon changes or ``SPELLCHECK_LEXICON_TTL`` seconds."""
+        ttl = getattr(settings, "SPELLCHECK_LEXICON_TTL", 3600)
+        if cls._instance is None or time.monotonic() - cls._built_at > ttl:
+            with cls._lock:
+                if cls._instance is None or time.monotonic() - cls._built_at > ttl:
+                    cls._instance = cls.build()
+                    cls._built_at = time.monotonic()
+        return cls._instance
+
+    @classmethod
+    def invalidate(cls):
+        cls._instance = None
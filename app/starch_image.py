@@ -1,8 +1,11 @@
-from openai import OpenAI
 import os
 import time
 import base64
 from dotenv import load_dotenv
+from app.clients import backoff_delay
+from app.providers import openai_client
+from app.llm_scheduler import llm_scheduler, estimate_tokens, LLMCapacityExceeded
+from app.ai_image import IMAGE_TOKENS
 load_dotenv()
 
 class StarchImage:
@@ -14,10 +17,8 @@ class StarchImage:
         for attempt in range(max_retries):
             try: 
 
-                client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
                 prompt = f"""
-                Generate a high-quality, realistic food image of the dish called '{dish}'.
+                Generate a high-quality, realistic food image of the dish called '{dish_name}'.
                 Show the ENTIRE plate fully visible from edge to edge — absolutely no cropping or zooming.
                 Use a TOP-DOWN camera angle (flat lay) so the full plate fits naturally inside the frame.
                 Leave some clean space around the plate so all edges are clearly visible.
@@ -30,11 +31,12 @@ class StarchImage:
                 Ensure the food looks appetizing, natural, and suitable for a recipe illustration.
                 """
 
-                response = client.responses.create(
-                    model="gpt-4.1",  
-                    input=prompt,
-                    tools=[{"type": "image_generation"}],
-                )
+                with llm_scheduler.slot(estimate_tokens(prompt, IMAGE_TOKENS)):
+                    response = openai_client().responses.create(
+                        model="gpt-4.1",  
+                        input=prompt,
+                        tools=[{"type": "image_generation"}],
+                    )
 
                 for output in response.output:
                     if output.type == "image_generation_call":
@@ -43,10 +45,12 @@ class StarchImage:
                         # print("Output saved: output.png")
                         return output.result
 
+            except LLMCapacityExceeded:
+                raise
             except Exception as e:
                 last_exception = e
                 print(f"Error: {str(e)}")
-                time.sleep(wait_seconds)  
+                time.sleep(backoff_delay(attempt + 1, base=wait_seconds, cap=60))
        
         print("Error: ", str(last_exception))
         return {
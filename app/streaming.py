@@ -0,0 +1,31 @@
+import json
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+
+def sse_event(event, data):
+    """One server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets clients ask for ``text/event-stream`` on streaming actions. Regular
+    responses of those actions (validation errors) become one ``error`` event.
+    """
+
+    media_type = "text/event-stream"
+    format = "event-stream"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return sse_event("error", data).encode(self.charset)
+
+
+def event_stream_response(events):
+    """Stream the ``sse_event`` strings of ``events`` to the client as they are produced."""
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Keep nginx from buffering the stream until it ends.
+    response["X-Accel-Buffering"] = "no"
+    return response
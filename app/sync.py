@@ -0,0 +1,86 @@
+import logging
+from app import models
+from django.dispatch import Signal
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+# Sent once per RecipeChildrenSync.finish() because bulk_create/bulk_update
+# do not fire post_save. ``changes`` maps each child model to a SyncResult.
+recipe_children_changed = Signal()
+
+
+class SyncResult:
+    def __init__(self):
+        self.created = []
+        self.updated = []  # (instance, {field: (old, new)})
+        self.deleted = []  # primary keys
+
+    def __bool__(self):
+        return bool(self.created or self.updated or self.deleted)
+
+
+class RecipeChildrenSync:
+    """
+    Applies incoming child lists of a recipe as a diff against the rows that
+    exist: new rows go through one bulk_create, changed rows through one
+    bulk_update, missing rows through one delete, per collection.
+
+    Rows are matched on ``key`` (``id`` by default) among the parent's own
+    rows only; an unknown id is treated as a new row.
+    """
+
+    def __init__(self, recipe, created=False):
+        self.recipe = recipe
+        # A recipe created in this request has no children to diff against.
+        self.created = created
+        self.changes = {}
+
+    def collection(self, model, parent_field, parent, rows, fields, key="id", delete_missing=True):
+        result = self.changes.setdefault(model, SyncResult())
+        existing = {}
+        if not self.created:
+            for instance in model.objects.filter(**{parent_field: parent}):
+                existing.setdefault(getattr(instance, key), instance)
+
+        now = timezone.now()
+        key_field = model._meta.get_field(key)
+        to_create, to_update, seen = [], [], set()
+        for row in rows:
+            values = {field: row.get(field) for field in fields}
+            # Clients may send ids as strings ("12"); compare them as the field's type.
+            row_key = key_field.to_python(row.get(key))
+            instance = existing.get(row_key) if row_key is not None else None
+            if instance is None or instance.pk in seen:
+                to_create.append(model(**{parent_field: parent}, **values))
+                continue
+            seen.add(instance.pk)
+            changed = {
+                field: (getattr(instance, field), value)
+                for field, value in values.items()
+                if getattr(instance, field) != value
+            }
+            if changed:
+                for field, (_, value) in changed.items():
+                    setattr(instance, field, value)
+                instance.updated_at = now
+                to_update.append((instance, changed))
+
+        if to_create:
+            result.created += model.objects.bulk_create(to_create)
+        if to_update:
+            model.objects.bulk_update([instance for instance, _ in to_update], [*fields, "updated_at"])
+            result.updated += to_update
+        if delete_missing:
+            missing = [instance.pk for instance in existing.values() if instance.pk not in seen]
+            if missing:
+                model.objects.filter(pk__in=missing).delete()
+                result.deleted += missing
+        return result
+
+    def finish(self):
+        changes = {model: result for model, result in self.changes.items() if result}
+        if changes:
+            recipe_children_changed.send(sender=models.Recipe, recipe=self.recipe, changes=changes)
+        return changes
@@ -1,6 +1,7 @@
 
-from app import models, choices
+from app import models, choices, jobs
 
+@jobs.register("publish_scheduled_dish", concurrency=1, max_attempts=5)
 def create_or_update_schedule_dish(dish_id):
     try:
         dish = models.Recipe.objects.get(id=dish_id)
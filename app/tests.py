@@ -1,3 +1,324 @@
-from django.test import TestCase
+import json
+import time
+import tempfile
+import threading
+from datetime import timedelta
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from app import models, choices
+from app.pagination import KeysetPagination
+from app.spellcheck import CulinarySpellChecker
+from app.sync import RecipeChildrenSync
+from app.views import RecipeViewSet
+from app.serializers import StepSerializer
+from app.jobs import HANDLERS, JobQueue, register
+from app.llm_scheduler import BACKGROUND, INTERACTIVE, LLMCapacityExceeded, LLMScheduler
+from app.utils import bulk_store_wine_pairings
 
-# Create your tests here.
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.recipes = models.Recipe.objects.bulk_create([models.Recipe(dish_name=f"Dish {i}") for i in range(7)])
+        self.factory = APIRequestFactory()
+
+    def paginate(self, url, queryset=None):
+        paginator = KeysetPagination()
+        queryset = models.Recipe.objects.all() if queryset is None else queryset
+        rows = paginator.paginate_queryset(queryset, Request(self.factory.get(url)))
+        return [row.id for row in rows], paginator.get_paginated_response([]).data
+
+    def test_cursors_walk_every_row_once_in_keyset_order(self):
+        expected = list(models.Recipe.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        seen, pages = [], []
+        url = "/recipes/?cursor=&page_size=3"
+        while url:
+            ids, data = self.paginate(url)
+            seen += ids
+            pages.append(data["page"])
+            self.assertIsNone(data["count"])
+            url = data["next"]
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, [1, 2, 3])
+
+    def test_previous_cursor_returns_the_previous_page(self):
+        first, data = self.paginate("/recipes/?cursor=&page_size=3")
+        second, data = self.paginate(data["next"])
+        previous, data = self.paginate(data["previous"])
+        self.assertEqual(previous, first)
+        self.assertEqual(data["page"], 1)
+        self.assertIsNone(data["previous"])
+
+    def test_page_numbers_are_used_without_a_cursor(self):
+        ids, data = self.paginate("/recipes/?page=2&page_size=3", models.Recipe.objects.order_by("id"))
+        self.assertEqual(ids, [recipe.id for recipe in self.recipes[3:6]])
+        self.assertEqual(data["count"], 7)
+
+    def test_client_ordering_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            self.paginate("/recipes/?cursor=&ordering=dish_name")
+
+    def test_invalid_cursor_is_not_found(self):
+        with self.assertRaises(NotFound):
+            self.paginate("/recipes/?cursor=bm90LWEtY3Vyc29y")
+
+
+class RecipeChildrenSyncTests(TestCase):
+    def setUp(self):
+        self.recipe = models.Recipe.objects.bulk_create([models.Recipe(dish_name="Risotto")])[0]
+        self.steps = models.Steps.objects.bulk_create(
+            [models.Steps(recipe=self.recipe, title=title) for title in ("Toast rice", "Add stock", "Rest")]
+        )
+
+    def sync(self, rows):
+        sync = RecipeChildrenSync(self.recipe)
+        result = sync.collection(models.Steps, "recipe", self.recipe, rows, ["title"])
+        sync.finish()
+        return result
+
+    def test_string_ids_update_existing_rows(self):
+        first, second, third = self.steps
+        result = self.sync([
+            {"id": str(first.id), "title": "Toast rice"},
+            {"id": str(second.id), "title": "Add hot stock"},
+            {"title": "Finish with butter"},
+        ])
+        self.assertEqual([instance.id for instance, _ in result.updated], [second.id])
+        self.assertEqual(len(result.created), 1)
+        self.assertEqual(result.deleted, [third.id])
+        self.assertEqual(
+            sorted(models.Steps.objects.filter(recipe=self.recipe).values_list("title", flat=True)),
+            ["Add hot stock", "Finish with butter", "Toast rice"],
+        )
+
+    def test_ids_of_other_recipes_create_new_rows(self):
+        other = models.Recipe.objects.bulk_create([models.Recipe(dish_name="Paella")])[0]
+        foreign = models.Steps.objects.bulk_create([models.Steps(recipe=other, title="Bloom saffron")])[0]
+        result = self.sync([{"id": str(foreign.id), "title": "Bloom saffron"}])
+        self.assertEqual(len(result.created), 1)
+        self.assertEqual(models.Steps.objects.get(id=foreign.id).recipe_id, other.id)
+
+    def test_validated_rows_convert_ids_and_reject_bad_ones(self):
+        rows = RecipeViewSet._validated_rows(StepSerializer, [{"id": "12", "title": "Rest"}, {"title": "Serve"}])
+        self.assertEqual([row["id"] for row in rows], [12, None])
+        with self.assertRaises(ValidationError):
+            RecipeViewSet._validated_rows(StepSerializer, [{"id": "twelve", "title": "Rest"}])
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        register("test_job", concurrency=2, max_attempts=2, backoff=10, timeout=60)(self.handle)
+        self.addCleanup(HANDLERS.pop, "test_job", None)
+
+    def handle(self, value):
+        if value == "fail":
+            raise RuntimeError("boom")
+        self.calls.append(value)
+
+    def claim(self, worker_id="worker-1"):
+        return JobQueue.claim(worker_id, types=["test_job"])
+
+    def test_claims_respect_the_type_concurrency(self):
+        for value in range(3):
+            JobQueue.enqueue("test_job", value)
+        self.assertEqual(len(self.claim()), 2)
+        self.assertEqual(self.claim("worker-2"), [])
+
+    def test_jobs_are_not_claimed_before_run_at(self):
+        JobQueue.enqueue("test_job", 1, delay=60)
+        self.assertEqual(self.claim(), [])
+
+    def test_dedupe_key_returns_the_pending_job(self):
+        job = JobQueue.enqueue("test_job", 1, dedupe_key="test:1", delay=10)
+        same = JobQueue.enqueue("test_job", 1, dedupe_key="test:1", delay=30, debounce=True)
+        self.assertEqual(same.id, job.id)
+        self.assertEqual(models.Job.objects.filter(dedupe_key="test:1").count(), 1)
+        self.assertGreater(models.Job.objects.get(id=job.id).run_at, job.run_at + timedelta(seconds=15))
+
+    def test_failed_job_is_retried_with_backoff_then_failed(self):
+        job = JobQueue.enqueue("test_job", "fail")
+        [claimed] = self.claim()
+        self.assertFalse(JobQueue.run(claimed))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (choices.JobStatus.QUEUED, 1))
+        self.assertGreaterEqual(job.run_at, timezone.now() + timedelta(seconds=9))
+        self.assertIn("boom", job.last_error)
+
+        models.Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        [claimed] = self.claim()
+        self.assertFalse(JobQueue.run(claimed))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (choices.JobStatus.FAILED, 2))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_expired_lease_is_claimed_again_and_the_old_worker_cannot_finish_it(self):
+        JobQueue.enqueue("test_job", 1)
+        [stale] = self.claim()
+        models.Job.objects.filter(id=stale.id).update(locked_until=timezone.now() - timedelta(seconds=1))
+        [claimed] = self.claim("worker-2")
+        self.assertEqual((claimed.id, claimed.attempts, claimed.locked_by), (stale.id, 2, "worker-2"))
+        JobQueue.run(stale)
+        self.assertEqual(models.Job.objects.get(id=stale.id).status, choices.JobStatus.RUNNING)
+        self.assertTrue(JobQueue.run(claimed))
+        self.assertEqual(models.Job.objects.get(id=stale.id).status, choices.JobStatus.DONE)
+        self.assertEqual(self.calls, [1, 1])
+
+    def test_renew_extends_the_lease(self):
+        JobQueue.enqueue("test_job", 1)
+        [claimed] = self.claim()
+        models.Job.objects.filter(id=claimed.id).update(locked_until=timezone.now() + timedelta(seconds=1))
+        JobQueue.renew([claimed])
+        self.assertGreater(models.Job.objects.get(id=claimed.id).locked_until, timezone.now() + timedelta(seconds=50))
+        self.assertEqual(self.claim("worker-2"), [])
+
+    def test_retry_is_superseded_by_a_newer_queued_job(self):
+        JobQueue.enqueue("test_job", "fail", dedupe_key="test:fail")
+        [claimed] = self.claim()
+        newer = JobQueue.enqueue("test_job", "fail", dedupe_key="test:fail")
+        self.assertNotEqual(newer.id, claimed.id)
+        self.assertFalse(JobQueue.run(claimed))
+        failed = models.Job.objects.get(id=claimed.id)
+        self.assertEqual(failed.status, choices.JobStatus.CANCELLED)
+        self.assertIn(f"superseded by job {newer.id}", failed.last_error)
+        self.assertEqual(models.Job.objects.get(id=newer.id).status, choices.JobStatus.QUEUED)
+
+
+class CulinarySpellCheckerTests(TestCase):
+    def setUp(self):
+        for name in ("chicken", "lemon", "butter", "basil"):
+            models.Predefined_Ingredients.objects.create(name=name)
+
+    def test_valid_culinary_words_pass_through_unchanged(self):
+        checker = CulinarySpellChecker.build()
+        text = "Miso dashi with carrot batons, currants, sorrel, ham hock, tripe, spelt and fleur de sel"
+        self.assertEqual(checker.check(text).text, text)
+
+    def test_corrects_to_lexicon_terms(self):
+        checker = CulinarySpellChecker.build()
+        result = checker.check("Chiken with lemmon buter")
+        self.assertEqual(result.text, "Chicken with lemon butter")
+        self.assertEqual(result.unresolved, [])
+
+    def test_unknown_words_are_left_to_the_model(self):
+        checker = CulinarySpellChecker.build()
+        self.assertIn("sorrel", checker.check("sorrel").unresolved)
+
+    def test_corrects_general_words_with_a_configured_wordlist(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt") as wordlist:
+            wordlist.write("sauce 5000\nsorrel 20\nsorbet 40\n")
+            wordlist.flush()
+            with override_settings(SPELLCHECK_WORDLIST=wordlist.name):
+                checker = CulinarySpellChecker.build()
+        self.assertEqual(checker.check("Sauze").text, "Sauce")
+        self.assertEqual(checker.check("sorrel").text, "sorrel")
+
+
+@override_settings(
+    LLM_MAX_CONCURRENCY=1,
+    LLM_TENANT_CONCURRENCY=1,
+    LLM_TENANT_REQUESTS_PER_MINUTE=2,
+    LLM_TENANT_TOKENS_PER_MINUTE=1000,
+    LLM_INTERACTIVE_MAX_WAIT=0.3,
+)
+class LLMSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        self.scheduler = LLMScheduler()
+
+    def context(self, tenant, priority=INTERACTIVE):
+        return {"tenant": tenant, "priority": priority}
+
+    def test_calls_within_budget_are_admitted(self):
+        for _ in range(2):
+            self.assertEqual(self.scheduler.call(lambda: "ok", 100, self.context(1)), "ok")
+        self.assertEqual(self.scheduler.stats()["tenants"]["1"]["completed"], 2)
+
+    def test_exhausted_request_budget_is_rejected_with_retry_after(self):
+        for _ in range(2):
+            self.scheduler.call(lambda: None, 10, self.context(1))
+        with self.assertRaises(LLMCapacityExceeded) as raised:
+            self.scheduler.call(lambda: None, 10, self.context(1))
+        self.assertGreaterEqual(raised.exception.retry_after, 1)
+        # Other restaurants keep their own budget.
+        self.assertEqual(self.scheduler.call(lambda: "ok", 10, self.context(2)), "ok")
+
+    def test_exhausted_token_budget_is_rejected(self):
+        self.scheduler.call(lambda: None, 900, self.context(1))
+        with self.assertRaises(LLMCapacityExceeded):
+            self.scheduler.call(lambda: None, 500, self.context(1))
+
+    def test_call_waiting_past_its_limit_is_rejected(self):
+        with self.scheduler.slot(10, self.context(1)):
+            with self.assertRaises(LLMCapacityExceeded):
+                self.scheduler.call(lambda: None, 10, self.context(2))
+        self.assertEqual(self.scheduler.stats()["queued"]["interactive"], 0)
+
+    @override_settings(LLM_INTERACTIVE_MAX_WAIT=5)
+    def test_interactive_calls_go_ahead_of_background_calls(self):
+        order = []
+
+        def queue(tenant, priority):
+            thread = threading.Thread(
+                target=self.scheduler.call, args=(lambda: order.append(priority), 10, self.context(tenant, priority))
+            )
+            thread.start()
+            return thread
+
+        def wait_for_queue(count):
+            deadline = time.monotonic() + 5
+            while len(self.scheduler.queue) < count and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(len(self.scheduler.queue), count)
+
+        with self.scheduler.slot(10, self.context(1)):
+            threads = [queue(2, BACKGROUND)]
+            wait_for_queue(1)
+            threads.append(queue(3, INTERACTIVE))
+            wait_for_queue(2)
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(order, [INTERACTIVE, BACKGROUND])
+
+
+class BulkStoreWinePairingsTests(TestCase):
+    def setUp(self):
+        self.risotto, self.steak, self.salad = models.Recipe.objects.bulk_create(
+            [models.Recipe(dish_name=name) for name in ("Risotto", "Steak", "Salad")]
+        )
+        self.barolo = models.Wine.objects.create(wine_name="Barolo", wine_type="Red", flavor="tar and roses")
+        self.chianti = models.Wine.objects.create(wine_name="Chianti", wine_type="Red")
+        through = models.Recipe.wine_pairing.through
+        through.objects.bulk_create([
+            through(recipe_id=self.risotto.id, wine_id=self.chianti.id),
+            through(recipe_id=self.salad.id, wine_id=self.chianti.id),
+        ])
+
+    def pairing(self, *wines):
+        return json.dumps([{"wine_name": name, "wine_type": wine_type, "flavor": "new"} for name, wine_type in wines])
+
+    def wines(self, recipe):
+        return set(recipe.wine_pairing.values_list("wine_name", flat=True))
+
+    def test_existing_wines_are_reused_and_stale_links_replaced(self):
+        stored = bulk_store_wine_pairings({
+            self.risotto.id: self.pairing(("Barolo", "Red"), ("Soave", "White")),
+            self.steak.id: self.pairing(("Barolo", "Red")),
+        })
+        self.assertEqual(stored[self.steak.id], [self.barolo.id])
+        self.assertEqual(self.wines(self.risotto), {"Barolo", "Soave"})
+        self.assertEqual(self.wines(self.steak), {"Barolo"})
+        self.assertEqual(models.Wine.objects.filter(wine_name="Barolo").count(), 1)
+        # Existing wines keep their details; the unlinked one stays for the other recipe.
+        self.assertEqual(models.Wine.objects.get(id=self.barolo.id).flavor, "tar and roses")
+        self.assertEqual(self.wines(self.salad), {"Chianti"})
+
+    def test_unchanged_links_are_kept(self):
+        link = models.Recipe.wine_pairing.through.objects.get(recipe_id=self.risotto.id)
+        bulk_store_wine_pairings({self.risotto.id: self.pairing(("Chianti", "Red"))})
+        self.assertTrue(models.Recipe.wine_pairing.through.objects.filter(id=link.id).exists())
+
+    def test_recipes_without_usable_pairings_keep_their_wines(self):
+        self.assertEqual(bulk_store_wine_pairings({self.salad.id: self.pairing(("", "Red"))}), {})
+        self.assertEqual(self.wines(self.salad), {"Chianti"})
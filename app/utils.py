@@ -1,25 +1,27 @@
-from apscheduler.schedulers.background import BackgroundScheduler
 from django.core.signals import request_finished
-import os, json, threading, logging, requests, time
+import os, json, threading, logging, time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from app.prompts.prompts import wine_paring, menu_generation, video_script_prompt, translate_prompt
-from django.shortcuts import get_object_or_404
-from django.core.files.base import ContentFile
+from app.llm_cache import llm_cache, cache_key, normalize
+from app.spellcheck import CulinarySpellChecker, TOKEN
+from app.clients import http, s3_client
+from app.providers import chat_model, openai_client, synthesia_url, synthesia_api_url
+from app.llm_scheduler import llm_scheduler, estimate_tokens, LLMCapacityExceeded
+from app.wine_index import WinePairingIndex
+from django.db import transaction
+from django.db.models import Q
+from django.core.files.base import ContentFile, File
 from rest_framework.response import Response
 from project import settings
 from dateutil.parser import isoparse
-import boto3
 from botocore.exceptions import ClientError
-from openai import OpenAI
 from ast import literal_eval
 
-scheduler = BackgroundScheduler()
-
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -43,23 +45,26 @@ class CulinaryAI:
       
         self.config = config or CulinaryConfig()
         self._initialize_environment()
-        self._setup_llm()
+        self._llm = None
         self._setup_prompts()
         
     def _initialize_environment(self) -> None:
         load_dotenv()
-        self.api_key = os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
-            raise CulinaryAIException("OpenAI API key not found in environment variables")
+
+    @property
+    def llm(self):
+        """The chat model of the configured provider (``AI_PROVIDER``), created on first use."""
+        if self._llm is None:
+            self._setup_llm()
+        return self._llm
+
+    @llm.setter
+    def llm(self, value):
+        self._llm = value
             
     def _setup_llm(self) -> None:
         try:
-            self.llm = ChatOpenAI(
-                model=self.config.model_name,
-                temperature=self.config.temperature,
-                max_tokens=self.config.max_tokens,
-                openai_api_key=self.api_key
-            )
+            self._llm = chat_model(self.config)
         except Exception as e:
             logger.error(f"Error setting up LLM: {str(e)}")
             raise CulinaryAIException(f"Failed to initialize LLM: {str(e)}")
@@ -69,12 +74,21 @@ class CulinaryAI:
         self.wine_pairing_prompt = ChatPromptTemplate.from_template(wine_paring)
         self.menu_generation_prompt = ChatPromptTemplate.from_template(menu_generation)
         self.video_script_prompt = ChatPromptTemplate.from_template(video_script_prompt)
+
+    def _cached(self, operation, template, inputs, call, normalizer=normalize):
+        """Serve identical requests (same prompt, model settings and inputs) from the LLM response cache."""
+        key = cache_key(operation, template, asdict(self.config), inputs, normalizer=normalizer)
+        tokens = estimate_tokens(template + json.dumps(inputs, default=str), self.config.max_tokens)
+        return llm_cache.get_or_call(operation, key, lambda: llm_scheduler.call(call, tokens))
         
     def get_wine_pairing(self, dish: str) -> str:
         try:
             logger.info(f"Generating wine pairing for dish: {dish}")
             chain = self.wine_pairing_prompt | self.llm | StrOutputParser()
-            return chain.invoke({"dish": dish})
+            inputs = {"dish": dish}
+            return self._cached("wine_pairing", wine_paring, inputs, lambda: chain.invoke(inputs))
+        except LLMCapacityExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error generating wine pairing: {str(e)}")
             raise CulinaryAIException(f"Failed to generate wine pairing: {str(e)}")
@@ -94,36 +108,89 @@ class CulinaryAI:
             logger.info(f"Generating menu for {cuisine_style} cuisine with {dietary_preferences} preferences")
             logger.info(f"Available ingredients: {dietary_restrictions}")
             chain = self.menu_generation_prompt | self.llm | StrOutputParser()
-            return chain.invoke({
-                "available_ingredients": available_ingredients,
-                "cuisine_style": cuisine_style,
-                "dietary_preferences": dietary_preferences,
-                "theme": theme,
-                "target_audience": target_audience,
-                "price_range": price_range,
-                "dietary_restrictions": dietary_restrictions,
-                "menu_class": menu_class
-            })
+            inputs = self.menu_inputs(
+                available_ingredients, cuisine_style, target_audience, price_range,
+                dietary_preferences, theme, dietary_restrictions, menu_class,
+            )
+            return self._cached("menu", menu_generation, inputs, lambda: chain.invoke(inputs))
+        except LLMCapacityExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error generating menu: {str(e)}")
             raise CulinaryAIException(f"Failed to generate menu: {str(e)}")
 
+    @staticmethod
+    def menu_inputs(
+        available_ingredients: List[str],
+        cuisine_style: str,
+        target_audience: str,
+        price_range: float,
+        dietary_preferences: Optional[str] = "",
+        theme: Optional[str] = "festival",
+        dietary_restrictions: Optional[str] = None,
+        menu_class: Optional[str] = None,
+    ) -> dict:
+        return {
+            "available_ingredients": available_ingredients,
+            "cuisine_style": cuisine_style,
+            "dietary_preferences": dietary_preferences,
+            "theme": theme,
+            "target_audience": target_audience,
+            "price_range": price_range,
+            "dietary_restrictions": dietary_restrictions,
+            "menu_class": menu_class
+        }
+
+    def stream_menu(self, context=None, **menu):
+        """
+        ``generate_menu`` as text chunks, yielded as the model produces them.
+        A cached menu comes back as one chunk; a new one is cached once it is
+        complete, so the joined chunks are what ``generate_menu`` returns.
+        ``context`` is the scheduler context of the request (see ``llm_scheduler.current``).
+        """
+        try:
+            inputs = self.menu_inputs(**menu)
+            key = cache_key("menu", menu_generation, asdict(self.config), inputs)
+            cached = llm_cache.get_many("menu", [key])
+            if key in cached:
+                yield cached[key]
+                return
+            chain = self.menu_generation_prompt | self.llm | StrOutputParser()
+            tokens = estimate_tokens(menu_generation + json.dumps(inputs, default=str), self.config.max_tokens)
+            chunks = []
+            with llm_scheduler.slot(tokens, context):
+                started = time.monotonic()
+                for chunk in chain.stream(inputs):
+                    chunks.append(chunk)
+                    yield chunk
+            llm_cache.set_many("menu", {key: "".join(chunks)}, time.monotonic() - started)
+        except LLMCapacityExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming menu: {str(e)}")
+            raise CulinaryAIException(f"Failed to generate menu: {str(e)}")
+
     def generate_video_script(self, previous_menu, language: str):
         try:
             prompt = translate_prompt.format(menu=previous_menu, language=language)
-            menu = self.llm.invoke(prompt)
             # logger.info(f"Generating video script for menu: {menu}")
             # chain = self.video_script_prompt | self.llm | StrOutputParser()
             # print(chain.invoke({"menu": menu}), "chain")
-            return menu.content
+            # The menu is JSON whose values are translated verbatim, so only the language is normalized.
+            inputs = {"menu": json.dumps(previous_menu, sort_keys=True, default=str), "language": language}
+            return self._cached(
+                "video_script",
+                translate_prompt,
+                inputs,
+                lambda: self.llm.invoke(prompt).content,
+                normalizer=lambda values: {**values, "language": normalize(values["language"])},
+            )
+        except LLMCapacityExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error generating video script: {str(e)}")
             raise CulinaryAIException(f"Failed to generate video script: {str(e)}")     
 
-def start_scheduler():
-    if not scheduler.running:
-        scheduler.start()
-
 _user = threading.local()
 def set_current_user(user):
     _user.value = user
@@ -135,48 +202,112 @@ def clear_current_user(sender, **kwargs):
     _user.value = None
 request_finished.connect(clear_current_user)
 
-def store_wine_pairings(json_data, recipe_id=None):
+def store_wine_pairings(json_data, recipe_id=None, description=None):
     from app import models
 
     try:
-        if isinstance(json_data, str):
-            wine_pairings = json.loads(json_data)
-        else:
-            wine_pairings = json_data
-        
-        recipe = get_object_or_404(models.Recipe, id=recipe_id)
-        new_wine_ids = []
-        for pairing in wine_pairings:
-            wine, created = models.Wine.objects.get_or_create(
-                wine_name=pairing.get('wine_name'),
-                wine_type=pairing.get('wine_type'),
-                defaults={
-                    'flavor': pairing.get('flavor', ''),
-                    'profile': pairing.get('profile', ''),
-                    'proteins':pairing.get('proteins', ''),
-                    'reason_for_pairing': pairing.get('reason_for_pairing', ''),
-                    'region_name': pairing.get('region_name', ''),
-
-                },
-            )
-
-            new_wine_ids.append(wine.id)
-        if new_wine_ids:
-            recipe.wine_pairing.clear()
-
-        wines_to_add = models.Wine.objects.filter(
-            wine_name__in=[p.get('wine_name') for p in wine_pairings],
-            wine_type__in=[p.get('wine_type') for p in wine_pairings]
-        )
-        recipe.wine_pairing.add(*wines_to_add)
-
+        if not wine_pairing_rows(json_data):
+            return True
+        # Request bodies may carry the id as a string; results are keyed by the int pk.
+        recipe_id = models.Recipe._meta.pk.to_python(recipe_id)
+        stored = bulk_store_wine_pairings({recipe_id: json_data}, {recipe_id: description} if description else None)
+        if recipe_id not in stored:
+            logger.error(f"Error in store_wine_pairings: recipe {recipe_id} not found")
+            return False
         return True
     except Exception as e:
         logger.error(f"Error in store_wine_pairings: {str(e)}")
         return False
 
+def wine_pairing_rows(json_data):
+    """The pairings of an LLM wine pairing response keyed by ``(wine_name, wine_type)``, first occurrence kept."""
+    wine_pairings = json.loads(json_data) if isinstance(json_data, str) else json_data
+    rows = {}
+    for pairing in wine_pairings or []:
+        key = (pairing.get('wine_name'), pairing.get('wine_type'))
+        if key[0] and key[1]:
+            rows.setdefault(key, pairing)
+    return rows
+
+def wine_ids_for(keys):
+    """Ids of the wines with exactly these ``(wine_name, wine_type)`` pairs."""
+    from app import models
+
+    keys = list(keys)
+    ids = {}
+    for start in range(0, len(keys), 500):
+        condition = Q()
+        for wine_name, wine_type in keys[start:start + 500]:
+            condition |= Q(wine_name=wine_name, wine_type=wine_type)
+        for wine_id, wine_name, wine_type in models.Wine.objects.filter(condition).values_list('id', 'wine_name', 'wine_type'):
+            ids[(wine_name, wine_type)] = wine_id
+    return ids
+
+def bulk_store_wine_pairings(pairings, descriptions=None):
+    """
+    Store the wine pairings of many recipes, ``{recipe_id: pairing JSON}``,
+    replacing their current wines. Wines are inserted in bulk against the
+    ``(wine_name, wine_type)`` unique constraint and linked with one delete
+    and one insert on the through table, so the number of queries does not
+    grow with the number of recipes. Returns ``{recipe_id: [wine ids]}``.
+    """
+    from app import models
+    from app.documents import RecipeDocumentService
+    from app.search import RecipeSearchService
+
+    rows = {recipe_id: wine_pairing_rows(json_data) for recipe_id, json_data in pairings.items()}
+    wines = {}
+    for recipe_rows in rows.values():
+        for key, pairing in recipe_rows.items():
+            wines.setdefault(key, models.Wine(
+                wine_name=key[0],
+                wine_type=key[1],
+                flavor=pairing.get('flavor', ''),
+                profile=pairing.get('profile', ''),
+                proteins=pairing.get('proteins', ''),
+                reason_for_pairing=pairing.get('reason_for_pairing', ''),
+                region_name=pairing.get('region_name', ''),
+            ))
+    # Recipes without any usable pairing keep their current wines.
+    rows = {recipe_id: recipe_rows for recipe_id, recipe_rows in rows.items() if recipe_rows}
+    if not rows:
+        return {}
+
+    through = models.Recipe.wine_pairing.through
+    with transaction.atomic():
+        # Lock the recipes (in id order) so concurrent writers for the same recipe replace its wines one after
+        # the other instead of both keeping theirs; deleted recipes drop out here.
+        recipe_ids = list(
+            models.Recipe.objects.select_for_update().filter(id__in=list(rows)).order_by('id').values_list('id', flat=True)
+        )
+        if not recipe_ids:
+            return {}
+        # Existing wines (or ones a concurrent writer just inserted) are left as they are.
+        models.Wine.objects.bulk_create(list(wines.values()), ignore_conflicts=True, batch_size=500)
+        ids = wine_ids_for(wines)
+        stored = {recipe_id: [ids[key] for key in rows[recipe_id] if key in ids] for recipe_id in recipe_ids}
+        # Links that stay are kept rather than deleted and re-inserted.
+        stale = Q()
+        for recipe_id, wine_ids in stored.items():
+            stale |= Q(recipe_id=recipe_id) & ~Q(wine_id__in=wine_ids)
+        through.objects.filter(stale).delete()
+        through.objects.bulk_create(
+            [through(recipe_id=recipe_id, wine_id=wine_id) for recipe_id, wine_ids in stored.items() for wine_id in wine_ids],
+            ignore_conflicts=True,
+            batch_size=1000,
+        )
+        # The through table writes skip m2m_changed, so invalidate what its receivers would.
+        RecipeDocumentService.invalidate(list(stored))
+        RecipeSearchService.schedule(list(stored))
+
+    for recipe_id, wine_ids in stored.items():
+        description = (descriptions or {}).get(recipe_id)
+        if description:
+            WinePairingIndex.update(recipe_id, description, wine_ids)
+    return stored
+
 def image_url_to_context(image_url):
-    image_response = requests.get(image_url)
+    image_response = http().get(image_url)
     image_name = image_url.split("/")[-1]
     if image_response.status_code == 200:
         return ContentFile(image_response.content, name=image_name)
@@ -188,94 +319,118 @@ def fetch_and_get_wine_pairing(dish_description, recipe_id):
         if not dish_description:
             return Response({"error": "Dish description is required."}, status=400)
 
-        wine_pairing = culinaryAi.get_wine_pairing(dish_description)
-        res = store_wine_pairings(wine_pairing, recipe_id)
+        match = WinePairingIndex.match(dish_description, recipe_id=recipe_id)
+        if match is not None:
+            logger.info(f"Reusing wine pairing of recipe {match.recipe_id} ({match.similarity:.2f}) for recipe {recipe_id}")
+            wine_pairing = match.as_json()
+        else:
+            wine_pairing = culinaryAi.get_wine_pairing(dish_description)
+        res = store_wine_pairings(wine_pairing, recipe_id, dish_description)
         if not res:
             return Response({"error": "An error occurred while saving the wine pairing data."}, status=400)
 
         return Response({"wine_pairing": wine_pairing}, status=200)
 
+    except LLMCapacityExceeded:
+        # Let the background job retry later.
+        raise
     except Exception as e:
         logger.error(f"Error in wine pairing recommendation: {str(e)}")
         return Response({"error": f"An error occurred while processing the wine pairing: {str(e)}"}, status=400)
 
-def generate_video_and_save(recipe_id, recipe_name, introduction, steps, ingredient, last_words, template_id, title, language, welcome, to, plateprep, training_phrase, ingridiants_start=None):
-    synthesia_url = settings.SYNTHESIA_URL
+def synthesia_headers():
+    return {
+        "accept": "application/json",
+        "content-type": "application/json",
+        "Authorization": settings.SYNTHESIA_KEY
+    }
+
+
+def build_synthesia_payload(params):
+    """Translated Synthesia template payload for the video generation ``params``."""
+    template_data = {
+        "dish_name": params["recipe_name"],
+        "introduction": params["introduction"],
+        "list": params["ingredients_list"],
+        "steps": params["steps_text"],
+        "end_with_thanks": params["last_words"],
+        "welcome": "WELCOME",
+        "to": "TO",
+        "plateprep": "PLATEPREP",
+        "training_phrase": "THIS IS THE TRAINING VIDEO OF",
+        "ingridiants_start": "Let's begin by gathering the ingredients. You will need:",
+        "description": "A flavorful and aromatic dish consisting of grilled chicken coated in fresh herbs, served with creamy garlic mashed potatoes, making every bite irresistible.",
+    }
+    translated = culinaryAi.generate_video_script(previous_menu=template_data, language=params["language"])
+    return {
+        "test": False,
+        "templateData": literal_eval(translated),
+        "visibility": "private",
+        "templateId": params["template_id"],
+        "title": params["title"],
+    }
+
+
+def create_synthesia_video(payload):
+    """Start rendering a video and return its Synthesia id."""
+    response = http().post(synthesia_url(), json=payload, headers=synthesia_headers(), timeout=60)
+    response.raise_for_status()
+    video_id = response.json().get("id")
+    if not video_id:
+        raise ValueError(f"Synthesia did not return a video id: {response.text}")
+    return video_id
+
+
+def get_synthesia_video(video_id):
+    """Current Synthesia state of a video: ``status`` and, once complete, ``download``."""
+    response = http().get(f"{synthesia_api_url()}/videos/{video_id}", headers=synthesia_headers(), timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+class HttpResponseFile(File):
+    """
+    Read-only File over a streamed ``requests`` response, so storages copy the
+    body chunk by chunk (S3 as a multipart upload) instead of holding it in memory.
+    """
+
+    def __init__(self, response, name):
+        response.raw.decode_content = True
+        super().__init__(response.raw, name)
+        if response.headers.get("Content-Length") and "Content-Encoding" not in response.headers:
+            self.size = int(response.headers["Content-Length"])
+
+
+def save_url_to_field(field_file, url, name, timeout=(10, 300)):
+    """Stream ``url`` into ``field_file`` without saving the model instance."""
+    with http().get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        field_file.save(name, HttpResponseFile(response, name), save=False)
+
+
+def save_synthesia_video(recipe_id, video_id, download_url):
     from app import models
 
-    try:
-        payload = {
-            "templateData": {
-                "dish_name": recipe_name,
-                "introduction": introduction,
-                # "name": name_chef,
-                "list": ingredient,
-                "steps": steps,
-                "end_with_thanks":last_words,
-                "welcome": welcome,
-                "to": to,
-                "plateprep": plateprep,
-                "training_phrase": training_phrase,
-                "ingridiants_start": ingridiants_start,
-                "description": "A flavorful and aromatic dish consisting of grilled chicken coated in fresh herbs, served with creamy garlic mashed potatoes, making every bite irresistible.",
-            },
-        }
-        headers = {
-            "accept": "application/json",
-            "content-type": "application/json",
-            "Authorization": settings.SYNTHESIA_KEY
-        }
-        translated = culinaryAi.generate_video_script(
-            previous_menu=payload.get('templateData'),
-            language=language
-        )
-        translated_template_data = literal_eval(translated)
-
-        # Now rebuild the full payload using translated templateData but rest same
-        translated_payload = {
-            "test": False,
-            "templateData": translated_template_data,
-            "visibility": "private",
-            "templateId": template_id,
-            "title": title,
-        }
-        video_create = requests.post(synthesia_url, json=translated_payload, headers=headers)
-        print("video_create", video_create.json())
-        video_id = json.loads(video_create.text).get('id')
-        url = f"https://api.synthesia.io/v2/videos/{video_id}"
-
-        download_url = download_synthesia_video(
-        video_id=video_id,
-        api_key=settings.SYNTHESIA_KEY,
-        max_attempts=100)
-
-        if download_url:
-            response = requests.get(download_url, stream=True)
-            response.raise_for_status()
-            filename = download_url.split("filename%3D%22")[-1].split("%22")[0] if "filename%3D%22" in url else "video.mp4"
-            video_content = ContentFile(response.content, name=filename)
-
-        recipe_instance = models.Recipe.objects.get(id=recipe_id)
-        if recipe_instance.video:
-            recipe_instance.video.delete(save=False)
-        recipe_instance.video_id = video_id
-        recipe_instance.video.save(filename, video_content, save=False)
-        recipe_instance.save()
-        return Response({"video_id": video_id}, status=200)
-    
-    except Exception as e:
-        logger.error(f"Error in generating video: {str(e)}")
-        return Response({"error": f"An error occurred while generating the video: {str(e)}"}, status=400)
+    filename = download_url.split("filename%3D%22")[-1].split("%22")[0] if "filename%3D%22" in download_url else "video.mp4"
+    recipe_instance = models.Recipe.objects.get(id=recipe_id)
+    previous = recipe_instance.video.name if recipe_instance.video else None
+    save_url_to_field(recipe_instance.video, download_url, filename)
+    recipe_instance.video_id = video_id
+    recipe_instance.save()
+    # Only drop the old file once the new one is stored.
+    if previous and previous != recipe_instance.video.name:
+        recipe_instance.video.storage.delete(previous)
+    return recipe_instance
 
 
 def delete_video_from_synthesia(video_id):
-    url = f"https://api.synthesia.io/v2/videos/{video_id}"
+    url = f"{synthesia_api_url()}/videos/{video_id}"
 
     headers = {
         "accept": "application/json",
         "Authorization": settings.SYNTHESIA_KEY
     }
-    response = requests.delete(url, headers=headers)
+    response = http().delete(url, headers=headers, timeout=30)
     return response
 
 def format_datetime(date_string):
@@ -287,60 +442,9 @@ def format_datetime(date_string):
     except ValueError:
         return "Invalid datetime string"
 
-def download_synthesia_video(video_id: str, api_key: str, max_attempts: int = 100) -> Optional[str]:
-    url = f"https://api.synthesia.io/v2/videos/{video_id}"
-    headers = {
-        "accept": "application/json",
-        "Authorization": api_key
-    }
-
-    attempts = 0
-    while attempts < max_attempts:
-        try:
-            download_video_link = requests.get(url, headers=headers)
-            download_video_link.raise_for_status() 
-            
-            response_data = json.loads(download_video_link.text)
-            video_status = response_data.get('status')
-            
-            print(f"Current video status: {video_status}")
-            if video_status == "complete":
-                download_url = response_data.get("download")
-                if download_url:
-                    response = requests.get(download_url, stream=True)
-                    response.raise_for_status()
-                    return download_url
-                else:
-                    raise ValueError("Download URL not found in response")
-            
-            elif video_status == 'failed':
-                raise ValueError(f"Video processing failed: {response_data.get('message', 'Unknown error')}")
-            
-            else:
-                print(f"Video not ready yet. Attempt {attempts + 1}/{max_attempts}. Waiting 10 seconds...")
-                time.sleep(10)
-                attempts += 1
-                
-        except requests.exceptions.RequestException as e:
-            print(f"Request failed: {e}")
-            time.sleep(10)
-            attempts += 1
-            
-        except json.JSONDecodeError as e:
-            print(f"Failed to parse response: {e}")
-            time.sleep(10)
-            attempts += 1
-
-    raise TimeoutError(f"Video not ready after {max_attempts} attempts")
-
 class S3FileUtility:
     def __init__(self):
-        self.s3_client = boto3.client(
-            "s3",
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION_NAME,
-        )
+        self.s3_client = s3_client()
         self.bucket_name = settings.AWS_STORAGE_BUCKET_NAME
 
     def generate_presigned_url(self, key, operation="put_object", expiration=3600):
@@ -382,16 +486,21 @@ class S3FileUtility:
             return False
 
 
-# Get OpenAI API key from environment variables
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    logger.error("OPENAI_API_KEY is not set in the environment variables.")
-    exit(1)
+def local_spell_check(text):
+    """Run ``text`` through the offline spell checker; None if it is unavailable."""
+    try:
+        return CulinarySpellChecker.get().check(text)
+    except Exception as e:
+        logger.error(f"Error in local spell checking: {str(e)}")
+        return None
 
-# Initialize OpenAI client
-client = OpenAI(api_key=api_key)
 
 def spell_checker(input_text):
+    local = local_spell_check(input_text)
+    if local is not None:
+        if not local.unresolved:
+            return local.text
+        input_text = local.text
     prompt = (
         f"""
         Please check the following text for any spelling mistakes. If any mistakes are found, correct them.If any spelling mistakes are present, correct only those mistakes and return the corrected text. If there are no spelling mistakes, return the text unchanged. only  return the word not like this 'The corrected text is:' just return the corrected word.
@@ -406,14 +515,15 @@ def spell_checker(input_text):
     try:
         logger.info("Sending request to OpenAI API for spell checking.")
         
-        completion = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a spelling correction tool."},
-                {"role": "user", "content": f"{prompt}"}
-            ],
-            temperature=0  
-        )
+        with llm_scheduler.slot(estimate_tokens(prompt, len(input_text) // 4 + 16)):
+            completion = openai_client().chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": "You are a spelling correction tool."},
+                    {"role": "user", "content": f"{prompt}"}
+                ],
+                temperature=0  
+            )
         
         corrected_text = completion.choices[0].message.content.strip()
         logger.info("Received response from OpenAI API.")
@@ -421,3 +531,123 @@ def spell_checker(input_text):
     except Exception as e:
         logger.error(f"Error in spell checking: {e}")
         return "An error occurred while checking spelling."
+
+
+SPELL_CHECK_MODEL = "gpt-4o-mini"
+# Texts per model call; larger requests are split and checked concurrently.
+SPELL_CHECK_BATCH_SIZE = 40
+SPELL_CHECK_BATCH_CHARS = 12000
+SPELL_CHECK_WORKERS = 4
+
+spell_check_batch_prompt = """
+Check each text in the JSON object below for spelling mistakes. Correct only the misspelled words and keep
+everything else (wording, punctuation, capitalisation, numbers) exactly as it is. If a text has no mistakes,
+return it unchanged.
+
+Respond with a JSON object that maps every key of the input to its corrected text, and nothing else.
+
+{texts}
+"""
+
+
+def spell_check_key(text):
+    # Spelling corrections keep the writer's casing, so only whitespace is normalized.
+    return cache_key("spell_check", spell_check_batch_prompt, {"model": SPELL_CHECK_MODEL}, text, normalizer=str.strip)
+
+
+def spell_check_batches(texts):
+    batches, batch, size = [], [], 0
+    for text in texts:
+        if batch and (len(batch) >= SPELL_CHECK_BATCH_SIZE or size + len(text) > SPELL_CHECK_BATCH_CHARS):
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(text)
+        size += len(text)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def spell_check_batch(texts, context=None):
+    """
+    Correct ``texts`` in a single model call with structured output.
+    Returns ``{text: corrected}``; texts missing from the reply are left out.
+    """
+    numbered = {str(index): text for index, text in enumerate(texts)}
+    prompt = spell_check_batch_prompt.format(texts=json.dumps(numbered, ensure_ascii=False))
+    with llm_scheduler.slot(estimate_tokens(prompt, estimate_tokens(prompt)), context):
+        completion = openai_client().chat.completions.create(
+            model=SPELL_CHECK_MODEL,
+            messages=[
+                {"role": "system", "content": "You are a spelling correction tool."},
+                {"role": "user", "content": prompt},
+            ],
+            response_format={"type": "json_object"},
+            temperature=0,
+        )
+    corrected = json.loads(completion.choices[0].message.content)
+    return {
+        text: corrected[index].strip()
+        for index, text in numbered.items()
+        if isinstance(corrected.get(index), str) and corrected[index].strip()
+    }
+
+
+def spell_check_many(texts):
+    """
+    Spell check many texts at once. Each text goes through the offline
+    spell checker first; only the tokens it cannot resolve are sent to the
+    model, so texts that are correct or have simple typos never leave the
+    process. Returns the corrected texts in input order.
+    """
+    local = {}
+    for text in dict.fromkeys(text for text in texts if isinstance(text, str) and text.strip()):
+        local[text] = local_spell_check(text)
+        if local[text] is None:
+            return llm_spell_check(texts)
+
+    tokens = list(dict.fromkeys(token for result in local.values() for token in result.unresolved))
+    corrections = dict(zip(tokens, llm_spell_check(tokens))) if tokens else {}
+
+    def apply(result):
+        return TOKEN.sub(lambda match: corrections.get(match.group(), match.group()), result.text)
+
+    return [apply(local[text]) if text in local else text for text in texts]
+
+
+def llm_spell_check(texts):
+    """
+    Spell check texts with the model. Repeated texts are checked once, earlier
+    corrections come from the LLM cache, and the rest go to the model in as
+    few batched calls as possible, run concurrently when there are several.
+    Returns the corrected texts in input order; a text that could not be
+    checked, or is not a string, is returned unchanged. LLMCapacityExceeded
+    is raised so the caller can answer 429.
+    """
+    unique = list(dict.fromkeys(text.strip() for text in texts if isinstance(text, str) and text.strip()))
+    keys = {text: spell_check_key(text) for text in unique}
+    cached = llm_cache.get_many("spell_check", keys.values())
+    corrected = {text: cached[key] for text, key in keys.items() if key in cached}
+    # Worker threads do not see the request, so they are scheduled under the caller's tenant.
+    context = llm_scheduler.current()
+
+    def check(batch):
+        started = time.monotonic()
+        result = spell_check_batch(batch, context)
+        llm_cache.set_many("spell_check", {keys[text]: value for text, value in result.items()}, time.monotonic() - started)
+        return result
+
+    batches = spell_check_batches([text for text in unique if text not in corrected])
+    if batches:
+        logger.info(f"Spell checking {sum(len(batch) for batch in batches)} texts in {len(batches)} batches.")
+        with ThreadPoolExecutor(max_workers=min(SPELL_CHECK_WORKERS, len(batches))) as executor:
+            futures = [executor.submit(check, batch) for batch in batches]
+            for future in futures:
+                try:
+                    corrected.update(future.result())
+                except LLMCapacityExceeded:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error in spell checking: {str(e)}")
+
+    return [corrected.get(text.strip(), text) if isinstance(text, str) else text for text in texts]
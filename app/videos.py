@@ -0,0 +1,145 @@
+import random
+import logging
+from datetime import timedelta
+from app import models, choices, jobs
+from app.jobs import JobQueue
+from app.utils import build_synthesia_payload, create_synthesia_video, get_synthesia_video, save_synthesia_video
+from django.db import transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+
+class VideoGenerationService:
+    """
+    Generates recipe videos with Synthesia outside the request: one job
+    submits the render, then a poll job re-queues itself with exponential
+    backoff until the video is ready and stored on the recipe.
+    """
+
+    first_poll_seconds = 15
+    max_poll_seconds = 120
+    # Give up on a render that has not finished after this long.
+    render_timeout = timedelta(hours=1)
+
+    @staticmethod
+    def start(params, user):
+        """Queue a generation for ``params['recipe']``, or return the one already in progress."""
+        in_progress = models.RecipeVideoGeneration.objects.filter(
+            recipe_id=params["recipe"],
+            status__in=[choices.VideoGenerationStatus.QUEUED, choices.VideoGenerationStatus.RENDERING],
+        ).first()
+        if in_progress is not None:
+            return in_progress
+        generation = models.RecipeVideoGeneration.objects.create(
+            recipe_id=params["recipe"], requested_by=user, params=params
+        )
+        generation.job = JobQueue.enqueue("video_submit", generation.id, dedupe_key=f"video_submit:{generation.id}")
+        generation.save(update_fields=["job", "updated_at"])
+        return generation
+
+    @staticmethod
+    def poll_delay(polls):
+        delay = min(VideoGenerationService.first_poll_seconds * 2 ** polls, VideoGenerationService.max_poll_seconds)
+        return delay * random.uniform(0.8, 1.2)
+
+    @staticmethod
+    def schedule_poll(generation):
+        delay = VideoGenerationService.poll_delay(generation.polls)
+        generation.next_poll_at = timezone.now() + timedelta(seconds=delay)
+        generation.job = JobQueue.enqueue(
+            "video_poll", generation.id, run_at=generation.next_poll_at, dedupe_key=f"video_poll:{generation.id}"
+        )
+        generation.save(update_fields=["next_poll_at", "job", "updated_at"])
+
+    @staticmethod
+    def poll_pending(generation_id):
+        return models.Job.objects.filter(
+            dedupe_key=f"video_poll:{generation_id}",
+            status__in=[choices.JobStatus.QUEUED, choices.JobStatus.RUNNING],
+        ).exists()
+
+    @staticmethod
+    def fail(generation_id, error):
+        models.RecipeVideoGeneration.objects.filter(id=generation_id).exclude(
+            status=choices.VideoGenerationStatus.COMPLETED
+        ).update(status=choices.VideoGenerationStatus.FAILED, error=error, next_poll_at=None, updated_at=timezone.now())
+
+
+def _job_failed(generation_id, error):
+    VideoGenerationService.fail(generation_id, error.strip().splitlines()[-1] if error else "Video generation failed")
+
+
+@jobs.register("video_submit", concurrency=2, max_attempts=3, backoff=30, on_failure=_job_failed)
+def submit_video_job(generation_id):
+    generation = models.RecipeVideoGeneration.objects.filter(id=generation_id).first()
+    if generation is None:
+        return
+    if generation.status == choices.VideoGenerationStatus.RENDERING:
+        # Retry of an attempt that got past create_synthesia_video().
+        if not generation.synthesia_video_id:
+            # The render may have started without its id being stored; submitting
+            # again could render the video twice.
+            VideoGenerationService.fail(generation.id, "Video submission was interrupted, please generate the video again")
+        elif not VideoGenerationService.poll_pending(generation.id):
+            VideoGenerationService.schedule_poll(generation)
+        return
+    if generation.status != choices.VideoGenerationStatus.QUEUED:
+        return
+
+    payload = build_synthesia_payload(generation.params)
+    # Claim the submission first so a retry never starts a second render.
+    claimed = models.RecipeVideoGeneration.objects.filter(
+        id=generation.id, status=choices.VideoGenerationStatus.QUEUED
+    ).update(status=choices.VideoGenerationStatus.RENDERING, updated_at=timezone.now())
+    if not claimed:
+        return
+    try:
+        video_id = create_synthesia_video(payload)
+    except Exception:
+        # Synthesia rejected the request, so the next attempt may submit again.
+        models.RecipeVideoGeneration.objects.filter(id=generation.id).update(
+            status=choices.VideoGenerationStatus.QUEUED, updated_at=timezone.now()
+        )
+        raise
+
+    generation.synthesia_video_id = video_id
+    generation.status = choices.VideoGenerationStatus.RENDERING
+    try:
+        with transaction.atomic():
+            generation.save(update_fields=["synthesia_video_id", "status", "updated_at"])
+            VideoGenerationService.schedule_poll(generation)
+    except Exception as e:
+        logger.error(f"Error storing Synthesia video {video_id} for recipe {generation.recipe_id}: {str(e)}")
+        raise
+    logger.info(f"Submitted Synthesia video {generation.synthesia_video_id} for recipe {generation.recipe_id}")
+
+
+@jobs.register("video_poll", concurrency=8, max_attempts=5, backoff=15, timeout=900, on_failure=_job_failed)
+def poll_video_job(generation_id):
+    generation = models.RecipeVideoGeneration.objects.filter(id=generation_id).first()
+    if generation is None or generation.status != choices.VideoGenerationStatus.RENDERING:
+        return
+
+    video = get_synthesia_video(generation.synthesia_video_id)
+    generation.polls += 1
+    generation.synthesia_status = video.get("status")
+
+    if generation.synthesia_status == "complete":
+        if not video.get("download"):
+            raise ValueError("Download URL not found in response")
+        save_synthesia_video(generation.recipe_id, generation.synthesia_video_id, video["download"])
+        generation.status = choices.VideoGenerationStatus.COMPLETED
+        generation.next_poll_at = None
+        generation.save(update_fields=["polls", "synthesia_status", "status", "next_poll_at", "updated_at"])
+        logger.info(f"Video {generation.synthesia_video_id} stored on recipe {generation.recipe_id}")
+    elif generation.synthesia_status == "failed":
+        generation.save(update_fields=["polls", "synthesia_status", "updated_at"])
+        VideoGenerationService.fail(generation.id, f"Video processing failed: {video.get('message', 'Unknown error')}")
+    elif timezone.now() - generation.created_at > VideoGenerationService.render_timeout:
+        generation.save(update_fields=["polls", "synthesia_status", "updated_at"])
+        VideoGenerationService.fail(generation.id, f"Video not ready after {generation.polls} status checks")
+    else:
+        generation.save(update_fields=["polls", "synthesia_status", "updated_at"])
+        VideoGenerationService.schedule_poll(generation)
@@ -3,24 +3,36 @@ from django.contrib.auth.models import User
 from django.contrib.auth.tokens import default_token_generator
 from django.core.mail import send_mail
 from django.db.models.query_utils import Q
-from django.http import HttpResponse
+from django.http import HttpResponse, Http404
 from django.shortcuts import render
 from django.utils.encoding import force_str
 from django.utils.http import urlsafe_base64_decode
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet, ViewSet
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
 from app import filters, models, serializers, choices, permissions, pagination
 from app.account_activation_token import account_activation_token 
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters as filter, status
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
-from django.db.models import FloatField, IntegerField, Sum, Subquery, OuterRef, Avg, Count
+from django.db.models import CharField, FloatField, IntegerField, Sum, Subquery, OuterRef, Avg, Count, Value
 from datetime import datetime
 from rest_framework.decorators import action
-from app.utils import scheduler, CulinaryAI, store_wine_pairings, image_url_to_context, generate_video_and_save, delete_video_from_synthesia, S3FileUtility, spell_checker, scheduler
-from app.tasks import create_or_update_schedule_dish
+from rest_framework.reverse import reverse
+from app.utils import CulinaryAI, store_wine_pairings, image_url_to_context, delete_video_from_synthesia, S3FileUtility, spell_check_many
+from app.jobs import JobQueue
+from app.videos import VideoGenerationService
+from app.documents import RecipeDocumentService
+from app.etags import recipe_etag, menu_etag, task_etag, not_modified
+from app.search import RecipeSearchFilter
+from app.sync import RecipeChildrenSync
+from app.llm_cache import llm_cache
+from app.clients import metrics as client_metrics
+from app.llm_scheduler import llm_scheduler, LLMCapacityExceeded
+from app.wine_index import WinePairingIndex
+from app.streaming import EventStreamRenderer, event_stream_response, sse_event
 from rest_framework_simplejwt.tokens import RefreshToken
 from project import settings
 from django.db import transaction
@@ -28,12 +40,13 @@ import logging, json
 from smtplib import SMTPException
 from django.contrib.auth.password_validation import validate_password
 from rest_framework.exceptions import ValidationError
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.db.models import Prefetch
-from django.db.models.functions import ExtractMonth
+from django.db.models.functions import Cast, ExtractMonth
 import calendar
-from app.permissions import IsAdminOrHeadChef, IsSubscribedORSuperUser, TaskEditDeletePermission, IsAdminOrHeadChefOrStaff
+from app.permissions import IsAdminOrHeadChef, IsSubscribedORSuperUser, TaskEditDeletePermission, IsAdminOrHeadChefOrStaff, IsSuperUser
 
 
 logger = logging.getLogger(__name__)
@@ -43,13 +56,9 @@ FRONTEND_URL = settings.FRONTEND_URL
 s3_utility = S3FileUtility()
 
 
-from apscheduler.schedulers.background import BackgroundScheduler
 from django.utils.timezone import now
 from rest_framework import permissions
 
-scheduler = BackgroundScheduler()
-scheduler.start()
-
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = serializers.CustomTokenObtainPairSerializer
 
@@ -361,11 +370,10 @@ class RecipeViewSet(ModelViewSet):
     queryset = models.Recipe.objects.all().prefetch_related('recipe_ingredient', 'predefined_ingredients')
     serializer_class = serializers.RecipeSerializer
     permission_classes = [IsAuthenticated,IsSubscribedORSuperUser]
-    filter_backends = [DjangoFilterBackend, filter.SearchFilter, filter.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, RecipeSearchFilter, filter.OrderingFilter]
     filterset_fields = ['cusinie_type']
     filterset_class = filters.RecipeFilter
-    pagination_class = pagination.CustomPageNumberPagination
-    search_fields = ['dish_name', 'cusinie_type__category_name', 'description', 'availability', 'status', 'recipe_ingredient__title', 'predefined_ingredients__name']
+    pagination_class = pagination.KeysetPagination
 
     def get_serializer_class(self):
         if self.action in ['list']:
@@ -379,6 +387,8 @@ class RecipeViewSet(ModelViewSet):
 
     def get_queryset(self):
         queryset = super().get_queryset()
+        if self.action == "list":
+            queryset = serializers.ListRecipeSerializer.setup_eager_loading(queryset)
         user = self.request.user
         if user.is_superuser:
             return queryset.filter(is_deleted=False).order_by("-id")
@@ -399,11 +409,13 @@ class RecipeViewSet(ModelViewSet):
             queryset = backend().filter_queryset(self.request, queryset, self)
         return queryset
 
-    @action(detail=False, methods=['get'], url_path='get-all')
-    def get_all(self, request, *args, **kwargs):
-        user = request.user
-        queryset = self.queryset.filter(
-            resturant=user.resturant
+    def _list_recipes(self, request, scope):
+        """
+        Shared filter -> paginate -> serialize pipeline for the recipe list
+        actions; ``scope`` is the Q predicate each action restricts to.
+        """
+        queryset = serializers.ListRecipeSerializer.setup_eager_loading(
+            models.Recipe.objects.filter(scope, resturant=request.user.resturant)
         ).order_by("-id")
 
         # Apply filtering
@@ -417,64 +429,76 @@ class RecipeViewSet(ModelViewSet):
         serializer = serializers.ListRecipeSerializer(queryset, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], url_path='get-all')
+    def get_all(self, request, *args, **kwargs):
+        return self._list_recipes(request, Q())
+
     @action(detail=False, methods=['get'], url_path='get-draft')
     def get_draft(self, request, *args, **kwargs):
         user = request.user
-        queryset = self.queryset.filter(
+        return self._list_recipes(request,
             Q(status=choices.RecipeStatus.PUBLIC, is_deleted=False, is_draft=True)
-            | Q(is_deleted=False, is_draft=True, user=user),resturant=user.resturant
-        ).order_by("-id")
-        
-        # Apply filtering
-        queryset = self.filter_queryset(queryset)
-
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = serializers.ListRecipeSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = serializers.ListRecipeSerializer(queryset, many=True)
-        return Response(serializer.data)
+            | Q(is_deleted=False, is_draft=True, user=user)
+        )
 
     @action(detail=False, methods=['get'], url_path='get-deleted')
     def get_deleted(self, request, *args, **kwargs):
         user = request.user
-        queryset = self.queryset.filter(
+        return self._list_recipes(request,
             Q(status=choices.RecipeStatus.PUBLIC, is_deleted=True)
-            | Q(is_deleted=True, user=user),resturant=user.resturant
-        ).order_by("-id")
-
-        # Apply filtering
-        queryset = self.filter_queryset(queryset)
-
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = serializers.ListRecipeSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-
-        serializer = serializers.ListRecipeSerializer(queryset, many=True)
-        return Response(serializer.data)
-    
+            | Q(is_deleted=True, user=user)
+        )
 
     @action(detail=False, methods=['get'], url_path='get-live')
     def get_live(self, request, *args, **kwargs):
         user = request.user
-        queryset = self.queryset.filter(
+        return self._list_recipes(request,
             Q(is_draft=False,status=choices.RecipeStatus.PUBLIC, is_deleted=False)
-            | Q(is_deleted=False,is_draft=False, status=choices.RecipeStatus.PUBLIC , user=user),
-            resturant=user.resturant
-        ).order_by("-id")
-
-        # Apply filtering
-        queryset = self.filter_queryset(queryset)
+            | Q(is_deleted=False,is_draft=False, status=choices.RecipeStatus.PUBLIC , user=user)
+        )
 
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            serializer = serializers.ListRecipeSerializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+    FACETS = (
+        # (facet, model, lookup to the recipe id, value path, label path, count path, row filter)
+        ("cuisine", models.Recipe, "id", "cusinie_type_id", "cusinie_type__category_name", "id", {}),
+        ("availability", models.Recipe, "id", "availability", "availability", "id", {}),
+        ("wine_type", models.Recipe.wine_pairing.through, "recipe_id", "wine__wine_type", "wine__wine_type", "recipe_id", {}),
+        ("protein", models.Recipe.wine_pairing.through, "recipe_id", "wine__proteins", "wine__proteins", "recipe_id", {}),
+        ("region", models.Recipe.wine_pairing.through, "recipe_id", "wine__region_name", "wine__region_name", "recipe_id", {}),
+        # Soft-deleted tags are hidden everywhere else too (TagViewSet, the tag filter).
+        ("tag", models.Tag, "recipe_id", "name", "name", "recipe_id", {"is_deleted": False}),
+    )
+
+    @action(detail=False, methods=['get'], url_path='facets')
+    def facets(self, request, *args, **kwargs):
+        """
+        Per-facet recipe counts for the current filters, as one UNION ALL of
+        grouped counts over the ids of the scoped, filtered recipes.
+        """
+        matching = self.filter_queryset(self.get_queryset()).order_by().values("id")
+        grouped = []
+        for facet, model, recipe_lookup, value_path, label_path, count_path, row_filter in self.FACETS:
+            grouped.append(
+                model.objects.filter(**{f"{recipe_lookup}__in": matching, f"{value_path}__isnull": False}, **row_filter)
+                .order_by()
+                .annotate(
+                    facet=Value(facet, output_field=CharField()),
+                    value=Cast(value_path, CharField()),
+                    label=Cast(label_path, CharField()),
+                )
+                .values("facet", "value", "label")
+                .annotate(count=Count(count_path, distinct=True))
+                .values_list("facet", "value", "label", "count")
+            )
 
-        serializer = serializers.ListRecipeSerializer(queryset, many=True)
-        return Response(serializer.data)
+        availability = dict(choices.Availability.choices)
+        response = {facet[0]: [] for facet in self.FACETS}
+        for facet, value, label, count in grouped[0].union(*grouped[1:], all=True):
+            if facet == "availability":
+                label = availability.get(value, label)
+            response[facet].append({"value": value, "label": label, "count": count})
+        for values in response.values():
+            values.sort(key=lambda item: (-item["count"], item["label"] or ""))
+        return Response(response, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['patch'], url_path='restore')
     def restore(self, request, *args, **kwargs):
@@ -497,7 +521,21 @@ class RecipeViewSet(ModelViewSet):
         return Response({"message": "Recipe Deleted successfully"}, status=status.HTTP_204_NO_CONTENT)
 
     def retrieve(self, request, *args, **kwargs):
-        return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        etag = recipe_etag(queryset, self.kwargs[lookup_url_kwarg], request)
+        if etag is None:
+            raise Http404
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        row = queryset.filter(pk=self.kwargs[lookup_url_kwarg]).values_list("id", "document__document").first()
+        if row is None:
+            raise Http404
+        recipe_id, document = row
+        if document is None:
+            document = RecipeDocumentService.get_document(recipe_id)
+        return Response(RecipeDocumentService.absolutize(document, request), headers={"ETag": etag})
 
 
     # def get_permissions(self):
@@ -505,6 +543,19 @@ class RecipeViewSet(ModelViewSet):
     #         self.permission_classes = [AllowAny] 
     #     return super().get_permissions()        
 
+    @staticmethod
+    def _validated_rows(serializer_class, rows):
+        """Validate a child list in one pass, keeping each row's client id (as the model's pk type)."""
+        serializer = serializer_class(data=rows, many=True)
+        if not serializer.is_valid():
+            raise ValidationError(serializer.errors)
+        pk = serializer_class.Meta.model._meta.pk
+        try:
+            ids = [pk.to_python(row.get("id")) for row in rows]
+        except DjangoValidationError as e:
+            raise ValidationError({"id": e.messages})
+        return [{**data, "id": row_id} for row_id, data in zip(ids, serializer.validated_data)]
+
     def perform_create(self, serializer):
         # try:
             with transaction.atomic():
@@ -514,6 +565,7 @@ class RecipeViewSet(ModelViewSet):
                 plate_design_image = self.request.data.get('plate_design_image', None)
 
                 recipe = serializer.save(user=self.request.user,resturant=self.request.user.resturant)
+                sync = RecipeChildrenSync(recipe, created=True)
 
                 steps_data = (self.request.data.get("steps", []))
                 tags = (self.request.data.get("tags", []))
@@ -526,40 +578,24 @@ class RecipeViewSet(ModelViewSet):
                 real_time_variable_comment = (self.request.data.get("real_time_variable_comment", []))
                 
                 if Images:
-                    for image in Images:
-                        models.recipe_images.objects.create(recipe=recipe, image_url=image)
-
+                    sync.collection(models.recipe_images, "recipe", recipe,
+                        [{"image_url": image} for image in Images], ["image_url"], key="image_url")
 
                 if steps_data:
-                    for step_data in steps_data:
-                        serializer = serializers.StepSerializer(data=step_data)
-                        if serializer.is_valid():
-                            serializer.save(recipe=recipe)
-                        else:
-                            raise ValidationError(serializer.errors)
+                    sync.collection(models.Steps, "recipe", recipe,
+                        self._validated_rows(serializers.StepSerializer, steps_data), ["title"])
+
                 if tags:
-                    for tag in tags:
-                        serializer = serializers.TagSerializer(data=tag)
-                        if serializer.is_valid():
-                            serializer.save(recipe=recipe)
-                        else:
-                            raise ValidationError(serializer.errors)
+                    sync.collection(models.Tag, "recipe", recipe,
+                        self._validated_rows(serializers.TagSerializer, tags), ["name"])
 
                 if ingredient:
-                    for ingredient_data in ingredient:
-                        serializer = serializers.IngredientSerializer(data=ingredient_data)
-                        if serializer.is_valid():
-                            serializer.save(recipe=recipe)
-                        else:
-                            raise ValidationError(serializer.errors)
+                    sync.collection(models.Ingredient, "recipe", recipe,
+                        self._validated_rows(serializers.IngredientSerializer, ingredient), ["title", "quantity", "unit"])
 
                 if essential:
-                    for essential_data in essential:
-                        serializer = serializers.EssentialsSerializer(data=essential_data)
-                        if serializer.is_valid():
-                            serializer.save(recipe=recipe)
-                        else:
-                            raise ValidationError(serializer.errors)
+                    sync.collection(models.Essentials, "recipe", recipe,
+                        self._validated_rows(serializers.EssentialsSerializer, essential), ["title", "quantity", "unit"])
                 
                 if starch_preparation:
                     starch_steps_data = starch_preparation.pop('steps', [])
@@ -570,12 +606,8 @@ class RecipeViewSet(ModelViewSet):
                     else:
                         raise ValidationError(serializer.errors)
 
-                    for step_data in starch_steps_data:
-                        serializer = serializers.StarchPreparationStepsSerializer(data=step_data)
-                        if serializer.is_valid():
-                            serializer.save(starch_preparation=starch_instance)
-                        else:
-                            raise ValidationError(serializer.errors)
+                    sync.collection(models.Starch_Preparation_Steps, "starch_preparation", starch_instance,
+                        self._validated_rows(serializers.StarchPreparationStepsSerializer, starch_steps_data), ["step"])
                 
                 if design_your_plate:
                     design_plate_data = {"recipe": recipe} 
@@ -588,30 +620,19 @@ class RecipeViewSet(ModelViewSet):
                     else:
                         raise ValidationError(design_your_plate_serializer.errors)
                     
-                    for step_data in plate_steps_data:
-                        step_serializer = serializers.DesignYourPlateStepsSerializer(data=step_data)
-                        if step_serializer.is_valid():
-                            step_serializer.save(design_plate=design_your_plate_instance)
-                        else:
-                            raise ValidationError(step_serializer.errors)
+                    sync.collection(models.Design_Your_Plate_Steps, "design_plate", design_your_plate_instance,
+                        self._validated_rows(serializers.DesignYourPlateStepsSerializer, plate_steps_data), ["step"])
                 
                 if cooking_deviation_comment:
-                    for deviation_comment_data in cooking_deviation_comment:
-                        serializer = serializers.CookingDeviationCommentSerializer(data=deviation_comment_data)
-                        if serializer.is_valid():
-                            serializer.save(recipe=recipe)
-                        else:
-                            raise ValidationError(serializer.errors)
+                    sync.collection(models.Cooking_Deviation_Comment, "recipe", recipe,
+                        self._validated_rows(serializers.CookingDeviationCommentSerializer, cooking_deviation_comment), ["step"])
                         
                 if real_time_variable_comment:
-                    for variable_comment_data in real_time_variable_comment:
-                        serializer = serializers.RealTimeVariableCommentSerializer(data=variable_comment_data)
-                        if serializer.is_valid():
-                            serializer.save(recipe=recipe)
-                        else:
-                            raise ValidationError(serializer.errors)
+                    sync.collection(models.Real_time_Variable_Comment, "recipe", recipe,
+                        self._validated_rows(serializers.RealTimeVariableCommentSerializer, real_time_variable_comment), ["step"])
+
+                sync.finish()
                 return recipe
-            print("created.")
         # except ValidationError as e:
         #     raise serializers.ValidationError(str(e))
         # except Exception as e:
@@ -636,89 +657,29 @@ class RecipeViewSet(ModelViewSet):
             recipe_serializer = self.get_serializer(instance, data=request.data, partial=True, context=self.get_serializer_context())
             recipe_serializer.is_valid(raise_exception=True)
             recipe = recipe_serializer.save(user=self.request.user)
-            existing_images = models.recipe_images.objects.filter(recipe=recipe)
-            provided_image_ids = set()
-            if Images:
-                for image in Images:
-                    
-                        recipe_image = models.recipe_images.objects.create(
-                            recipe=recipe,
-                            image_url=image
-                        )
-                        provided_image_ids.add(recipe_image.id)
+            sync = RecipeChildrenSync(recipe)
 
-                
-
-                existing_images.exclude(id__in=provided_image_ids).delete()
+            if Images:
+                sync.collection(models.recipe_images, "recipe", recipe,
+                    [{"image_url": image} for image in Images], ["image_url"], key="image_url")
 
-            provided_step_ids = set()
             if steps_data:
-                for step_data in steps_data:
-                    step_id = step_data.pop("id", None)
-                    serializer = serializers.StepSerializer(data=step_data)
-                    if serializer.is_valid():
-                        step_instance, _ = models.Steps.objects.update_or_create(
-                            id=step_id,
-                            defaults={'title': serializer.validated_data.get('title'), 'recipe': recipe}
-                        )
-                        provided_step_ids.add(step_instance.id)
-                    else:
-                        raise ValidationError(serializer.errors)
-                models.Steps.objects.filter(recipe=recipe).exclude(id__in=provided_step_ids).delete()
+                sync.collection(models.Steps, "recipe", recipe,
+                    self._validated_rows(serializers.StepSerializer, steps_data), ["title"])
 
-            provided_tag_ids = set()
             if tags:
-                for tag in tags:
-                    tag_id = tag.pop('id', None)
-                    serializer = serializers.TagSerializer(data=tag)
-                    
-                    if serializer.is_valid():
-                        tag_instance, _ = models.Tag.objects.update_or_create(
-                            id=tag_id,
-                            defaults={'name': serializer.validated_data.get('name'), 'recipe': recipe}
-                        )
-                        provided_tag_ids.add(tag_instance.id)
-                    else:
-                        raise ValidationError(serializer.errors)
-                models.Tag.objects.filter(recipe=recipe).exclude(id__in=provided_tag_ids).delete()
+                sync.collection(models.Tag, "recipe", recipe,
+                    self._validated_rows(serializers.TagSerializer, tags), ["name"])
 
+            # Ingredients missing from the payload have never been removed here.
             if ingredient:
-                for ingredient_data in ingredient:
-                    ingredient_id = ingredient_data.pop('id', None)
-                    serializer = serializers.IngredientSerializer(data=ingredient_data)
-                    if serializer.is_valid():
-                        ingredient_instance, _ = models.Ingredient.objects.update_or_create(
-                            id=ingredient_id,
-                            defaults={
-                                'title': serializer.validated_data.get('title'),
-                                'recipe': recipe,
-                                'quantity': serializer.validated_data.get('quantity'),
-                                'unit': serializer.validated_data.get('unit')
-                            }
-                        )
-                    else:
-                        raise ValidationError(serializer.errors)
+                sync.collection(models.Ingredient, "recipe", recipe,
+                    self._validated_rows(serializers.IngredientSerializer, ingredient), ["title", "quantity", "unit"],
+                    delete_missing=False)
 
-
-            provided_essential_ids = set()
             if essential:
-                for essential_data in essential:
-                    essential_id = essential_data.pop('id', None)
-                    serializer = serializers.EssentialsSerializer(data=essential_data)
-                    if serializer.is_valid():
-                        essential_instance, _ = models.Essentials.objects.update_or_create(
-                            id=essential_id,
-                            defaults={
-                                'title': serializer.validated_data.get('title'),
-                                'recipe': recipe,
-                                'quantity': serializer.validated_data.get('quantity'),
-                                'unit': serializer.validated_data.get('unit')
-                            }
-                        )
-                        provided_essential_ids.add(essential_instance.id)
-                    else:
-                        raise ValidationError(serializer.errors)
-                models.Essentials.objects.filter(recipe=recipe).exclude(id__in=provided_essential_ids).delete()
+                sync.collection(models.Essentials, "recipe", recipe,
+                    self._validated_rows(serializers.EssentialsSerializer, essential), ["title", "quantity", "unit"])
 
             provided_starch_ids = set()
             # if isinstance(starch_preparation_image, str) and starch_preparation_image.startswith('http'):
@@ -733,20 +694,9 @@ class RecipeViewSet(ModelViewSet):
                 )
                 provided_starch_ids.add(starch_instance.id)
 
-                provided_step_ids = set()
                 if starch_steps_data:
-                    for step_data in starch_steps_data:
-                        serializer = serializers.StarchPreparationStepsSerializer(data=step_data)
-                        step_id = step_data.pop("id", None)
-
-                        if serializer.is_valid():
-                            step_instance, _ = models.Starch_Preparation_Steps.objects.update_or_create(
-                                id=step_id, 
-                                defaults={'step': serializer.validated_data.get('step'), 'starch_preparation': starch_instance}
-                            )
-                        provided_step_ids.add(step_instance.id)
-
-                    models.Starch_Preparation_Steps.objects.filter(starch_preparation=starch_instance).exclude(id__in=provided_step_ids).delete()
+                    sync.collection(models.Starch_Preparation_Steps, "starch_preparation", starch_instance,
+                        self._validated_rows(serializers.StarchPreparationStepsSerializer, starch_steps_data), ["step"])
                     models.Starch_Preparation.objects.filter(recipe=recipe).exclude(id__in=provided_starch_ids).delete()
 
             provided_design_plate_ids = set()
@@ -761,48 +711,24 @@ class RecipeViewSet(ModelViewSet):
                     defaults={'image_url': plate_design_image, "recipe":recipe}
                 )
                 provided_design_plate_ids.add(design_your_plate_instance.id)
-                provided_design_plate_step_ids = set()
                 plate_steps_data = design_your_plate.pop('steps', [])
                 if plate_steps_data:
-                    for step_data in plate_steps_data:
-                        serializer = serializers.DesignYourPlateStepsSerializer(data=step_data)
-                        if serializer.is_valid():
-                            step_instance = serializer.save(design_plate=design_your_plate_instance)
-                            provided_design_plate_step_ids.add(step_instance.id)
-                        else:
-                            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-                    models.Design_Your_Plate_Steps.objects.filter(design_plate=design_your_plate_instance).exclude(id__in=provided_design_plate_step_ids).delete()
+                    sync.collection(models.Design_Your_Plate_Steps, "design_plate", design_your_plate_instance,
+                        self._validated_rows(serializers.DesignYourPlateStepsSerializer, plate_steps_data), ["step"])
                     models.Design_Your_Plate.objects.filter(recipe=recipe).exclude(id__in=provided_design_plate_ids).delete()
 
-            provided_deviation_comment_ids = set()
             if cooking_deviation_comment:
-                for deviation_comment_data in cooking_deviation_comment:
-                    serializer = serializers.CookingDeviationCommentSerializer(data={**deviation_comment_data, "recipe": recipe})
-                    if serializer.is_valid():
-                        devivation_instance = serializer.save(recipe=recipe)
-                        provided_deviation_comment_ids.add(devivation_instance.id)
-                    else:
-                        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-                models.Cooking_Deviation_Comment.objects.filter(recipe=recipe).exclude(id__in=provided_deviation_comment_ids).delete()
-
+                sync.collection(models.Cooking_Deviation_Comment, "recipe", recipe,
+                    self._validated_rows(serializers.CookingDeviationCommentSerializer, cooking_deviation_comment), ["step"])
 
-            provided_variable_comment_ids = set()
             if real_time_variable_comment:
-                for variable_comment_data in real_time_variable_comment:
-                    serializer = serializers.RealTimeVariableCommentSerializer(data=variable_comment_data)
-                    if serializer.is_valid():
-                        variable_comment_id = variable_comment_data.pop('id', None)
-                        variable_instance, _ = models.Real_time_Variable_Comment.objects.update_or_create(
-                            id=variable_comment_id,
-                            defaults={'step': serializer.validated_data.get('step'), 'recipe': recipe}
-                        )
-                        provided_variable_comment_ids.add(variable_instance.id)
-                    else:
-                        raise serializers.ValidationError(serializer.errors)
-                models.Real_time_Variable_Comment.objects.filter(recipe=recipe).exclude(id__in=provided_variable_comment_ids).delete()
+                sync.collection(models.Real_time_Variable_Comment, "recipe", recipe,
+                    self._validated_rows(serializers.RealTimeVariableCommentSerializer, real_time_variable_comment), ["step"])
+
+            sync.finish()
         
-        return Response(recipe_serializer.data, status=status.HTTP_200_OK)
+        document = RecipeDocumentService.get_document(recipe.pk)
+        return Response(RecipeDocumentService.absolutize(document, request), status=status.HTTP_200_OK)
 
         # except ValidationError as e:
         #     raise serializers.ValidationError(str(e))
@@ -1083,6 +1009,7 @@ class RecipeProcessAuditViewSet(ModelViewSet):
     queryset = models.Recipe_Process_Audit.objects.filter(is_deleted=False)
     serializer_class = serializers.RecipeProcessAuditSerializer
     permission_classes = [IsAuthenticated,IsSubscribedORSuperUser]
+    pagination_class = pagination.KeysetPagination
     
     def get_queryset(self):
         user = self.request.user
@@ -1144,12 +1071,7 @@ class ScheduleDishViewSet(ModelViewSet):
         schedule_datetime = serializer.validated_data['schedule_datetime']
         dish_id = serializer.validated_data['dish'].id
 
-        job = scheduler.add_job(
-            create_or_update_schedule_dish,
-            'date',
-            run_date=schedule_datetime,
-            args=[dish_id]
-        )
+        job = JobQueue.enqueue("publish_scheduled_dish", dish_id, run_at=schedule_datetime)
         serializer.save(job = job.id, creator=request.user)
         recipe = models.Recipe.objects.get(id=dish_id)
         recipe.is_schedule = True
@@ -1165,9 +1087,7 @@ class ScheduleDishViewSet(ModelViewSet):
         recipe = models.Recipe.objects.get(id=instance.dish.id)
         recipe.is_schedule = False
         recipe.save()
-        job = scheduler.get_job(instance.job)
-        if job:
-            scheduler.remove_job(instance.job)
+        JobQueue.cancel(instance.job)
         instance.job = None
         instance.save()
         return Response({"detail": "Object soft deleted."}, status=status.HTTP_204_NO_CONTENT)
@@ -1179,18 +1099,22 @@ class TaskViewSet(ModelViewSet):
     filter_backends = [DjangoFilterBackend, filter.SearchFilter, filter.OrderingFilter]
     filter_class = filters.TaskFilter
     search_fields = ['task_description', 'kitchen_station', 'other_task_name', 'staff__first_name','user__first_name','task_name__dish_name']
+    pagination_class = pagination.KeysetPagination
 
     
     def get_queryset(self):
         user = self.request.user
+        queryset = self.queryset
+        if self.action != "list":
+            queryset = serializers.TaskSerializer.setup_eager_loading(queryset)
         if user.is_superuser:
-            return self.queryset.filter(is_deleted=False)
+            return queryset.filter(is_deleted=False)
         if user.role in [choices.Usertypes.ADMIN,choices.Usertypes.HEAD_CHEF]:
-            return self.queryset.filter(is_deleted=False,resturant=user.resturant)
+            return queryset.filter(is_deleted=False,resturant=user.resturant)
         elif user.role == choices.Usertypes.STAFF:
-            return self.queryset.filter(Q(user=user) | Q(staff=user), is_deleted=False, resturant=user.resturant)
+            return queryset.filter(Q(user=user) | Q(staff=user), is_deleted=False, resturant=user.resturant)
         else:
-            return self.queryset.none()
+            return queryset.none()
     
     
     def get_serializer_class(self):
@@ -1206,12 +1130,12 @@ class TaskViewSet(ModelViewSet):
 
     @action(detail=True, methods='get')
     def get_completed_task(self, request):
-        res = models.Task.objects.filter(status=choices.TaskGenericStatus.COMPLETED)
+        res = serializers.TaskSerializer.setup_eager_loading(models.Task.objects.filter(status=choices.TaskGenericStatus.COMPLETED))
         return Response(serializers.TaskSerializer(res,many=True, context=self.get_serializer_context()).data, status=status.HTTP_200_OK)
     
     @action(detail=False, methods=['get'], url_name='get_all_task')
     def get_all_task(self,request):
-        res = models.Task.objects.all().exclude(is_deleted=True)
+        res = serializers.TaskSerializer.setup_eager_loading(models.Task.objects.all().exclude(is_deleted=True))
         return Response(serializers.TaskSerializer(res,many=True).data, status=status.HTTP_200_OK)
     
     @action(detail=True, methods=['patch'], permission_classes=[IsAuthenticated, IsAdminOrHeadChefOrStaff])
@@ -1229,9 +1153,15 @@ class TaskViewSet(ModelViewSet):
     
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
     def task_detail(self, request, pk):
-        task = get_object_or_404(models.Task, pk=pk)
+        etag = task_etag(models.Task.objects.all(), pk, request)
+        if etag is None:
+            raise Http404
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        task = get_object_or_404(serializers.TaskSerializer.setup_eager_loading(models.Task.objects.all()), pk=pk)
         serializer = serializers.TaskSerializer(task, context=self.get_serializer_context())
-        return Response(serializer.data)
+        return Response(serializer.data, headers={"ETag": etag})
 
     def destroy(self, request, *args, **kwargs):
         if self.request.user.role == 'S':
@@ -1434,6 +1364,21 @@ class SuperAdminDashboardViewSet(ReadOnlyModelViewSet):
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['get'], url_path='llm-cache-stats', permission_classes=[IsAuthenticated, IsSuperUser])
+    def llm_cache_stats(self, request):
+        """Hit rate and upstream time saved by the LLM response cache in this process."""
+        return Response(llm_cache.stats(), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='outbound-stats', permission_classes=[IsAuthenticated, IsSuperUser])
+    def outbound_stats(self, request):
+        """Latency, status codes and retries per outbound host (OpenAI, Synthesia, S3) in this process."""
+        return Response(client_metrics.stats(), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='llm-scheduler-stats', permission_classes=[IsAuthenticated, IsSuperUser])
+    def llm_scheduler_stats(self, request):
+        """Queued and running AI calls, and the remaining budget of each restaurant, in this process."""
+        return Response(llm_scheduler.stats(), status=status.HTTP_200_OK)
+
 
 class MessageViewSet(ModelViewSet):
     queryset = models.Message.objects.all()
@@ -1467,13 +1412,23 @@ class WinePairViewSet(ViewSet):
             if not dish_description:
                 return Response({"error": "Dish description is required."}, status=400)
             
-            wine_pairing = culinary_ai.get_wine_pairing(dish_description)
-            res = store_wine_pairings(wine_pairing, recipe_id)
+            # A close enough dish that was already paired answers without the LLM.
+            # The recipe's own earlier pairing must not answer for it.
+            match = WinePairingIndex.match(
+                dish_description, recipe_id=int(recipe_id) if str(recipe_id).isdigit() else None
+            )
+            if match is not None:
+                wine_pairing, source = match.as_json(), "index"
+            else:
+                wine_pairing, source = culinary_ai.get_wine_pairing(dish_description), "model"
+            res = store_wine_pairings(wine_pairing, recipe_id, dish_description)
             
             if not res:
                 return Response({"error": "An error occurred while saving the wine pairing data."}, status=400)
-            return Response({"wine_pairing": wine_pairing}, status=200)
+            return Response({"wine_pairing": wine_pairing, "source": source}, status=200)
         
+        except LLMCapacityExceeded as e:
+            return Response({"error": str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={"Retry-After": str(e.retry_after)})
         except Exception as e:
             logger.error(f"Error in wine pairing recommendation: {str(e)}")
             return Response({"error": f"An error occurred while processing the wine pairing : {str(e)}"}, status=400)
@@ -1508,59 +1463,40 @@ class ExtraImageViewSet(ModelViewSet):
 
 
 class RecipeVideoGenerationViewSet(ModelViewSet):
+    """
+    ``generate_video`` queues the render and answers 202 right away; poll
+    ``GET video_generation/<id>/`` for progress until it is completed or failed.
+    """
+    serializer_class = serializers.RecipeVideoGenerationStatusSerializer
     permission_classes = [IsAuthenticated, IsAdminOrHeadChef,IsSubscribedORSuperUser]
-    http_method_names = ['post']
-    
+    http_method_names = ['get', 'post']
+
+    def get_queryset(self):
+        queryset = models.RecipeVideoGeneration.objects.select_related("recipe", "job")
+        user = self.request.user
+        if user.is_superuser:
+            return queryset
+        return queryset.filter(recipe__resturant=user.resturant)
+
+    def create(self, request, *args, **kwargs):
+        return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
     @action(detail=False, methods=['post'])
     def generate_video(self, request):
         serializer = serializers.RecipeVideoGenerationSerializer(data=request.data)
-        if serializer.is_valid():
-            transformed_data = serializer.data
-            response = generate_video_and_save(
-                recipe_id=transformed_data['recipe'],
-                recipe_name=transformed_data['recipe_name'],
-                introduction=transformed_data['introduction'],
-                # name_chef=transformed_data['name_chef'],zz
-                steps=transformed_data['steps_text'],
-                ingredient=transformed_data['ingredients_list'],
-                last_words=transformed_data['last_words'],
-                template_id=transformed_data['template_id'],
-                title=transformed_data['title'],
-                language=transformed_data['language'],
-                welcome="WELCOME",
-                to="TO",
-                plateprep="PLATEPREP",
-                training_phrase="THIS IS THE TRAINING VIDEO OF",
-                ingridiants_start="Let's begin by gathering the ingredients. You will need:",
-            )
-            if response.status_code == 200:
-                recipe = models.Recipe.objects.get(id=transformed_data['recipe'])
-                video_url = None
-                if recipe.video:
-                    video_url = request.build_absolute_uri(settings.MEDIA_URL + recipe.video.name.split('media/')[-1])
-                
-                return Response({
-                        "id": recipe.id,
-                        "title": recipe.dish_name,
-                        "video": video_url,
-                    },
-                    status=200
-                )
-            else:
-                return Response(
-                    {"error": "Failed to generate video"},
-                    status=400
-                )
-                
-        else:
+        if not serializer.is_valid():
             return Response(serializer.errors, status=400)
+        generation = VideoGenerationService.start(serializer.data, request.user)
+        data = self.get_serializer(generation).data
+        data["status_url"] = reverse("video_generation-detail", args=[generation.id], request=request)
+        return Response(data, status=status.HTTP_202_ACCEPTED)
 
 
 class NotificationViewSet(ModelViewSet):
     serializer_class = serializers.NotificationSerializer
     permission_classes = [IsAuthenticated,IsSubscribedORSuperUser]
     http_method_names = ["get"]
+    pagination_class = pagination.KeysetPagination
 
     def get_queryset(self):
         return models.Notification.objects.filter(related_dish__resturant=self.request.user.resturant).order_by('-created_at')
@@ -1613,11 +1549,48 @@ class AIRecipeGenerationViewSet(ViewSet):
                 result = culinary_ai.generate_menu(**validated_data)
                 # result = recipe_data
                 return Response({'result': result}, status=status.HTTP_200_OK)
+            except LLMCapacityExceeded as e:
+                return Response({'error': str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': str(e.retry_after)})
             except Exception as e:
                 return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAuthenticated, IsAdminOrHeadChef, IsSubscribedORSuperUser],
+        renderer_classes=[JSONRenderer, EventStreamRenderer],
+    )
+    def generate_recipe_stream(self, request):
+        """
+        ``generate_recipe`` as server-sent events: ``start`` straight away,
+        ``token`` events with the text as it is generated, then ``result``
+        with the complete menu (or ``error``).
+        """
+        serializer = serializers.AIRecipeGenerationSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        # The body is streamed after the middleware has let go of the request, so take its scheduler context now.
+        context = llm_scheduler.current()
+
+        def events():
+            yield sse_event("start", {})
+            chunks = []
+            try:
+                for chunk in culinary_ai.stream_menu(context=context, **serializer.validated_data):
+                    chunks.append(chunk)
+                    yield sse_event("token", {"text": chunk})
+            except LLMCapacityExceeded as e:
+                yield sse_event("error", {"error": str(e), "retry_after": e.retry_after})
+                return
+            except Exception as e:
+                yield sse_event("error", {"error": str(e)})
+                return
+            yield sse_event("result", {"result": "".join(chunks)})
+
+        return event_stream_response(events())
+
 class MenuCategoriesViewSet(ModelViewSet):
     serializer_class = serializers.CategorySerializer
     queryset = models.MenuCategoryies.objects.all().order_by('category_name')
@@ -1660,6 +1633,18 @@ class MenuViewSet(ModelViewSet):
         queryset = super().get_queryset().filter(is_deleted=False)
         return queryset
 
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        etag = menu_etag(self.filter_queryset(self.get_queryset()), self.kwargs[lookup_url_kwarg], request)
+        if etag is None:
+            raise Http404
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        response = super().retrieve(request, *args, **kwargs)
+        response["ETag"] = etag
+        return response
+
 class MenuItemsViewSet(ModelViewSet):
     serializer_class = serializers.MenuItemSerializer
     queryset = models.MenuItems.objects.all()
@@ -1708,15 +1693,19 @@ class SpellCheckAPI(APIView):
     def post(self, request):
         serializer = serializers.SpellCheckSerializer(data={"data": request.data})
         if serializer.is_valid():
-            corrected_data = {}
-            for field, value in serializer.validated_data["data"].items():
-                if isinstance(value, dict) and "title" in value and "index" in value:
-                    corrected_data[field] = {
-                        "title": spell_checker(value["title"]),
-                        "index": value["index"]
-                    }
-                else:
-                    corrected_data[field] = value
+            data = serializer.validated_data["data"]
+            # All titles of the form are checked together instead of one model call per field.
+            fields = [
+                field for field, value in data.items()
+                if isinstance(value, dict) and "title" in value and "index" in value
+            ]
+            try:
+                titles = spell_check_many([str(data[field]["title"]) for field in fields])
+            except LLMCapacityExceeded as e:
+                return Response({"error": str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={"Retry-After": str(e.retry_after)})
+            corrected_data = dict(data)
+            for field, title in zip(fields, titles):
+                corrected_data[field] = {"title": title, "index": data[field]["index"]}
             return Response(corrected_data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -1724,6 +1713,8 @@ class LoginLogViewSet(ReadOnlyModelViewSet):
     queryset = models.LoginLog.objects.all().order_by('-timestamp')
     serializer_class = serializers.LoginLogSerializer
     permission_classes = [IsAuthenticated,IsSubscribedORSuperUser]
+    pagination_class = pagination.KeysetPagination
+    keyset_ordering = ("-timestamp", "-id")
 
     def get_queryset(self):
         user = self.request.user
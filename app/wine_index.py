@@ -0,0 +1,262 @@
+import re
+import json
+import time
+import zlib
+import logging
+import threading
+import numpy as np
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = 1 << 20
+STOPWORDS = {"a", "an", "and", "the", "with", "of", "in", "on", "served", "serve", "topped", "over", "for", "&"}
+WORD = re.compile(r"[^\W_]+")
+WINE_FIELDS = ("wine_name", "wine_type", "flavor", "profile", "proteins", "reason_for_pairing", "region_name")
+
+
+def recipe_description(recipe):
+    """The dish description wine pairings are requested with: dish name and its ingredients."""
+    # all() so prefetched ingredients are used when present.
+    ingredients = [item.title for item in recipe.recipe_ingredient.all()] + [
+        item.name for item in recipe.predefined_ingredients.all()
+    ]
+    if not ingredients:
+        return recipe.dish_name
+    if len(ingredients) == 1:
+        return f"{recipe.dish_name} with {ingredients[0]}"
+    return f"{recipe.dish_name} with {', '.join(ingredients[:-1])}, and {ingredients[-1]}"
+
+
+def features(text):
+    """
+    Hashed features of ``text`` with their counts: words, word bigrams and
+    character trigrams (which absorb plurals and small spelling differences).
+    """
+    words = [word for word in WORD.findall((text or "").lower()) if word not in STOPWORDS]
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"#{word}#"
+        grams.extend(f"~{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    counts = {}
+    for gram in grams:
+        feature = zlib.crc32(gram.encode()) % DIMENSIONS
+        counts[feature] = counts.get(feature, 0) + 1
+    return counts
+
+
+class WinePairingMatch:
+    def __init__(self, recipe_id, similarity, wine_ids):
+        self.recipe_id = recipe_id
+        self.similarity = similarity
+        self.wine_ids = wine_ids
+
+    def as_json(self):
+        """The pairing in the same JSON shape the wine pairing prompt returns."""
+        from app import models
+
+        wines = models.Wine.objects.filter(id__in=self.wine_ids).values(*WINE_FIELDS)
+        return json.dumps(list(wines))
+
+
+class WinePairingIndex:
+    """
+    In-process TF-IDF index over the dish descriptions of recipes that
+    already have wine pairings, so a new request for a similar dish can
+    reuse them instead of calling the LLM.
+
+    Documents are stored as flat NumPy arrays of (document, hashed feature,
+    term weight). IDF and document norms are recomputed lazily after
+    additions, and queries score only the postings of their own features.
+    """
+
+    _instance = None
+    _built_at = 0.0
+    _lock = threading.Lock()
+    _builder = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.recipes = []
+        self.wines = []
+        self.alive = []
+        self.by_recipe = {}
+        self.doc_ids = np.zeros(0, dtype=np.int32)
+        self.feature_ids = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.pending = []
+        self.dirty = True
+
+    def add(self, recipe_id, description, wine_ids):
+        """Index (or re-index) one recipe's description and wines."""
+        counts = features(description)
+        with self.lock:
+            previous = self.by_recipe.get(recipe_id)
+            if previous is not None:
+                self.alive[previous] = False
+                self.dirty = True
+            if not counts or not wine_ids:
+                self.by_recipe.pop(recipe_id, None)
+                return
+            doc = len(self.recipes)
+            self.recipes.append(recipe_id)
+            self.wines.append(list(wine_ids))
+            self.alive.append(True)
+            self.by_recipe[recipe_id] = doc
+            self.pending.append((doc, counts))
+            self.dirty = True
+
+    def remove(self, recipe_id):
+        with self.lock:
+            doc = self.by_recipe.pop(recipe_id, None)
+            if doc is not None:
+                self.alive[doc] = False
+                self.dirty = True
+
+    def _refresh(self):
+        if self.pending:
+            docs, feature_ids, counts = [], [], []
+            for doc, doc_counts in self.pending:
+                docs.extend([doc] * len(doc_counts))
+                feature_ids.extend(doc_counts)
+                counts.extend(doc_counts.values())
+            # Sublinear term frequency.
+            tf = 1 + np.log(np.array(counts, dtype=np.float32))
+            self.doc_ids = np.concatenate([self.doc_ids, np.array(docs, dtype=np.int32)])
+            self.feature_ids = np.concatenate([self.feature_ids, np.array(feature_ids, dtype=np.int32)])
+            self.weights = np.concatenate([self.weights, tf])
+            self.pending = []
+        order = np.argsort(self.feature_ids, kind="stable")
+        self.doc_ids, self.feature_ids, self.weights = self.doc_ids[order], self.feature_ids[order], self.weights[order]
+        self.alive_mask = np.array(self.alive, dtype=bool)
+        live = self.alive_mask[self.doc_ids]
+        documents = max(int(self.alive_mask.sum()), 1)
+        df = np.bincount(self.feature_ids[live], minlength=DIMENSIONS)
+        self.idf = (np.log((1 + documents) / (1 + df)) + 1).astype(np.float32)
+        weighted = self.weights * self.idf[self.feature_ids]
+        self.norms = np.sqrt(np.bincount(self.doc_ids, weights=weighted ** 2, minlength=len(self.recipes)))
+        self.norms[self.norms == 0] = 1
+        self.dirty = False
+
+    def search(self, description, limit=1, exclude=None):
+        """Closest indexed recipes other than ``exclude`` (a recipe id) as ``[WinePairingMatch]``, best first."""
+        counts = features(description)
+        with self.lock:
+            if not counts or not self.by_recipe:
+                return []
+            if self.dirty:
+                self._refresh()
+            query_features = np.fromiter(counts, dtype=np.int32)
+            query = (1 + np.log(np.array(list(counts.values()), dtype=np.float32))) * self.idf[query_features]
+            query_norm = float(np.linalg.norm(query)) or 1.0
+            scores = np.zeros(len(self.recipes), dtype=np.float32)
+            starts = np.searchsorted(self.feature_ids, query_features, side="left")
+            ends = np.searchsorted(self.feature_ids, query_features, side="right")
+            for start, end, weight in zip(starts, ends, query):
+                if start != end:
+                    postings = slice(start, end)
+                    np.add.at(
+                        scores, self.doc_ids[postings], weight * self.weights[postings] * self.idf[self.feature_ids[postings]]
+                    )
+            scores = scores / (self.norms * query_norm)
+            scores[~self.alive_mask] = 0
+            if exclude in self.by_recipe:
+                scores[self.by_recipe[exclude]] = 0
+            best = np.argsort(-scores)[:limit]
+            return [
+                WinePairingMatch(self.recipes[doc], float(scores[doc]), self.wines[doc]) for doc in best if scores[doc] > 0
+            ]
+
+    def __len__(self):
+        return len(self.by_recipe)
+
+    @classmethod
+    def build(cls):
+        from app import models
+
+        started = time.monotonic()
+        index = cls()
+        recipes = (
+            models.Recipe.objects.filter(is_deleted=False, wine_pairing__isnull=False)
+            .distinct()
+            .prefetch_related("recipe_ingredient", "predefined_ingredients", "wine_pairing")
+        )
+        for recipe in recipes.iterator(chunk_size=500):
+            index.add(recipe.id, recipe_description(recipe), [wine.id for wine in recipe.wine_pairing.all()])
+        logger.info(f"Built wine pairing index of {len(index)} recipes in {time.monotonic() - started:.2f}s")
+        return index
+
+    @classmethod
+    def expired(cls):
+        return cls._instance is None or time.monotonic() - cls._built_at > getattr(settings, "WINE_INDEX_TTL", 3600)
+
+    @classmethod
+    def get(cls, build=True):
+        """Shared index, rebuilt from the database every ``WINE_INDEX_TTL`` seconds (other processes add to theirs)."""
+        if cls.expired():
+            if not build:
+                return None
+            with cls._lock:
+                if cls.expired():
+                    cls._instance = cls.build()
+                    cls._built_at = time.monotonic()
+        return cls._instance
+
+    @classmethod
+    def build_in_background(cls):
+        """Rebuild the shared index on a daemon thread, unless a build is already running."""
+        if not cls._lock.acquire(blocking=False):
+            return
+        try:
+            if cls._builder is None or not cls._builder.is_alive():
+                cls._builder = threading.Thread(target=cls._rebuild, name="wine-pairing-index", daemon=True)
+                cls._builder.start()
+        finally:
+            cls._lock.release()
+
+    @classmethod
+    def _rebuild(cls):
+        from django.db import connection
+
+        try:
+            index = cls.build()
+            cls._built_at = time.monotonic()
+            cls._instance = index
+        except Exception as e:
+            logger.error(f"Error building wine pairing index: {str(e)}")
+        finally:
+            connection.close()
+
+    @classmethod
+    def match(cls, description, recipe_id=None):
+        """
+        A past pairing for a dish close enough to ``description``
+        (``WINE_INDEX_MIN_SIMILARITY``), or None. ``recipe_id`` is the recipe
+        being paired, whose own earlier pairing is never a match.
+
+        Requests never wait for the index: a missing or expired one is rebuilt
+        in the background, the expired one keeps serving meanwhile, and until
+        the first build finishes there is no match.
+        """
+        index = cls._instance
+        if cls.expired():
+            cls.build_in_background()
+        if index is None:
+            return None
+        try:
+            matches = index.search(description, exclude=recipe_id)
+        except Exception as e:
+            logger.error(f"Error searching wine pairing index: {str(e)}")
+            return None
+        threshold = getattr(settings, "WINE_INDEX_MIN_SIMILARITY", 0.8)
+        if matches and matches[0].similarity >= threshold:
+            return matches[0]
+        return None
+
+    @classmethod
+    def update(cls, recipe_id, description, wine_ids):
+        """Add a new pairing to this process's index, if it has been built; otherwise the next build picks it up."""
+        index = cls.get(build=False)
+        if index is not None:
+            index.add(recipe_id, description, wine_ids)
@@ -28,7 +28,40 @@ SECRET_KEY = os.environ.get("SECRET_KEY")
 FRONTEND_URL = os.environ.get("FRONTEND_URL")
 SYNTHESIA_KEY = os.environ.get("SYNTHESIA_KEY")
 SYNTHESIA_URL = os.environ.get("SYNTHESIA_URL")
+# Base of the Synthesia REST API (video status/delete); point both at `manage.py fake_synthesia` to work offline.
+SYNTHESIA_API_URL = os.environ.get("SYNTHESIA_API_URL", "https://api.synthesia.io/v2")
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+# "openai", or "fake" for deterministic local chat, image and Synthesia backends (app/providers.py) with the
+# latency (seconds, +/- FAKE_AI_JITTER as a fraction) and failure rate below, for offline runs and load tests.
+AI_PROVIDER = os.environ.get("AI_PROVIDER", "openai")
+FAKE_CHAT_LATENCY = float(os.environ.get("FAKE_CHAT_LATENCY", 1.0))
+FAKE_IMAGE_LATENCY = float(os.environ.get("FAKE_IMAGE_LATENCY", 5.0))
+FAKE_AI_JITTER = float(os.environ.get("FAKE_AI_JITTER", 0.3))
+FAKE_AI_FAILURE_RATE = float(os.environ.get("FAKE_AI_FAILURE_RATE", 0.0))
+FAKE_AI_SEED = int(os.environ.get("FAKE_AI_SEED", 0))
+FAKE_SYNTHESIA_RENDER_SECONDS = float(os.environ.get("FAKE_SYNTHESIA_RENDER_SECONDS", 30))
+# LLM responses are cached per process (LRU) and in the "default" cache, which other workers share when it
+# is a shared backend.
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 1024))
+# Offline spell check: general word list (``word`` or ``word count`` per line, e.g. a SymSpell frequency
+# dictionary) used next to the culinary lexicon; defaults to the bundled app/data/english_words.txt.
+# Words are only auto-corrected to general English words when a list is configured here.
+SPELLCHECK_WORDLIST = os.environ.get("SPELLCHECK_WORDLIST")
+SPELLCHECK_LEXICON_TTL = int(os.environ.get("SPELLCHECK_LEXICON_TTL", 3600))
+# Per-process admission control for OpenAI calls (app/llm_scheduler.py): global concurrency, then a concurrency
+# limit and per-minute request/token budgets per restaurant. Calls that cannot start within the wait limit of
+# their priority are rejected with 429 (requests) or retried later (jobs).
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 8))
+LLM_TENANT_CONCURRENCY = int(os.environ.get("LLM_TENANT_CONCURRENCY", 3))
+LLM_TENANT_REQUESTS_PER_MINUTE = int(os.environ.get("LLM_TENANT_REQUESTS_PER_MINUTE", 60))
+LLM_TENANT_TOKENS_PER_MINUTE = int(os.environ.get("LLM_TENANT_TOKENS_PER_MINUTE", 200000))
+LLM_INTERACTIVE_MAX_WAIT = int(os.environ.get("LLM_INTERACTIVE_MAX_WAIT", 20))
+LLM_BACKGROUND_MAX_WAIT = int(os.environ.get("LLM_BACKGROUND_MAX_WAIT", 600))
+# Wine pairing requests reuse the wines of an already paired dish whose description is at least this
+# similar (cosine of TF-IDF vectors, app/wine_index.py); the per-process index is rebuilt every WINE_INDEX_TTL seconds.
+WINE_INDEX_MIN_SIMILARITY = float(os.environ.get("WINE_INDEX_MIN_SIMILARITY", 0.8))
+WINE_INDEX_TTL = int(os.environ.get("WINE_INDEX_TTL", 3600))
 
 
 # SECURITY WARNING: don't run with debug turned on in production!
@@ -38,6 +71,9 @@ CSRF_TRUSTED_ORIGINS = [os.environ.get("CSRF_TRUSTED_ORIGINS")]
 CORS_ALLOW_CREDENTIALS = True
 ALLOWED_HOSTS = ["*"]
 SSL = False if os.environ.get("SSL") == "False" else True
+# Extra hosts (comma separated) that image_url sources of responsive variants may be fetched from, besides the
+# media bucket; any other URL is never requested by the server.
+IMAGE_SOURCE_HOSTS = [host for host in os.environ.get("IMAGE_SOURCE_HOSTS", "").split(",") if host]
 
 AUTH_USER_MODEL = "app.User"
 # LOGIN_URL = "/"
@@ -131,6 +167,7 @@ MIDDLEWARE = [
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     'app.middleware.CurrentUserMiddleware',
+    'app.middleware.AuditMiddleware',
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     'corsheaders.middleware.CorsMiddleware',
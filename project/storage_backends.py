@@ -1,6 +1,12 @@
+from boto3.s3.transfer import TransferConfig
 from django.conf import settings
 from storages.backends.s3boto3 import S3Boto3Storage
 
+# Streamed uploads (e.g. recipe videos) are sent as multipart uploads of this
+# part size, so memory stays at roughly part size x concurrency.
+MULTIPART_CHUNKSIZE = getattr(settings, "AWS_S3_MULTIPART_CHUNKSIZE", 8 * 1024 * 1024)
+MULTIPART_CONCURRENCY = getattr(settings, "AWS_S3_MULTIPART_CONCURRENCY", 4)
+
 
 class StaticStorage(S3Boto3Storage):
     location = "static"
@@ -12,6 +18,15 @@ class PublicMediaStorage(S3Boto3Storage):
     # default_acl = 'public-read'
     file_overwrite = False
 
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_CHUNKSIZE,
+            multipart_chunksize=MULTIPART_CHUNKSIZE,
+            max_concurrency=MULTIPART_CONCURRENCY,
+            use_threads=self.use_threads,
+        )
+
 
 class PrivateMediaStorage(S3Boto3Storage):
     location = "private"